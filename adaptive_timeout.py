@@ -0,0 +1,105 @@
+"""
+Latency-adaptive WebDriver waits.
+
+Instead of a fixed WebDriverWait(driver, 20) / WebDriverWait(driver, 5), each wait belongs to
+a stage ('results_table', 'details_tab', 'project_details', ...) and its timeout is derived
+from the latencies recently observed for that stage:
+
+    timeout = clamp(quantile(latencies, 0.99) * factor, floor, ceiling) * retry_factor ** attempt
+
+Until a stage has min_samples observations its default (the old fixed value) is used. A
+wait that times out is recorded at the stage's un-retried timeout, so when the portal slows
+down the distribution, and with it the timeout, grows; the longer budget of a retry is never
+recorded, so retries cannot ratchet the timeout up. Records skipped on a timeout can be
+retried with attempt=1, 2, ... for a longer budget.
+"""
+import time
+from collections import defaultdict, deque
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# The fixed timeouts the scripts used before
+STAGE_DEFAULTS = {
+    'results_table': 20,
+    'details_tab': 20,
+    'project_details': 5,
+}
+
+
+class AdaptiveTimeout:
+    """
+    Rolling per-stage latency windows and the waits derived from them.
+    """
+
+    def __init__(self, quantile=0.99, factor=1.5, floor=2.0, ceiling=30.0, window=500, min_samples=20,
+                 retry_factor=2.0, max_retries=2, defaults=STAGE_DEFAULTS, poll_frequency=0.5):
+        self.quantile = quantile
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.retry_factor = retry_factor
+        self.max_retries = max_retries
+        self.defaults = defaults
+        # Seconds between checks of a condition; recorded latencies are rounded up to it, and
+        # each check is a WebDriver round trip
+        self.poll_frequency = poll_frequency
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+
+    def observe(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def latency(self, stage, quantile=None):
+        """
+        The given quantile of the stage's recent latencies, or None without enough samples.
+        """
+        samples = self.samples[stage]
+        if len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        position = min(int((quantile or self.quantile) * len(ordered)), len(ordered) - 1)
+        return ordered[position]
+
+    def timeout(self, stage, attempt=0):
+        """
+        Seconds to wait for `stage`; retries (attempt > 0) get a longer budget, beyond the ceiling.
+        """
+        latency = self.latency(stage)
+        if latency is None:
+            budget = self.defaults.get(stage, self.ceiling)
+        else:
+            budget = min(max(latency * self.factor, self.floor), self.ceiling)
+        return budget * self.retry_factor ** attempt
+
+    def until(self, driver, stage, condition, attempt=0):
+        """
+        WebDriverWait(driver, timeout(stage)).until(condition), recording how long it took.
+        Raises TimeoutException like WebDriverWait.
+        """
+        timeout = self.timeout(stage, attempt)
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+        except TimeoutException:
+            self.observe(stage, self.timeout(stage))
+            raise
+        self.observe(stage, time.monotonic() - started)
+        return result
+
+    def can_retry(self, attempt):
+        return attempt < self.max_retries
+
+    def summary(self):
+        """
+        {stage: {samples, p50, p99, timeout}} for logging at the end of a run.
+        """
+        return {
+            stage: {
+                'samples': len(samples),
+                'p50': self.latency(stage, 0.5),
+                'p99': self.latency(stage),
+                'timeout': round(self.timeout(stage), 2),
+            }
+            for stage, samples in self.samples.items()
+        }
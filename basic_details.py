@@ -1,21 +1,29 @@
 import pandas as pd
 
-def convert_csv_to_excel(csv_file, excel_file):
+def convert_csv_to_excel(csv_file, excel_file, sheet_name='Sheet1', extra_sheets=None):
     """
     Converts a CSV file into an Excel file.
     
     :param csv_file: Path to the input CSV file.
     :param excel_file: Path to the output Excel file.
+    :param sheet_name: Name of the sheet the CSV is written to.
+    :param extra_sheets: Optional {sheet name: CSV path or DataFrame} written as further sheets,
+        e.g. the tables of normalize_export.py.
     """
     try:
         # Read the CSV file
         data = pd.read_csv(csv_file)
         
         # Write to an Excel file
-        data.to_excel(excel_file, index=False, engine='openpyxl')
+        with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
+            data.to_excel(writer, sheet_name=sheet_name, index=False)
+            for name, sheet in (extra_sheets or {}).items():
+                sheet = sheet if isinstance(sheet, pd.DataFrame) else pd.read_csv(sheet, dtype=str, keep_default_na=False)
+                sheet.to_excel(writer, sheet_name=name, index=False)
         print(f"Successfully converted '{csv_file}' to '{excel_file}'.")
     except Exception as e:
         print(f"Error converting file: {e}")
 
 # Example usage
-convert_csv_to_excel('new_data_.csv', 'basic_details.xlsx')
+if __name__ == "__main__":
+    convert_csv_to_excel('new_data_.csv', 'basic_details.xlsx')
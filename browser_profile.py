@@ -0,0 +1,126 @@
+import copy
+import os
+import shutil
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+PROFILE_ROOT = "chrome_profiles"
+DISK_CACHE_SIZE = 200 * 1024 * 1024  # bytes
+
+# Files Chrome leaves behind when it is killed, which make the next start refuse the profile
+STALE_LOCK_FILES = ["SingletonLock", "SingletonSocket", "SingletonCookie"]
+
+
+def profile_dir(worker_id, root=PROFILE_ROOT):
+    """
+    Return the user-data directory of a worker.
+    """
+    return os.path.abspath(os.path.join(root, f"worker-{worker_id}"))
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def claim_profile(worker_id, root=PROFILE_ROOT):
+    """
+    Make sure no other live process is using this worker's profile, then clear the lock
+    files of a previous Chrome that did not shut down cleanly.
+    Raises RuntimeError if another process holds the profile.
+    """
+    path = profile_dir(worker_id, root)
+    os.makedirs(path, exist_ok=True)
+    owner_file = os.path.join(path, "worker.pid")
+    if os.path.exists(owner_file):
+        try:
+            with open(owner_file, "r") as f:
+                owner_pid = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            owner_pid = 0
+        if owner_pid and owner_pid != os.getpid() and pid_alive(owner_pid):
+            raise RuntimeError(f"Chrome profile '{path}' is in use by process {owner_pid}.")
+    with open(owner_file, "w") as f:
+        f.write(str(os.getpid()))
+    for name in STALE_LOCK_FILES:
+        lock_path = os.path.join(path, name)
+        if os.path.lexists(lock_path):
+            os.remove(lock_path)
+    return path
+
+
+def release_profile(worker_id, root=PROFILE_ROOT):
+    """
+    Give up this process's claim on a worker's profile (remove its pid file).
+    """
+    owner_file = os.path.join(profile_dir(worker_id, root), "worker.pid")
+    try:
+        with open(owner_file, "r") as f:
+            owner_pid = int(f.read().strip() or 0)
+        if owner_pid == os.getpid():
+            os.remove(owner_file)
+    except (OSError, ValueError):
+        pass
+
+
+def reset_profile(worker_id, root=PROFILE_ROOT):
+    """
+    Delete a worker's profile so that the next start begins from a blank one.
+    """
+    path = profile_dir(worker_id, root)
+    shutil.rmtree(path, ignore_errors=True)
+    print(f"Reset Chrome profile '{path}'.")
+
+
+def add_profile_arguments(chrome_options, worker_id, root=PROFILE_ROOT):
+    """
+    Point Chrome at the worker's persistent user-data directory and disk cache, so the
+    portal's JS/CSS bundles and TLS session state survive between runs. Returns a copy of
+    chrome_options with the profile arguments; the caller's object is left unchanged, so it
+    can be reused for the next driver.
+    """
+    path = claim_profile(worker_id, root)
+    chrome_options = copy.deepcopy(chrome_options)
+    chrome_options.add_argument(f"--user-data-dir={path}")
+    chrome_options.add_argument(f"--disk-cache-dir={os.path.join(path, 'cache')}")
+    chrome_options.add_argument(f"--disk-cache-size={DISK_CACHE_SIZE}")
+    return chrome_options
+
+
+def create_chrome_driver(chrome_options, worker_id=None, root=PROFILE_ROOT):
+    """
+    Start Chrome with the given options. With a worker_id, the worker's persistent profile
+    is used; if Chrome cannot start on it (e.g. the profile got corrupted), the profile is
+    reset and the start retried once. The profile is released when the driver quits.
+    """
+    if worker_id is None:
+        return webdriver.Chrome(options=chrome_options)
+    profile_options = add_profile_arguments(chrome_options, worker_id, root)
+    try:
+        try:
+            driver = webdriver.Chrome(options=profile_options)
+        except WebDriverException as e:
+            print(f"Chrome failed to start with profile of worker '{worker_id}': {e}")
+            reset_profile(worker_id, root)
+            claim_profile(worker_id, root)
+            driver = webdriver.Chrome(options=profile_options)
+    except Exception:
+        release_profile(worker_id, root)
+        raise
+
+    quit = driver.quit
+
+    def quit_and_release():
+        try:
+            quit()
+        finally:
+            release_profile(worker_id, root)
+
+    driver.quit = quit_and_release
+    return driver
@@ -0,0 +1,85 @@
+import argparse
+
+import pandas as pd
+
+# Fields compared between two crawls unless others are requested
+DEFAULT_COMPARE_FIELDS = [
+    'status', 'proposed_completion_date', 'covid_extension_date',
+    'section_6_extension_date', 'further_extension_date', 'complaints_litigation'
+]
+
+
+def load_snapshot(csv_file, fields):
+    """
+    Read the reg_no and compared columns of a crawl CSV as strings, one row per reg_no.
+    Later rows win, since reraall.py appends re-crawled projects to the end of the file.
+    Compared columns the file does not have (a projected crawl) are left out.
+    """
+    data = pd.read_csv(csv_file, usecols=lambda name: name == 'reg_no' or name in fields, dtype=str,
+                       keep_default_na=False)
+    data['reg_no'] = data['reg_no'].str.strip()
+    data = data[data['reg_no'] != '']
+    return data.drop_duplicates(subset='reg_no', keep='last').set_index('reg_no')
+
+
+def diff_snapshots(old_csv, new_csv, fields=None):
+    """
+    Compare two crawl snapshots on reg_no.
+
+    :param old_csv: Previous crawl, e.g. yesterday's copy of 'new_data_.csv'.
+    :param new_csv: Current crawl.
+    :param fields: Columns to compare; defaults to DEFAULT_COMPARE_FIELDS.
+    :return: DataFrame with one row per change and the columns
+        reg_no, change ('added', 'removed' or 'changed'), field, old_value, new_value.
+    """
+    fields = list(fields or DEFAULT_COMPARE_FIELDS)
+    old = load_snapshot(old_csv, fields)
+    new = load_snapshot(new_csv, fields)
+    missing = [name for name in fields if name not in old.columns or name not in new.columns]
+    if missing:
+        print(f"Not compared, missing from one of the snapshots: {missing}")
+        fields = [name for name in fields if name not in missing]
+
+    added = new.index.difference(old.index)
+    removed = old.index.difference(new.index)
+    common = old.index.intersection(new.index)
+
+    # Element-wise comparison of the aligned frames, then keep only the differing cells
+    old_common = old.loc[common, fields]
+    new_common = new.loc[common, fields]
+    changed_mask = old_common.ne(new_common).stack()
+    changed = pd.DataFrame({
+        'old_value': old_common.stack()[changed_mask],
+        'new_value': new_common.stack()[changed_mask],
+    })
+    changed.index.names = ['reg_no', 'field']
+    changed = changed.reset_index()
+    changed.insert(1, 'change', 'changed')
+
+    added_rows = pd.DataFrame({'reg_no': added, 'change': 'added', 'field': '', 'old_value': '', 'new_value': ''})
+    removed_rows = pd.DataFrame({'reg_no': removed, 'change': 'removed', 'field': '', 'old_value': '', 'new_value': ''})
+
+    changes = pd.concat([added_rows, removed_rows, changed], ignore_index=True)
+    return changes.sort_values(['reg_no', 'change', 'field'], kind='stable').reset_index(drop=True)
+
+
+def write_change_log(old_csv, new_csv, output_csv, fields=None):
+    """
+    Diff two crawl snapshots and write the change log to output_csv.
+    """
+    changes = diff_snapshots(old_csv, new_csv, fields)
+    changes.to_csv(output_csv, index=False)
+    counts = changes['change'].value_counts()
+    print(f"Added: {counts.get('added', 0)}, removed: {counts.get('removed', 0)}, "
+          f"changed fields: {counts.get('changed', 0)}. Change log written to '{output_csv}'.")
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two crawl snapshots of new_data_.csv on reg_no.")
+    parser.add_argument('old_csv', help="Previous snapshot")
+    parser.add_argument('new_csv', help="Current snapshot")
+    parser.add_argument('-o', '--output', default='changes.csv', help="Change log CSV (default: changes.csv)")
+    parser.add_argument('-f', '--fields', nargs='+', help="Columns to compare")
+    args = parser.parse_args()
+    write_change_log(args.old_csv, args.new_csv, args.output, args.fields)
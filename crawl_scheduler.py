@@ -0,0 +1,128 @@
+"""
+Orders search terms so a time-limited refresh visits the projects most likely to have
+changed first.
+
+The score of a term is computed from what the previous crawl ('new_data_.csv') recorded
+for it:
+
+    - never scraped                          -> always first
+    - a completion/extension date close by   -> up to DEADLINE_WEIGHT (status changes,
+                                                extensions and certificates show up there)
+    - recently approved                      -> up to RECENT_WEIGHT (details still filling in)
+    - status says completed/lapsed/revoked   -> score scaled by SETTLED_FACTOR
+
+    python crawl_scheduler.py --terms newDa.csv --snapshot new_data_.csv -o scheduled.csv
+"""
+import argparse
+import csv
+
+import numpy as np
+import pandas as pd
+
+DATE_FIELDS = ['proposed_completion_date', 'covid_extension_date', 'section_6_extension_date',
+               'further_extension_date']
+NEW_TERM_SCORE = 1000.0
+DEADLINE_WEIGHT = 60.0
+DEADLINE_SCALE_DAYS = 90
+RECENT_WEIGHT = 30.0
+RECENT_SCALE_DAYS = 180
+SETTLED_FACTOR = 0.25
+SETTLED_STATUS = r'complet|lapse|revok|withdraw'
+SNAPSHOT_COLUMNS = ['reg_no', 'status', 'approved_on'] + DATE_FIELDS
+
+
+def parse_dates(values):
+    """
+    Parse portal dates (day first, e.g. '31-12-2024' or '31/12/2024', or ISO '2024-12-31');
+    unparseable values become NaT.
+    """
+    values = values.str.strip().str.replace('/', '-', regex=False)
+    parsed = pd.to_datetime(values, format='%d-%m-%Y', errors='coerce')
+    # Year first must be tried before the day-first fallback, which reads 2026-10-01 as 10 January
+    iso = parsed.isna() & (values != '')
+    if iso.any():
+        parsed[iso] = pd.to_datetime(values[iso], format='%Y-%m-%d', errors='coerce')
+    # Anything in another layout is parsed value by value
+    other = parsed.isna() & (values != '')
+    if other.any():
+        parsed[other] = pd.to_datetime(values[other].map(
+            lambda value: pd.to_datetime(value, dayfirst=True, errors='coerce')))
+    return parsed
+
+
+def load_snapshot(snapshot_csv='new_data_.csv'):
+    """
+    The columns of a crawl output the scores are computed from (empty if the file is missing).
+    Columns missing from the file, e.g. a projected crawl, are filled with ''.
+    """
+    try:
+        data = pd.read_csv(snapshot_csv, usecols=lambda name: name in SNAPSHOT_COLUMNS, dtype=str,
+                           keep_default_na=False)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS, dtype=str)
+    return data.reindex(columns=SNAPSHOT_COLUMNS, fill_value='')
+
+
+def priority_scores(terms, snapshot_csv='new_data_.csv', today=None):
+    """
+    Score each search term by how likely its project changed since the snapshot.
+
+    :param terms: Search terms (registration numbers) to schedule.
+    :param snapshot_csv: Output of an earlier reraall.py run, or a DataFrame of it already in
+        memory; the last row per reg_no is used.
+    :param today: Reference date (default: today).
+    :return: DataFrame with `term`, `score` and `reason`, highest score first. Ties keep the
+        order of `terms`.
+    """
+    today = pd.Timestamp(today or pd.Timestamp.now().normalize())
+    scheduled = pd.DataFrame({'term': list(terms)})
+    if isinstance(snapshot_csv, pd.DataFrame):
+        snapshot = snapshot_csv[SNAPSHOT_COLUMNS]
+    else:
+        snapshot = load_snapshot(snapshot_csv)
+    snapshot = snapshot.drop_duplicates(subset='reg_no', keep='last')
+    data = scheduled.merge(snapshot, how='left', left_on='term', right_on='reg_no')
+
+    # Days to the nearest deadline, past or future
+    deadlines = np.column_stack([(parse_dates(data[name].fillna('')) - today).dt.days.to_numpy(dtype=float)
+                                 for name in DATE_FIELDS])
+    nearest = np.min(np.abs(np.nan_to_num(deadlines, nan=np.inf)), axis=1, initial=np.inf)
+    deadline_score = DEADLINE_WEIGHT * np.exp(-nearest / DEADLINE_SCALE_DAYS)
+
+    age = (today - parse_dates(data['approved_on'].fillna(''))).dt.days.to_numpy(dtype=float)
+    recent_score = RECENT_WEIGHT * np.exp(-np.clip(np.nan_to_num(age, nan=np.inf), 0, None) / RECENT_SCALE_DAYS)
+
+    settled = data['status'].fillna('').str.contains(SETTLED_STATUS, case=False, regex=True).to_numpy()
+    new = data['reg_no'].isna().to_numpy()
+    score = (deadline_score + recent_score) * np.where(settled, SETTLED_FACTOR, 1.0)
+    score = np.where(new, NEW_TERM_SCORE, score)
+
+    reason = np.select(
+        [new, settled, score < 0.01, deadline_score >= recent_score],
+        ['not scraped yet', 'settled status', 'no dates nearby', 'deadline near'],
+        default='recently approved',
+    )
+    result = pd.DataFrame({'term': data['term'], 'score': score.round(3), 'reason': reason})
+    return result.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def prioritize_terms(terms, snapshot_csv='new_data_.csv', today=None):
+    """
+    `terms` reordered by priority_scores(), highest first.
+    """
+    return priority_scores(terms, snapshot_csv, today)['term'].tolist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order search terms by how likely their project changed.")
+    parser.add_argument('--terms', default='newDa.csv', help="Search terms, one per row (default: newDa.csv)")
+    parser.add_argument('--snapshot', default='new_data_.csv', help="Previous crawl output (default: new_data_.csv)")
+    parser.add_argument('-o', '--output', default='scheduled_terms.csv',
+                        help="Ordered terms with score and reason; usable as a crawler input or queue seed")
+    args = parser.parse_args()
+
+    with open(args.terms, 'r', encoding='utf-8') as csvfile:
+        terms = [row[0].strip() for row in csv.reader(csvfile) if row and row[0].strip()]
+    scheduled = priority_scores(terms, args.snapshot)
+    scheduled.to_csv(args.output, index=False, header=False)
+    print(f"Scheduled {len(scheduled)} terms into '{args.output}': {scheduled['reason'].value_counts().to_dict()}")
@@ -0,0 +1,272 @@
+"""
+Dead-letter store for rows the scrapers failed on.
+
+Each failure is kept with everything needed to look at it, and usually to recover it,
+without going back to the portal: the search term, the row data read so far, the stage
+that failed, the exception, the page HTML (scripts removed) and a screenshot.
+
+    python dead_letter.py status
+    python dead_letter.py replay --queue work_queue.sqlite
+
+`replay` re-runs the extraction against each captured page offline. Rows whose page held
+the data are written to the recovered files; only the rest are queued for a live re-fetch.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import time
+import traceback
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from event_log import get_logger
+from fields import REQUIRED_PROJECT_DETAIL_FIELDS, PROJECT_FIELDNAMES, INVENTORY_SECTIONS, INFRASTRUCTURE_SECTIONS
+
+logger = get_logger("dead_letter")
+
+
+def _jsonable(value):
+    # Row objects from records.py inside project_data
+    return value.to_dict() if hasattr(value, 'to_dict') else str(value)
+
+
+class DeadLetterStore:
+    """
+    Failures indexed in SQLite, with their page captures stored as files next to it.
+    """
+
+    def __init__(self, root="dead_letters"):
+        self.root = root
+        os.makedirs(os.path.join(root, "pages"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS letters (
+                id INTEGER PRIMARY KEY,
+                created REAL NOT NULL,
+                source TEXT NOT NULL,
+                term TEXT,
+                reg_no TEXT,
+                stage TEXT NOT NULL,
+                error_type TEXT,
+                error TEXT,
+                record TEXT,
+                url TEXT,
+                html_path TEXT,
+                screenshot_path TEXT,
+                status TEXT NOT NULL DEFAULT 'new'
+            )
+        """)
+        if 'reg_no' not in {row['name'] for row in self.conn.execute("PRAGMA table_info(letters)")}:
+            self.conn.execute("ALTER TABLE letters ADD COLUMN reg_no TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS letters_status ON letters (status, source)")
+        self._open_terms = {row[0] for row in self.conn.execute("SELECT DISTINCT term FROM letters WHERE status = 'new'")}
+
+    def capture(self, driver, source, term, stage, error=None, record=None, reg_no=None):
+        """
+        Store one failure. Capturing never raises: a browser too broken to give its page
+        source or a screenshot still gets a letter, just without those files.
+
+        :param source: Scraper the row came from ('reraall' or 'inventory').
+        :param term: Search term the failure happened under.
+        :param stage: Step that failed, e.g. 'details_tab', 'project_details', 'row', 'search'.
+        :param record: Row data read before the failure (table_data / project_data).
+        :param reg_no: Registration number of the failed row; None for failures of the whole
+            term, such as its search.
+        """
+        letter_id = self.conn.execute(
+            "INSERT INTO letters (created, source, term, reg_no, stage, error_type, error, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), source, term, reg_no, stage, type(error).__name__ if error else None,
+             ''.join(traceback.format_exception_only(type(error), error)).strip() if error else None,
+             json.dumps(record, default=_jsonable, ensure_ascii=False) if record else None),
+        ).lastrowid
+        url = html_path = screenshot_path = None
+        try:
+            from session_archive import SCRIPT_RE
+            url = driver.current_url
+            html_path = os.path.join(self.root, "pages", f"{letter_id}.html")
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(SCRIPT_RE.sub('', driver.page_source))
+            screenshot_path = os.path.join(self.root, "pages", f"{letter_id}.png")
+            if not driver.get_screenshot_as_file(screenshot_path):
+                screenshot_path = None
+        except (WebDriverException, OSError) as e:
+            logger.warning("Could not capture the page of dead letter %s: %s", letter_id, e)
+        self.conn.execute(
+            "UPDATE letters SET url = ?, html_path = ?, screenshot_path = ? WHERE id = ?",
+            (url, html_path if html_path and os.path.exists(html_path) else None, screenshot_path, letter_id),
+        )
+        self._open_terms.add(term)
+        logger.info("Dead letter %s: %s failed at '%s'.", letter_id, reg_no or term, stage,
+                    extra={"fields": {"term": term, "reg_no": reg_no, "stage": stage, "dead_letter": letter_id}})
+        return letter_id
+
+    def resolve(self, term, reg_no=None):
+        """
+        Mark the open letters of one row resolved, e.g. after a retry scraped it after all,
+        together with the term's own letters (a scraped row shows its search worked). Letters
+        of the term's other rows stay open. Without reg_no only the term's own letters are resolved.
+        """
+        if term in self._open_terms:
+            self.conn.execute(
+                "UPDATE letters SET status = 'resolved' WHERE term = ? AND status = 'new' AND (reg_no IS NULL OR reg_no = ?)",
+                (term, reg_no))
+            if not self.conn.execute("SELECT 1 FROM letters WHERE term = ? AND status = 'new' LIMIT 1", (term,)).fetchone():
+                self._open_terms.discard(term)
+
+    def pending(self, source=None):
+        query = "SELECT * FROM letters WHERE status = 'new'"
+        params = ()
+        if source:
+            query += " AND source = ?"
+            params = (source,)
+        return [dict(row) for row in self.conn.execute(query + " ORDER BY id", params)]
+
+    def mark(self, letter_ids, status):
+        self.conn.executemany("UPDATE letters SET status = ? WHERE id = ?", ((status, i) for i in letter_ids))
+
+    def counts(self):
+        """
+        Number of letters per (source, stage, status).
+        """
+        return [tuple(row) for row in self.conn.execute(
+            "SELECT source, stage, status, COUNT(*) FROM letters GROUP BY source, stage, status ORDER BY 1, 2, 3")]
+
+    def close(self):
+        self.conn.close()
+
+
+def parse_project_page(driver, letter):
+    """
+    reraall.py record from a captured details page, or None if the page lacks the details.
+    Like the live scrape, the page needs the details block open_project_details_tab waits
+    for, and every field of REQUIRED_PROJECT_DETAIL_FIELDS; one stray value is not enough.
+    """
+    from reraall import extract_additional_fields
+
+    if not driver.find_elements(By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p'):
+        return None
+    details = extract_additional_fields(driver)
+    if not all(details.get(name) for name in REQUIRED_PROJECT_DETAIL_FIELDS):
+        return None
+    record = json.loads(letter['record']) if letter['record'] else {'reg_no': letter['reg_no'] or letter['term']}
+    record.update(details)
+    return record
+
+
+def parse_inventory_page(driver, letter):
+    """
+    inventory.py entry from a captured details page, or None if the page lacks the tables.
+    """
+    from inventory import extract_inventories, extract_infrastructure
+    from records import ProjectInventory
+
+    project_data = json.loads(letter['record']) if letter['record'] else {"Rera ID": letter['term']}
+    extract_inventories(driver, project_data)
+    extract_infrastructure(driver, project_data)
+    if not any(project_data.get(name) for name in INVENTORY_SECTIONS + INFRASTRUCTURE_SECTIONS):
+        return None
+    return ProjectInventory.from_dict(project_data).to_dict()
+
+
+PAGE_PARSERS = {'reraall': parse_project_page, 'inventory': parse_inventory_page}
+
+
+def replay_dead_letters(root="dead_letters", recovered_csv="recovered_projects.csv",
+                        recovered_json="recovered_inventory.json", queue_db=None, requeue_csv="requeue_terms.csv"):
+    """
+    Recover open dead letters from their captured pages, without the portal.
+
+    Recovered reraall rows are appended to recovered_csv and inventory entries added to the
+    ones already in recovered_json. The terms that still need a live fetch are re-queued in the WorkQueue
+    at queue_db if given, otherwise written to requeue_csv (usable as a crawler input).
+    """
+    from session_archive import replay_chrome_options
+
+    store = DeadLetterStore(root)
+    letters = store.pending()
+    recovered = {source: [] for source in PAGE_PARSERS}
+    recovered_ids, requeue_ids, requeue_terms = [], [], []
+    driver = webdriver.Chrome(options=replay_chrome_options()) if any(l['html_path'] for l in letters) else None
+    try:
+        for letter in letters:
+            result = None
+            parser = PAGE_PARSERS.get(letter['source'])
+            if parser and letter['html_path'] and os.path.exists(letter['html_path']):
+                driver.get(Path(letter['html_path']).resolve().as_uri())
+                try:
+                    result = parser(driver, letter)
+                except WebDriverException as e:
+                    logger.warning("Offline parse of dead letter %s failed: %s", letter['id'], e)
+            if result is not None:
+                recovered[letter['source']].append(result)
+                recovered_ids.append(letter['id'])
+            else:
+                requeue_ids.append(letter['id'])
+                if letter['term'] and letter['term'] not in requeue_terms:
+                    requeue_terms.append(letter['term'])
+    finally:
+        if driver:
+            driver.quit()
+
+    if recovered['reraall']:
+        write_header = not os.path.exists(recovered_csv) or os.path.getsize(recovered_csv) == 0
+        with open(recovered_csv, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=PROJECT_FIELDNAMES, extrasaction='ignore')
+            if write_header:
+                writer.writeheader()
+            writer.writerows(recovered['reraall'])
+    if recovered['inventory']:
+        # Keep the entries of earlier replays
+        entries = []
+        if os.path.exists(recovered_json):
+            with open(recovered_json, 'r', encoding='utf-8') as json_file:
+                entries = json.load(json_file)
+        with open(recovered_json + '.tmp', 'w', encoding='utf-8') as json_file:
+            json.dump(entries + recovered['inventory'], json_file, indent=4)
+        os.replace(recovered_json + '.tmp', recovered_json)
+
+    if requeue_terms:
+        if queue_db:
+            from work_queue import open_queue
+            queue = open_queue(queue_db)
+            queue.requeue(requeue_terms)
+            queue.close()
+        else:
+            with open(requeue_csv, 'w', newline='', encoding='utf-8') as csvfile:
+                csv.writer(csvfile).writerows([term] for term in requeue_terms)
+
+    store.mark(recovered_ids, 'recovered')
+    store.mark(requeue_ids, 'requeued')
+    store.close()
+    logger.info("Recovered %s of %s dead letters offline; %s terms need a live fetch (%s).", len(recovered_ids),
+                len(letters), len(requeue_terms), queue_db or requeue_csv)
+    return recovered_ids, requeue_terms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and recover rows the scrapers failed on.")
+    parser.add_argument('--root', default='dead_letters', help="Dead-letter directory (default: dead_letters)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help="Count letters per source, stage and status")
+    replay = subparsers.add_parser('replay', help="Re-run extraction on the captured pages offline")
+    replay.add_argument('--csv', default='recovered_projects.csv', help="Where recovered reraall rows are appended")
+    replay.add_argument('--json', default='recovered_inventory.json', help="Where recovered inventory entries are added")
+    replay.add_argument('--queue', help="Work queue (SQLite file or postgresql:// URL) to re-queue unrecoverable terms in")
+    replay.add_argument('--requeue-csv', default='requeue_terms.csv', help="Otherwise, write those terms here")
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        store = DeadLetterStore(args.root)
+        for source, stage, status, count in store.counts():
+            print(f"{source:<10} {stage:<16} {status:<10} {count}")
+        store.close()
+    else:
+        replay_dead_letters(args.root, args.csv, args.json, args.queue, args.requeue_csv)
@@ -0,0 +1,139 @@
+import csv
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import urllib3
+
+from event_log import get_logger
+
+logger = get_logger("documents")
+
+# Columns of 'new_data_.csv' that hold links to certificate / order documents
+DOCUMENT_COLUMNS = ['certificate', 'covid_certificate', 'renewed_certificate', 'further_extension_order']
+
+MANIFEST_FIELDS = ['reg_no', 'column', 'url', 'sha256', 'path']
+
+
+def iter_document_links(csv_file, columns=DOCUMENT_COLUMNS):
+    """
+    Yield (reg_no, column, url) for every document link in a scraped CSV file.
+    Cells that only hold link text (no URL) are skipped.
+    """
+    with open(csv_file, 'r', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            for column in columns:
+                url = (row.get(column) or '').strip()
+                if url.startswith('http'):
+                    yield row['reg_no'], column, url
+
+
+def read_manifest(manifest_path):
+    """
+    Return the set of URLs already stored according to the manifest.
+    """
+    if not os.path.exists(manifest_path):
+        return set()
+    with open(manifest_path, 'r', encoding='utf-8') as csvfile:
+        return set(row['url'] for row in csv.DictReader(csvfile))
+
+
+def fetch_to_partial(http, url, part_path, chunk_size=64 * 1024):
+    """
+    Download url into part_path, resuming from the bytes already there when the server
+    supports range requests.
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    response = http.request('GET', url, headers=headers, preload_content=False)
+    try:
+        if response.status == 416:
+            # Requested range starts at the end: the partial file is already complete
+            return
+        if response.status not in (200, 206):
+            raise IOError(f"HTTP {response.status} for {url}")
+        mode = 'ab' if response.status == 206 else 'wb'  # 200 means the server ignored Range
+        with open(part_path, mode) as part:
+            for chunk in response.stream(chunk_size):
+                part.write(chunk)
+    finally:
+        response.release_conn()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_documents(links, dest_dir='documents', workers=8):
+    """
+    Download document links concurrently over a shared connection pool.
+
+    Files are stored once per content hash under dest_dir/<sha256[:2]>/<sha256>.pdf, and
+    dest_dir/manifest.csv maps every (reg_no, column, url) to its file. URLs already in the
+    manifest are skipped, and interrupted downloads resume from dest_dir/.partial.
+
+    :param links: Iterable of (reg_no, column, url), e.g. from iter_document_links.
+    :param dest_dir: Directory the documents and manifest are written to.
+    :param workers: Number of concurrent downloads (and pooled connections per host).
+    :return: Number of documents newly recorded in the manifest.
+    """
+    partial_dir = os.path.join(dest_dir, '.partial')
+    os.makedirs(partial_dir, exist_ok=True)
+    manifest_path = os.path.join(dest_dir, 'manifest.csv')
+    done_urls = read_manifest(manifest_path)
+    manifest_lock = threading.Lock()
+
+    pending = {}
+    for reg_no, column, url in links:
+        if url not in done_urls and url not in pending:
+            pending[url] = (reg_no, column)
+    logger.info("%s documents to download, %s already stored.", len(pending), len(done_urls))
+
+    http = urllib3.PoolManager(
+        maxsize=workers,
+        block=True,
+        retries=urllib3.Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504]),
+        timeout=urllib3.Timeout(connect=10, read=60),
+    )
+
+    def download(url):
+        reg_no, column = pending[url]
+        part_path = os.path.join(partial_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.part')
+        fetch_to_partial(http, url, part_path)
+        sha256 = file_sha256(part_path)
+        final_path = os.path.join(dest_dir, sha256[:2], sha256 + '.pdf')
+        if os.path.exists(final_path):
+            os.remove(part_path)  # Same content already stored under another URL
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            shutil.move(part_path, final_path)
+        with manifest_lock:
+            write_header = not os.path.exists(manifest_path)
+            with open(manifest_path, 'a', newline='', encoding='utf-8') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=MANIFEST_FIELDS)
+                if write_header:
+                    writer.writeheader()
+                writer.writerow({'reg_no': reg_no, 'column': column, 'url': url,
+                                 'sha256': sha256, 'path': os.path.relpath(final_path, dest_dir)})
+
+    downloaded = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(download, url): url for url in pending}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                downloaded += 1
+            except Exception as e:
+                logger.warning("Failed to download '%s': %s", futures[future], e)
+    logger.info("Downloaded %s of %s documents into '%s'.", downloaded, len(pending), dest_dir)
+    return downloaded
+
+
+if __name__ == "__main__":
+    download_documents(iter_document_links('new_data_.csv'))
@@ -0,0 +1,143 @@
+import os
+
+from selenium.common.exceptions import WebDriverException
+
+from event_log import get_logger
+
+logger = get_logger("driver_health")
+
+
+def _children(pid):
+    """
+    Direct child pids of a process, from /proc (Linux only).
+    """
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+            return [int(child) for child in f.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def browser_rss_mb(driver):
+    """
+    Summed resident memory (MB) of chromedriver and every Chrome process below it, or None
+    where /proc is not available. Shared pages are counted once per process, so this
+    overstates real usage; it is only compared against a threshold.
+    """
+    try:
+        root = driver.service.process.pid
+    except AttributeError:
+        return None
+    if not os.path.exists(f"/proc/{root}/status"):
+        return None
+    total, pending = 0, [root]
+    while pending:
+        pid = pending.pop()
+        total += _rss_kb(pid)
+        pending.extend(_children(pid))
+    return total / 1024
+
+
+class DriverLifecycle:
+    """
+    Keeps one Chrome driver for as long as it stays healthy.
+
+    The browser is replaced only when its process tree uses more than max_rss_mb, it has
+    more than max_windows windows open (detail windows that were never closed), it has
+    served max_pages detail pages, or max_error_streak operations in a row failed. After a
+    replacement, `restore(driver)` (if given) brings the new browser back to the search
+    state, e.g. the district search.
+
+        lifecycle = DriverLifecycle(lambda: create_chrome_driver(options), restore=...)
+        driver = lifecycle.start()
+        ...
+        lifecycle.page_served(); lifecycle.record_success() / lifecycle.record_error()
+        driver = lifecycle.ensure_healthy()
+    """
+
+    def __init__(self, factory, restore=None, max_rss_mb=1500, max_windows=4, max_pages=400, max_error_streak=5):
+        self.factory = factory
+        self.restore = restore
+        self.max_rss_mb = max_rss_mb
+        self.max_windows = max_windows
+        self.max_pages = max_pages
+        self.max_error_streak = max_error_streak
+        self.driver = None
+        self.pages = 0
+        self.error_streak = 0
+        self.recycles = 0
+
+    def start(self):
+        self.driver = self.factory()
+        self.pages = 0
+        self.error_streak = 0
+        if self.restore and not self.restore(self.driver):
+            # Not usable as is; replace it again at the next check
+            logger.warning("Could not restore the search state in the new browser.")
+            self.error_streak = self.max_error_streak
+        return self.driver
+
+    def page_served(self, count=1):
+        self.pages += count
+
+    def record_success(self):
+        self.error_streak = 0
+
+    def record_error(self):
+        self.error_streak += 1
+
+    def unhealthy_reason(self):
+        """
+        Why the current driver should be replaced, or None while it is healthy.
+        """
+        if self.error_streak >= self.max_error_streak:
+            return f"{self.error_streak} errors in a row"
+        if self.pages >= self.max_pages:
+            return f"{self.pages} pages served"
+        try:
+            windows = len(self.driver.window_handles)
+        except WebDriverException:
+            return "browser not responding"
+        if windows > self.max_windows:
+            return f"{windows} windows open"
+        rss = browser_rss_mb(self.driver)
+        if rss is not None and rss > self.max_rss_mb:
+            return f"{rss:.0f} MB resident"
+        return None
+
+    def ensure_healthy(self):
+        """
+        Return the current driver, replacing it first if it crossed a threshold.
+        """
+        if self.driver is None:
+            return self.start()
+        reason = self.unhealthy_reason()
+        if reason:
+            self.recycle(reason)
+        return self.driver
+
+    def recycle(self, reason):
+        logger.info("Recycling the browser after %s pages: %s.", self.pages, reason,
+                    extra={"fields": {"reason": reason, "pages": self.pages}})
+        self.quit()
+        self.recycles += 1
+        return self.start()
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+            self.driver = None
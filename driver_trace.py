@@ -0,0 +1,133 @@
+"""
+Opt-in tracing of WebDriver commands.
+
+Every Selenium call that talks to chromedriver (find_element, .text, get_attribute,
+execute_script, click, window switches, the polls inside WebDriverWait, ...) goes through
+driver.execute(). DriverTracer wraps that method on one driver instance, times each command
+and attributes it to the line in our scripts that caused it and to the record being scraped.
+
+    tracer = DriverTracer(driver)
+    tracer.set_record(term)
+    ...
+    tracer.save('driver_trace.json')
+
+    python driver_trace.py driver_trace.json --top 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+SETUP_RECORD = '(setup)'
+
+
+def call_site(frame):
+    """
+    'file.py:line function' of the first caller outside Selenium and this module.
+    """
+    here = os.path.abspath(__file__)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if f'{os.sep}selenium{os.sep}' not in filename and os.path.abspath(filename) != here:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return '(unknown)'
+
+
+class DriverTracer:
+    """
+    Counts and times the WebDriver commands of one driver by call site and by record.
+    """
+
+    def __init__(self, driver):
+        self.record = SETUP_RECORD
+        self.started = time.perf_counter()
+        # (call site, command) -> [calls, seconds]
+        self.sites = defaultdict(lambda: [0, 0.0])
+        # record -> [calls, seconds]
+        self.records = defaultdict(lambda: [0, 0.0])
+        self.attach(driver)
+
+    def attach(self, driver):
+        """
+        Trace `driver` from now on, e.g. a replacement browser; the counts keep accumulating.
+        """
+        self.driver = driver
+        self._execute = driver.execute
+        driver.execute = self._traced_execute
+
+    def _traced_execute(self, driver_command, params=None):
+        started = time.perf_counter()
+        try:
+            return self._execute(driver_command, params)
+        finally:
+            elapsed = time.perf_counter() - started
+            site = self.sites[(call_site(sys._getframe(1)), driver_command)]
+            site[0] += 1
+            site[1] += elapsed
+            record = self.records[self.record]
+            record[0] += 1
+            record[1] += elapsed
+
+    def set_record(self, key):
+        """
+        Attribute the following commands to `key` (e.g. the RERA ID being scraped).
+        """
+        self.record = key or SETUP_RECORD
+
+    def detach(self):
+        self.driver.execute = self._execute
+
+    def to_dict(self):
+        return {
+            'wall_seconds': round(time.perf_counter() - self.started, 3),
+            'sites': [
+                {'site': site, 'command': command, 'calls': calls, 'seconds': round(seconds, 6)}
+                for (site, command), (calls, seconds) in sorted(self.sites.items(), key=lambda item: -item[1][1])
+            ],
+            'records': {key: {'calls': calls, 'seconds': round(seconds, 6)} for key, (calls, seconds) in self.records.items()},
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+
+def format_report(trace, top=20):
+    """
+    Text report of a trace dict: the top call sites by total time, then per-record totals.
+    """
+    sites = trace['sites']
+    total_calls = sum(site['calls'] for site in sites)
+    total_seconds = sum(site['seconds'] for site in sites)
+    lines = [
+        f"{total_calls} WebDriver commands, {total_seconds:.1f} s of {trace['wall_seconds']:.1f} s wall time",
+        "",
+        f"{'total s':>9} {'share':>6} {'calls':>8} {'mean ms':>8}  command / call site",
+    ]
+    for site in sorted(sites, key=lambda s: -s['seconds'])[:top]:
+        share = site['seconds'] / total_seconds if total_seconds else 0
+        lines.append(f"{site['seconds']:9.2f} {share:6.1%} {site['calls']:8d} "
+                     f"{site['seconds'] / site['calls'] * 1000:8.1f}  {site['command']:<24} {site['site']}")
+
+    records = {key: value for key, value in trace['records'].items() if key != SETUP_RECORD}
+    if records:
+        calls = sorted(value['calls'] for value in records.values())
+        seconds = sum(value['seconds'] for value in records.values())
+        lines += [
+            "",
+            f"{len(records)} records: {sum(calls) / len(calls):.0f} round trips and "
+            f"{seconds / len(records):.2f} s per record on average (median {calls[len(calls) // 2]}, max {calls[-1]} round trips)",
+        ]
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise a WebDriver command trace.")
+    parser.add_argument('trace', help="JSON file written by DriverTracer.save()")
+    parser.add_argument('--top', type=int, default=20, help="Number of call sites to show")
+    args = parser.parse_args()
+    with open(args.trace, 'r', encoding='utf-8') as f:
+        print(format_report(json.load(f), args.top))
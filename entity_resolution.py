@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Tokens that do not help tell promoters apart
+LEGAL_TOKENS = {
+    'm', 's', 'ms', 'the', 'pvt', 'prv', 'private', 'ltd', 'limited', 'llp', 'inc', 'co',
+    'company', 'corp', 'corporation', 'and', 'of',
+}
+
+
+def normalize_name(name):
+    """
+    Canonical form of a promoter name: lowercase ASCII words without punctuation or legal
+    suffixes, e.g. 'M/s. Prestige Estates Pvt. Ltd.' -> 'prestige estates'.
+    """
+    name = str(name).lower().replace('&', ' and ')
+    tokens = re.findall(r'[a-z0-9]+', name)
+    return ' '.join(token for token in tokens if token not in LEGAL_TOKENS)
+
+
+def trigrams(name):
+    padded = f'  {name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def build_blocks(names, max_block_size=500):
+    """
+    Group name positions by shared tokens and shared 4-letter token prefixes (which still
+    match when a spelling differs later in the word). Keys found in more than max_block_size
+    names (e.g. 'developers') are too common to be useful and do not form a block.
+    """
+    blocks = defaultdict(list)
+    for i, name in enumerate(names):
+        keys = set()
+        for token in name.split():
+            if len(token) > 1:
+                keys.add(token)
+                keys.add(token[:4] + '*')
+        for key in keys:
+            blocks[key].append(i)
+    return [members for members in blocks.values() if 1 < len(members) <= max_block_size]
+
+
+def block_similarity(names):
+    """
+    Cosine similarity of the character-trigram sets of all names in a block, as one matrix product.
+    """
+    grams = [trigrams(name) for name in names]
+    vocabulary = {gram: j for j, gram in enumerate(set().union(*grams))}
+    matrix = np.zeros((len(names), len(vocabulary)), dtype=np.float32)
+    for i, name_grams in enumerate(grams):
+        matrix[i, [vocabulary[gram] for gram in name_grams]] = 1.0
+    norms = np.sqrt(matrix.sum(axis=1))
+    norms[norms == 0] = 1.0
+    unit = matrix / norms[:, None]
+    return unit @ unit.T
+
+
+def stable_id(canonical_name):
+    return 'PROM-' + hashlib.sha1(canonical_name.encode('utf-8')).hexdigest()[:10].upper()
+
+
+def resolve_names(raw_names, threshold=0.8, max_block_size=500, previous_ids=None):
+    """
+    Cluster promoter name spellings and assign each a promoter ID.
+
+    :param raw_names: Iterable of promoter names as scraped.
+    :param threshold: Minimum trigram cosine similarity for two names to be merged.
+    :param max_block_size: Largest token block that is compared pairwise.
+    :param previous_ids: Optional {normalized name: promoter_id} from an earlier run; a cluster
+        containing any of those names keeps its earlier ID.
+    :return: {normalized name: promoter_id}
+    """
+    names = sorted({normalize_name(name) for name in raw_names} - {''})
+    union_find = UnionFind(len(names))
+    for members in build_blocks(names, max_block_size):
+        similarity = block_similarity([names[i] for i in members])
+        rows, cols = np.nonzero(np.triu(similarity >= threshold, k=1))
+        for r, c in zip(rows, cols):
+            union_find.union(members[r], members[c])
+
+    clusters = defaultdict(list)
+    for i, name in enumerate(names):
+        clusters[union_find.find(i)].append(name)
+
+    previous_ids = previous_ids or {}
+    ids = {}
+    for members in clusters.values():
+        earlier = sorted(previous_ids[name] for name in members if name in previous_ids)
+        # Reuse the earlier ID most members had (the smallest on a tie, so reruns agree);
+        # otherwise derive one from the cluster's first name
+        promoter_id = max(sorted(set(earlier)), key=earlier.count) if earlier else stable_id(min(members))
+        for name in members:
+            ids[name] = promoter_id
+    return ids
+
+
+def resolve_promoters(csv_file='new_data_.csv', output_csv='new_data_promoters.csv',
+                      mapping_csv='promoter_ids.csv', threshold=0.8):
+    """
+    Attach a `promoter_id` column to a scraped CSV.
+
+    The name-to-ID mapping is kept in mapping_csv, and IDs found there are reused on the
+    next run so they stay stable as new spellings appear.
+    """
+    data = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+    previous_ids = {}
+    if os.path.exists(mapping_csv):
+        mapping = pd.read_csv(mapping_csv, dtype=str, keep_default_na=False)
+        previous_ids = dict(zip(mapping['normalized_name'], mapping['promoter_id']))
+
+    ids = resolve_names(data['promoter_name'], threshold=threshold, previous_ids=previous_ids)
+    normalized = data['promoter_name'].map(normalize_name)
+    data['promoter_id'] = normalized.map(ids).fillna('')
+    data.to_csv(output_csv, index=False)
+
+    previous_ids.update(ids)
+    pd.DataFrame(sorted(previous_ids.items()), columns=['normalized_name', 'promoter_id']).to_csv(mapping_csv, index=False)
+    print(f"Resolved {normalized.nunique()} promoter spellings into {len(set(ids.values()))} promoters. "
+          f"Written to '{output_csv}'.")
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Attach stable promoter IDs to scraped projects.")
+    parser.add_argument('--csv', default='new_data_.csv', help="Scraped projects (default: new_data_.csv)")
+    parser.add_argument('-o', '--output', default='new_data_promoters.csv')
+    parser.add_argument('--mapping', default='promoter_ids.csv', help="Persistent name-to-ID mapping")
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+    resolve_promoters(args.csv, args.output, args.mapping, args.threshold)
@@ -0,0 +1,119 @@
+"""
+Structured, buffered logging for the scrapers.
+
+Every log call puts its record on an in-memory queue; a background listener thread formats
+the records and writes them as JSON lines, so the scraping loop never waits on terminal or
+disk I/O. Records below the configured level are dropped before any formatting happens.
+
+Level and destinations come from configure_logging() or the environment:
+    RERA_LOG_LEVEL   DEBUG / INFO / WARNING (default WARNING, i.e. quiet)
+    RERA_LOG_FILE    JSON-lines event log (default 'rera_events.jsonl')
+    RERA_LOG_CONSOLE set to 1 to also print human-readable lines to stderr
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+ROOT_LOGGER = "rera"
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: timestamp, level, logger, message and any `fields` passed
+    through `extra={"fields": {...}}`.
+    """
+
+    def format(self, record):
+        event = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            event.update(fields)
+        if record.exc_info:
+            event['exception'] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records untouched. The stock QueueHandler formats the message on the calling
+    thread to make records picklable; the queue here never leaves the process, so that work
+    is left to the listener thread.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure_logging(level=None, log_file=None, console=None):
+    """
+    Set up the queue-backed handlers once per process; later calls only change the level.
+    """
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    level = level or os.environ.get('RERA_LOG_LEVEL', 'WARNING')
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    if _listener is not None:
+        return root
+
+    log_file = log_file or os.environ.get('RERA_LOG_FILE', 'rera_events.jsonl')
+    if console is None:
+        console = os.environ.get('RERA_LOG_CONSOLE') == '1'
+
+    file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        handlers.append(console_handler)
+
+    records = queue.SimpleQueue()
+    root.addHandler(DeferredQueueHandler(records))
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return root
+
+
+def shutdown_logging():
+    """
+    Flush the queue and stop the background writer.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name):
+    """
+    Return a logger under the 'rera' hierarchy, configuring logging on first use.
+    """
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def read_events(log_file='rera_events.jsonl', level=None, **match):
+    """
+    Yield the events of a JSON-lines log, optionally only those at `level` and whose fields
+    equal the given values, e.g. read_events(reg_no='PRM/KA/RERA/...').
+    """
+    with open(log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            event = json.loads(line)
+            if level and event['level'] != level:
+                continue
+            if all(event.get(key) == value for key, value in match.items()):
+                yield event
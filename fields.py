@@ -0,0 +1,81 @@
+"""
+Output fields of the scrapers and the page section each one is read from.
+
+Used to work out which parts of the portal a run has to visit when only a
+subset of the fields is requested.
+"""
+
+# Columns of the `approvedTable` search results (no detail page needed)
+LIST_TABLE_FIELDS = [
+    's_no', 'ack_no', 'reg_no', 'promoter_name', 'project_name',
+    'status', 'district', 'taluk', 'approved_on', 'proposed_completion_date',
+    'covid_extension_date', 'section_6_extension_date', 'further_extension_date',
+    'certificate', 'covid_certificate', 'renewed_certificate', 'further_extension_order',
+    'complaints_litigation'
+]
+
+# Fields read from the 'Project Details' tab by reraall.py
+PROJECT_DETAIL_FIELDS = [
+    'project_sub_type', 'latitude', 'longitude', 'total_area',
+    'open_area', 'units', 'ProjectAddress', 'ProjectStatus', 'ProjectStartDate',
+    'ProjectEndDate', 'ProjectCost', 'ProjectCarpetArea', 'WaterSource', 'OtherWaterSource',
+    'OpenParking', 'CoveredParking', 'LandCost', 'PlinthArea', 'ApprovingAuth',
+    'type_of_inventory', 'no_of_inventory'
+]
+
+# Details every loaded 'Project Details' tab shows; a page without them did not load
+REQUIRED_PROJECT_DETAIL_FIELDS = ['ProjectStatus', 'ProjectStartDate', 'ProjectEndDate']
+
+# Column order of 'new_data_.csv'
+PROJECT_FIELDNAMES = [
+    's_no', 'ack_no', 'reg_no', 'promoter_name', 'project_name',
+    'status', 'district', 'taluk', 'approved_on', 'proposed_completion_date',
+    'covid_extension_date', 'section_6_extension_date', 'further_extension_date',
+    'certificate', 'covid_certificate', 'renewed_certificate', 'further_extension_order',
+    'complaints_litigation', 'project_sub_type', 'latitude', 'longitude', 'total_area',
+    'open_area', 'units', 'ProjectAddress', 'ProjectStatus', 'ProjectStartDate',
+    'ProjectEndDate', 'ProjectCost', 'ProjectCarpetArea', 'WaterSource', 'OtherWaterSource',
+    'OpenParking', 'CoveredParking', 'LandCost', 'PlinthArea', 'ApprovingAuth',
+    'type_of_inventory', 'no_of_inventory'
+]
+
+# Keys of the per-project entries written by inventory.py / inventory2.py
+INVENTORY_LIST_FIELDS = ["Rera ID", "Project Name"]
+INVENTORY_SECTIONS = ["Inventories"]
+INFRASTRUCTURE_SECTIONS = ["Internal Infrastructure", "External Infrastructure", "Amenities"]
+INVENTORY_FIELDNAMES = INVENTORY_LIST_FIELDS + INVENTORY_SECTIONS + INFRASTRUCTURE_SECTIONS
+
+
+def select_project_fields(fields):
+    """
+    Validate a field selection for reraall.py and return it in 'new_data_.csv' column order.
+    `reg_no` is always kept since it identifies the record. None selects every field.
+    """
+    if fields is None:
+        return list(PROJECT_FIELDNAMES)
+    unknown = set(fields) - set(PROJECT_FIELDNAMES)
+    if unknown:
+        raise ValueError(f"Unknown fields: {sorted(unknown)}")
+    selected = set(fields) | {'reg_no'}
+    return [name for name in PROJECT_FIELDNAMES if name in selected]
+
+
+def needs_project_details(fields):
+    """
+    Whether any of the selected reraall.py fields requires visiting the detail page.
+    """
+    return any(name in PROJECT_DETAIL_FIELDS for name in select_project_fields(fields))
+
+
+def select_inventory_fields(fields):
+    """
+    Validate a field selection for inventory.py / inventory2.py and return it in output order.
+    "Rera ID" is always kept. None selects every field.
+    """
+    if fields is None:
+        return list(INVENTORY_FIELDNAMES)
+    unknown = set(fields) - set(INVENTORY_FIELDNAMES)
+    if unknown:
+        raise ValueError(f"Unknown fields: {sorted(unknown)}")
+    selected = set(fields) | {"Rera ID"}
+    return [name for name in INVENTORY_FIELDNAMES if name in selected]
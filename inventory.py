@@ -1,7 +1,9 @@
 import csv
 import json
+import logging
 import time
 import os
+from collections import deque
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -16,6 +18,18 @@ from selenium.common.exceptions import (
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
 
+from adaptive_timeout import AdaptiveTimeout
+from browser_profile import create_chrome_driver
+from dead_letter import DeadLetterStore
+from driver_trace import DriverTracer
+from fields import select_inventory_fields, INFRASTRUCTURE_SECTIONS
+from event_log import get_logger
+from network_capture import enable_network_capture
+from records import InventoryRow, InfrastructureRow, ProjectInventory
+from session_archive import ArchiveServer, SessionRecorder
+
+logger = get_logger("inventory")
+
 # Install lettuce_webdriver
 try:
     import lettuce_webdriver
@@ -32,7 +46,132 @@ def set_input_value(driver, element, value):
     driver.execute_script("arguments[0].dispatchEvent(new Event('change'));", element)
     driver.execute_script("arguments[0].dispatchEvent(new Event('input'));", element)
 
-def extract_outputData(serial_no, input_csv, output_json):
+def extract_inventories(driver, project_data):
+    """
+    Read the 'Development Details ( Bifurcation of Type of Inventories/Flats/Villas )' table
+    of the current details page into project_data["Inventories"].
+    """
+    # Locate the <h1> element with the specific nested <span>
+    try:
+        # Find the <h1> parent element
+        h1_element = driver.find_element(By.XPATH, "//h1[contains(text(), 'Development') and ./span[text()=' Details ( Bifurcation of Type of Inventories/Flats/Villas )']]")
+        logger.debug("Found the inventories heading.")
+
+        # Locate the parent wrapper (e.g., inner_wrapper)
+        wrapper = h1_element.find_element(By.XPATH, "./ancestor::div[contains(@class, 'inner_wrapper')]")
+
+        # Locate the first table inside this wrapper
+        target_table = wrapper.find_element(By.TAG_NAME, "table")
+
+        # Extract rows from the table's <tbody>
+        inventory_rows = target_table.find_elements(By.XPATH,  "//table[@class='table table-bordered table-striped table-condensed']/tbody/tr")
+        # for tower_row in tower_rows:)
+        inventories = []
+        # Reading .text is a WebDriver round trip per cell; only pay for it when it is logged
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        for inv_row in inventory_rows:
+            cells = inv_row.find_elements(By.TAG_NAME, "td")
+            if debug:
+                logger.debug("Inventory row cells: %s", [cell.text for cell in cells])
+            
+             # Check for 'Tower Name' in the first cell and break the loop if found
+            if len(cells) > 0 and cells[0].text.strip() == "Tower Name":
+                logger.debug("Reached the tower table; inventory rows end here.")
+                break 
+
+            if len(cells) >= 6:
+                inventory_data = InventoryRow(
+                    sl_no=cells[0].text.strip(),
+                    type_of_inventory=cells[1].text.strip(),
+                    no_of_inventory=cells[2].text.strip(),
+                    carpet_area=cells[3].text.strip(),
+                    balcony_area=cells[4].text.strip(),
+                    terrace_area=cells[5].text.strip(),
+                )
+              
+                inventories.append(inventory_data)
+            else:
+                logger.debug("Skipping inventory row with %s cells.", len(cells))
+
+        # Store the extracted data
+        project_data["Inventories"] = inventories
+
+        logger.debug("Extracted %s inventory rows for %s.", len(inventories), project_data.get("Rera ID"))
+
+    except Exception as e:
+        logger.warning("Could not read inventories of %s: %s", project_data.get("Rera ID"), e)
+
+def extract_infrastructure(driver, project_data):
+    """
+    Read the Internal Infrastructure, External Infrastructure and Amenities rows of the current
+    details page into project_data. The three lists share one table; a row with Sl No "1"
+    starts the next section.
+    """
+    current_section = "Internal Infrastructure"
+    section_data = []
+    # Find rows in the table
+    rows = driver.find_elements(By.XPATH, '//h1[contains(text(), "Internal Infrastructure")]/following-sibling::div/following-sibling::table[@class="table table-bordered table-striped table-condensed"]/tbody/tr')
+
+    # Iterate through rows
+    for row in rows:
+        cells = row.find_elements(By.TAG_NAME, 'td')
+        if len(cells) >= 3:
+            sl_no = cells[0].text.strip()
+            
+            # Check if Sl No is "1" and handle section transition
+            if sl_no == "1" and section_data:
+                # Add the completed section data to the project_data dictionary
+                project_data[current_section] = section_data
+                section_data = []  # Reset for the next section
+                
+                # Update the section header dynamically
+                if current_section == "Internal Infrastructure":
+                    current_section = "External Infrastructure"
+                elif current_section == "External Infrastructure":
+                    current_section = "Amenities"
+            
+            # Collect row data
+            row_data = InfrastructureRow(
+                sl_no=sl_no,
+                work=cells[1].text.strip(),
+                is_applicable=cells[2].text.strip(),
+            )
+            section_data.append(row_data)
+
+    # Add the last section data to the project_data
+    if section_data:
+        project_data[current_section] = section_data
+
+def extract_outputData(serial_no, input_csv, output_json, fields=None, profile_worker=None, record_archive=None,
+                       trace_file=None, dead_letters=None, replay_archive=None):
+    """
+    Crawl inventory and infrastructure details for the search terms in input_csv.
+
+    :param serial_no: 1-based row of input_csv to start from.
+    :param input_csv: CSV file with one RERA registration number per row.
+    :param output_json: JSON file the project entries are written to.
+    :param fields: Optional list of keys to keep ("Rera ID", "Project Name", "Inventories",
+        "Internal Infrastructure", "External Infrastructure", "Amenities"). Sections that were
+        not asked for are not parsed, and the detail page is skipped when none are needed.
+    :param profile_worker: Optional worker id whose persistent Chrome profile and disk cache
+        are reused between runs.
+    :param record_archive: Optional path of a JSON-lines archive that every request/response
+        of the session, and the DOM of every parsed details page, is recorded to, for offline
+        replays with session_archive.py.
+    :param replay_archive: Optional archive recorded earlier; the browser is then served from
+        it instead of the portal.
+    :param trace_file: Optional JSON file that a per-call-site timing of every WebDriver command
+        is saved to (see driver_trace.py).
+    :param dead_letters: Optional directory of a dead-letter store that failed rows are
+        captured to with their page HTML and a screenshot (see dead_letter.py).
+
+    Page waits adapt to the latencies seen so far (see adaptive_timeout.py), and terms whose
+    pages timed out are retried at the end with a longer budget.
+    """
+    selected_fields = select_inventory_fields(fields)
+    visit_infrastructure = any(name in INFRASTRUCTURE_SECTIONS for name in selected_fields)
+    visit_details = "Inventories" in selected_fields or visit_infrastructure
     outputData= []  # Move inside function to avoid global variable
     chrome_options = Options()
     chrome_options.add_argument("--disable-gpu")
@@ -43,9 +182,18 @@ def extract_outputData(serial_no, input_csv, output_json):
     chrome_options.add_argument("--disable-infobars")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+    if record_archive:
+        enable_network_capture(chrome_options)
+    archive_server = ArchiveServer(replay_archive) if replay_archive else None
+    if archive_server:
+        archive_server.configure(chrome_options)
     
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = create_chrome_driver(chrome_options, profile_worker)
     wait = WebDriverWait(driver, 20)
+    recorder = SessionRecorder(driver, record_archive) if record_archive else None
+    tracer = DriverTracer(driver) if trace_file else None
+    timeouts = AdaptiveTimeout()
+    dead_letter_store = DeadLetterStore(dead_letters) if dead_letters else None
 
     try:
         driver.get("https://rera.karnataka.gov.in/viewAllProjects")
@@ -104,8 +252,23 @@ def extract_outputData(serial_no, input_csv, output_json):
             print(f"The file '{input_csv}' was not found.")
             return
 
-        for term in search_terms:
+        pending_terms = deque((term, 0) for term in search_terms)
+        # (term, attempt) already queued, so a term with several failed rows is retried once
+        queued_retries = set()
+        # (term, row reg_no) already in outputData; a retried term only redoes its failed rows
+        done_rows = set()
+
+        def retry_later(term, attempt):
+            if timeouts.can_retry(attempt) and (term, attempt + 1) not in queued_retries:
+                queued_retries.add((term, attempt + 1))
+                pending_terms.append((term, attempt + 1))
+                print(f"Will retry '{term}' with a longer timeout.")
+
+        while pending_terms:
+            term, attempt = pending_terms.popleft()
             print(f"\nProcessing search term: '{term}'")
+            if tracer:
+                tracer.set_record(term)
             try:
                 search_bar = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="search"]')))
                 driver.execute_script("arguments[0].scrollIntoView(true);", search_bar)
@@ -115,10 +278,14 @@ def extract_outputData(serial_no, input_csv, output_json):
                 print(f"Entered '{term}' into search bar and pressed Enter.")
 
                 try:
-                    wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
+                    timeouts.until(driver, 'results_table',
+                                   EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')), attempt)
                     print("Search results table loaded.")
                 except TimeoutException:
                     print(f"Search results for '{term}' did not load in time.")
+                    retry_later(term, attempt)
+                    if dead_letter_store:
+                        dead_letter_store.capture(driver, 'inventory', term, 'results_table')
                     continue
 
                 rows = driver.find_elements(By.XPATH, '//table[@id="approvedTable"]/tbody/tr')
@@ -127,19 +294,28 @@ def extract_outputData(serial_no, input_csv, output_json):
                     continue
       
                 for row in rows:
+                    project_data = {"Rera ID": term}
+                    reg_no = None
                     try:
                         cells = row.find_elements(By.TAG_NAME, 'td')
                         if len(cells) < 5:
                             print(f"Row skipped due to insufficient data: {cells}")
                             continue
                         
+                        reg_no = cells[2].text.strip()
+                        row_key = (term, reg_no)
+                        if row_key in done_rows:
+                            continue
                         project_data = {
                             "Rera ID": term,
                             "Project Name": cells[4].text.strip() if len(cells) > 4 else "N/A",   
                         }
 
-                  
-                       
+                        if not visit_details:
+                            # Only list-table fields were requested
+                            outputData.append(ProjectInventory.from_dict({k: v for k, v in project_data.items() if k in selected_fields}))
+                            done_rows.add(row_key)
+                            continue
 
                         icon = row.find_element(By.XPATH, './/i[@class="fa fa-files-o" and @style="font-size:30px;color:#3948B1"]')
                         driver.execute_script("arguments[0].scrollIntoView(true);", icon)
@@ -161,13 +337,16 @@ def extract_outputData(serial_no, input_csv, output_json):
                                     break
 
                         try:
-                            project_details_tab = wait.until(EC.element_to_be_clickable(
-                                (By.XPATH, '//a[contains(text(),"Project Details")]')))
+                            project_details_tab = timeouts.until(driver, 'details_tab', EC.element_to_be_clickable(
+                                (By.XPATH, '//a[contains(text(),"Project Details")]')), attempt)
                             driver.execute_script("arguments[0].scrollIntoView(true);", project_details_tab)
                             project_details_tab.click()
                             print("Clicked on 'Project Details' tab.")
                         except TimeoutException:
                             print("Project Details tab not found, skipping this record.")
+                            retry_later(term, attempt)
+                            if dead_letter_store:
+                                dead_letter_store.capture(driver, 'inventory', term, 'details_tab', record=project_data, reg_no=reg_no)
                             if len(driver.window_handles) > 1:
                                 driver.close()
                                 driver.switch_to.window(original_window)
@@ -175,13 +354,17 @@ def extract_outputData(serial_no, input_csv, output_json):
                                 driver.back()
                             continue
 
+                        # Read before the wait, which records a timeout as a sample
+                        budget = timeouts.timeout('project_details', attempt)
                         try:
-                            wait_short = WebDriverWait(driver, 5)
-                            wait_short.until(EC.presence_of_all_elements_located(
-                                (By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p')))
+                            timeouts.until(driver, 'project_details', EC.presence_of_all_elements_located(
+                                (By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p')), attempt)
                             print("Project details loaded.")
                         except TimeoutException:
-                            print("Project details not found within 5 seconds. Skipping this record.")
+                            print(f"Project details not found within {budget:.1f} seconds. Skipping this record.")
+                            retry_later(term, attempt)
+                            if dead_letter_store:
+                                dead_letter_store.capture(driver, 'inventory', term, 'project_details', record=project_data, reg_no=reg_no)
                             if len(driver.window_handles) > 1:
                                 driver.close()
                                 driver.switch_to.window(original_window)
@@ -190,61 +373,14 @@ def extract_outputData(serial_no, input_csv, output_json):
                             continue
 
                     
+                        if recorder:
+                            recorder.record_page(term, project_name=project_data["Project Name"])
+
                         # Extract Inventory Data
                     
 
-                        # Locate the <h1> element with the specific nested <span>
-                        try:
-                            # Find the <h1> parent element
-                            h1_element = driver.find_element(By.XPATH, "//h1[contains(text(), 'Development') and ./span[text()=' Details ( Bifurcation of Type of Inventories/Flats/Villas )']]")
-                            print("Found the target <h1> element with nested <span>.")
-                            print("Text content of <h1>:", h1_element.text)
-
-                            # Locate the parent wrapper (e.g., inner_wrapper)
-                            wrapper = h1_element.find_element(By.XPATH, "./ancestor::div[contains(@class, 'inner_wrapper')]")
-                            print("Found the parent 'inner_wrapper'.")
-
-                            # Locate the first table inside this wrapper
-                            target_table = wrapper.find_element(By.TAG_NAME, "table")
-                            print("Found the first table inside the target wrapper.")
-
-                            # Extract rows from the table's <tbody>
-                            inventory_rows = target_table.find_elements(By.XPATH,  "//table[@class='table table-bordered table-striped table-condensed']/tbody/tr")
-                        # for tower_row in tower_rows:)
-                            inventories = []
-
-                            for inv_row in inventory_rows:
-                                print(f"Processing row: {inv_row.text}")
-                                cells = inv_row.find_elements(By.TAG_NAME, "td")
-                                print(f"Row cells: {[cell.text for cell in cells]}")
-                                
-                                 # Check for 'Tower Name' in the first cell and break the loop if found
-                                if len(cells) > 0 and cells[0].text.strip() == "Tower Name":
-                                    print("Encountered 'Tower Name'. Breaking the loop and continuing with the next operation.")
-                                    break 
-
-                                if len(cells) >= 6:
-                                    inventory_data = {
-                                        "Sl No": cells[0].text.strip(),
-                                        "Type of Inventory": cells[1].text.strip(),
-                                        "No. of Inventory": cells[2].text.strip(),
-                                        "Carpet Area (Sq Mtr)": cells[3].text.strip(),
-                                        "Area of exclusive balcony/verandah (Sq Mtr)": cells[4].text.strip(),
-                                        "Area of exclusive open Terrace (Sq Mtr)": cells[5].text.strip(),
-                                    }
-                                  
-                                    inventories.append(inventory_data)
-                                else:
-                                    print(f"Skipping inventory row due to insufficient cells: {len(cells)}")
-
-                            # Store the extracted data
-                            project_data["Inventories"] = inventories
-
-                            # Log the final data
-                            print("Extracted Inventory Data:", project_data)
-
-                        except Exception as e:
-                            print(f"Error: {e}")
+                        if "Inventories" in selected_fields:
+                            extract_inventories(driver, project_data)
 
 
 
@@ -283,40 +419,8 @@ def extract_outputData(serial_no, input_csv, output_json):
                        # Initialize variables
                        # Initialize variables
                    
-                        current_section = "Internal Infrastructure"
-                        section_data = []
-                        # Find rows in the table
-                        rows = driver.find_elements(By.XPATH, '//h1[contains(text(), "Internal Infrastructure")]/following-sibling::div/following-sibling::table[@class="table table-bordered table-striped table-condensed"]/tbody/tr')
-
-                        # Iterate through rows
-                        for row in rows:
-                            cells = row.find_elements(By.TAG_NAME, 'td')
-                            if len(cells) >= 3:
-                                sl_no = cells[0].text.strip()
-                                
-                                # Check if Sl No is "1" and handle section transition
-                                if sl_no == "1" and section_data:
-                                    # Add the completed section data to the project_data dictionary
-                                    project_data[current_section] = section_data
-                                    section_data = []  # Reset for the next section
-                                    
-                                    # Update the section header dynamically
-                                    if current_section == "Internal Infrastructure":
-                                        current_section = "External Infrastructure"
-                                    elif current_section == "External Infrastructure":
-                                        current_section = "Amenities"
-                                
-                                # Collect row data
-                                row_data = {
-                                    "Sl No": sl_no,
-                                    "Work": cells[1].text.strip(),
-                                    "Is Applicable": cells[2].text.strip(),
-                                }
-                                section_data.append(row_data)
-
-                        # Add the last section data to the project_data
-                        if section_data:
-                            project_data[current_section] = section_data
+                        if visit_infrastructure:
+                            extract_infrastructure(driver, project_data)
 
 
 
@@ -352,7 +456,10 @@ def extract_outputData(serial_no, input_csv, output_json):
                             #         amenities.append(amenities_data)
                             #         project_data["Amenities"] = amenities
 
-                        outputData.append(project_data)
+                        outputData.append(ProjectInventory.from_dict({k: v for k, v in project_data.items() if k in selected_fields}))
+                        done_rows.add(row_key)
+                        if dead_letter_store:
+                            dead_letter_store.resolve(term, reg_no)
 
                         # Close the new tab and switch back to the original window
                         if len(driver.window_handles) > 1:
@@ -360,6 +467,8 @@ def extract_outputData(serial_no, input_csv, output_json):
                             driver.switch_to.window(original_window)
                     except Exception as e:
                         print(f"Error processing row: {e}")
+                        if dead_letter_store:
+                            dead_letter_store.capture(driver, 'inventory', term, 'row', e, project_data, reg_no)
                         if len(driver.window_handles) > 1:
                             driver.close()
                             driver.switch_to.window(original_window)
@@ -367,14 +476,27 @@ def extract_outputData(serial_no, input_csv, output_json):
 
             except Exception as e:
                 print(f"Error processing term '{term}': {e}")
+                if dead_letter_store:
+                    dead_letter_store.capture(driver, 'inventory', term, 'search', e)
                 continue
 
     finally:
+        print(f"Page wait latencies: {timeouts.summary()}")
+        if tracer:
+            tracer.detach()
+            tracer.save(trace_file)
+            print(f"Driver trace saved to '{trace_file}'.")
+        if recorder:
+            recorder.close()
         driver.quit()
+        if archive_server:
+            archive_server.close()
+        if dead_letter_store:
+            dead_letter_store.close()
 
         # Save all project data to JSON
         with open(output_json, 'w', encoding='utf-8') as json_file:
-            json.dump(outputData, json_file, indent=4)
+            json.dump([project.to_dict() for project in outputData], json_file, indent=4)
         print(f"Data saved to {output_json}")
 
 if __name__ == "__main__":
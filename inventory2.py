@@ -16,14 +16,27 @@ from selenium.common.exceptions import (
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
 
+from browser_profile import create_chrome_driver
+from driver_health import DriverLifecycle
+from fields import select_inventory_fields, INFRASTRUCTURE_SECTIONS
+from event_log import get_logger
+from records import InventoryRow, InfrastructureRow, ProjectInventory
+from work_queue import open_queue
+
+logger = get_logger("inventory2")
+
 def set_input_value(driver, element, value):
     """Sets the value of an input field using JavaScript to bypass potential restrictions."""
     driver.execute_script("arguments[0].value = arguments[1];", element, value)
     driver.execute_script("arguments[0].dispatchEvent(new Event('change'));", element)
     driver.execute_script("arguments[0].dispatchEvent(new Event('input'));", element)
 
-def get_chrome_driver():
-    """Initialize and return a new Chrome driver with options."""
+def get_chrome_driver(profile_worker=None):
+    """Initialize and return a new Chrome driver with options.
+
+    With a profile_worker id, Chrome reuses that worker's persistent profile and disk
+    cache, so the per-term restarts no longer re-download the portal's assets.
+    """
     chrome_options = Options()
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--kiosk-printing")
@@ -33,7 +46,7 @@ def get_chrome_driver():
     chrome_options.add_argument("--disable-infobars")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-features=VizDisplayCompositor")
-    return webdriver.Chrome(options=chrome_options)
+    return create_chrome_driver(chrome_options, profile_worker)
 
 def initial_search(driver, wait):
     """Perform initial search setup for Bengaluru Urban."""
@@ -55,9 +68,50 @@ def initial_search(driver, wait):
         wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
         return True
     except Exception as e:
-        print(f"Initial search failed: {e}")
+        logger.warning("Initial search failed: %s", e)
         return False
 
+def open_search(driver):
+    """Load the portal and run the initial district search; used to restore a new browser."""
+    driver.get("https://rera.karnataka.gov.in/viewAllProjects")
+    return initial_search(driver, WebDriverWait(driver, 20))
+
+def search_ready(driver):
+    """Whether the browser shows the search results (search bar and `approvedTable`) in a
+    single window. Leftover detail windows are closed first."""
+    try:
+        windows = driver.window_handles
+        if len(windows) > 1:
+            for window in windows[1:]:
+                driver.switch_to.window(window)
+                driver.close()
+            driver.switch_to.window(windows[0])
+        return bool(driver.find_elements(By.CSS_SELECTOR, 'input[type="search"]')
+                    and driver.find_elements(By.XPATH, '//table[@id="approvedTable"]'))
+    except Exception:
+        return False
+
+def run_term(lifecycle, term, output_data, fields=None):
+    """Process one term on the lifecycle's browser and report the outcome to it.
+
+    The browser is kept between terms, so a term that left it on a details page is followed
+    by a fresh search (the lifecycle's restore, or open_search) before this one starts.
+    """
+    driver = lifecycle.ensure_healthy()
+    if not search_ready(driver):
+        logger.info("Search results not on screen; reloading the search.")
+        if not (lifecycle.restore or open_search)(driver):
+            lifecycle.record_error()
+            return 1
+    found_before = len(output_data)
+    errors = process_search_term(term, driver, WebDriverWait(driver, 20), output_data, fields)
+    lifecycle.page_served(len(output_data) - found_before + errors)
+    if errors:
+        lifecycle.record_error()
+    else:
+        lifecycle.record_success()
+    return errors
+
 def extract_inventory_data(driver, wait):
     """Extract inventory data from the current page."""
     inventories = []
@@ -71,17 +125,17 @@ def extract_inventory_data(driver, wait):
                 break
 
             if len(cells) >= 6:
-                inventory_data = {
-                    "Sl No": cells[0].text.strip(),
-                    "Type of Inventory": cells[1].text.strip(),
-                    "No. of Inventory": cells[2].text.strip(),
-                    "Carpet Area (Sq Mtr)": cells[3].text.strip(),
-                    "Area of exclusive balcony/verandah (Sq Mtr)": cells[4].text.strip(),
-                    "Area of exclusive open Terrace (Sq Mtr)": cells[5].text.strip(),
-                }
+                inventory_data = InventoryRow(
+                    sl_no=cells[0].text.strip(),
+                    type_of_inventory=cells[1].text.strip(),
+                    no_of_inventory=cells[2].text.strip(),
+                    carpet_area=cells[3].text.strip(),
+                    balcony_area=cells[4].text.strip(),
+                    terrace_area=cells[5].text.strip(),
+                )
                 inventories.append(inventory_data)
     except Exception as e:
-        print(f"Error extracting inventory data: {e}")
+        logger.warning("Error extracting inventory data: %s", e)
     return inventories
 
 def extract_infrastructure_data(driver):
@@ -116,19 +170,28 @@ def extract_infrastructure_data(driver):
                     continue
 
                 # Collect row data
-                row_data = {
-                    "Sl No": sl_no,
-                    "Work": cells[1].text.strip(),
-                    "Is Applicable": cells[2].text.strip(),
-                }
+                row_data = InfrastructureRow(
+                    sl_no=sl_no,
+                    work=cells[1].text.strip(),
+                    is_applicable=cells[2].text.strip(),
+                )
                 sections[current_section].append(row_data)
                 processed_sl_no.add(sl_no)  # Mark this "Sl No" as processed
     except Exception as e:
-        print(f"Error extracting infrastructure data: {e}")
+        logger.warning("Error extracting infrastructure data: %s", e)
     return sections
 
-def process_search_term(term, driver, wait, output_data):
-    """Process a single search term and return the extracted data."""
+def process_search_term(term, driver, wait, output_data, fields=None):
+    """Process a single search term and append the extracted data to output_data.
+
+    Only the sections named in `fields` are parsed; the details page is not opened
+    when the list table covers all of them.
+    Returns the number of rows (or 1 for the whole term) that failed.
+    """
+    errors = 0
+    selected_fields = select_inventory_fields(fields)
+    visit_infrastructure = any(name in INFRASTRUCTURE_SECTIONS for name in selected_fields)
+    visit_details = "Inventories" in selected_fields or visit_infrastructure
     try:
         search_bar = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="search"]')))
         driver.execute_script("arguments[0].scrollIntoView(true);", search_bar)
@@ -140,8 +203,8 @@ def process_search_term(term, driver, wait, output_data):
         rows = driver.find_elements(By.XPATH, '//table[@id="approvedTable"]/tbody/tr')
         
         if not rows:
-            print(f"No data found for search term '{term}'.")
-            return
+            logger.warning("No data found for search term '%s'.", term)
+            return errors
         
         for row in rows:
             try:
@@ -154,6 +217,10 @@ def process_search_term(term, driver, wait, output_data):
                     "Project Name": cells[4].text.strip() if len(cells) > 4 else "N/A",
                 }
                 
+                if not visit_details:
+                    output_data.append(ProjectInventory.from_dict({k: v for k, v in project_data.items() if k in selected_fields}))
+                    continue
+                
                 # Click on details icon
                 icon = row.find_element(By.XPATH, './/i[@class="fa fa-files-o" and @style="font-size:30px;color:#3948B1"]')
                 driver.execute_script("arguments[0].scrollIntoView(true);", icon)
@@ -173,11 +240,13 @@ def process_search_term(term, driver, wait, output_data):
                 project_details_tab.click()
                 
                 # Extract data
-                project_data["Inventories"] = extract_inventory_data(driver, wait)
-                infrastructure_data = extract_infrastructure_data(driver)
-                project_data.update(infrastructure_data)
+                if "Inventories" in selected_fields:
+                    project_data["Inventories"] = extract_inventory_data(driver, wait)
+                if visit_infrastructure:
+                    infrastructure_data = extract_infrastructure_data(driver)
+                    project_data.update(infrastructure_data)
                 
-                output_data.append(project_data)
+                output_data.append(ProjectInventory.from_dict({k: v for k, v in project_data.items() if k in selected_fields}))
                 
                 # Close window and switch back
                 if len(driver.window_handles) > 1:
@@ -185,18 +254,26 @@ def process_search_term(term, driver, wait, output_data):
                     driver.switch_to.window(original_window)
                 
             except Exception as e:
-                print(f"Error processing row: {e}")
+                logger.warning("Error processing row of '%s': %s", term, e)
+                errors += 1
                 if len(driver.window_handles) > 1:
                     driver.close()
                     driver.switch_to.window(original_window)
                 continue
                 
     except Exception as e:
-        print(f"Error processing term '{term}': {e}")
-        return
+        logger.warning("Error processing term '%s': %s", term, e)
+        return 1
+    return errors
+
+def extract_outputData(serial_no, input_csv, output_json, fields=None, profile_worker=None):
+    """Main function to extract data for all search terms.
 
-def extract_outputData(serial_no, input_csv, output_json):
-    """Main function to extract data for all search terms."""
+    `fields` optionally limits the output keys, see fields.INVENTORY_FIELDNAMES.
+    `profile_worker` reuses that worker's persistent Chrome profile for every term.
+    One browser serves all terms and is only replaced when it degrades (see driver_health.py).
+    """
+    select_inventory_fields(fields)  # fail fast on unknown field names
     output_data = []
     
     # Read search terms
@@ -206,40 +283,78 @@ def extract_outputData(serial_no, input_csv, output_json):
             search_terms = [row[0].strip() for idx, row in enumerate(reader, start=1)
                           if idx >= serial_no and row and len(row) > 0 and row[0].strip()]
     except FileNotFoundError:
-        print(f"Input file '{input_csv}' not found.")
+        logger.error("Input file '%s' not found.", input_csv)
         return
     
-    # Process each search term with a fresh driver instance
-    for term in search_terms:
-        print(f"\nProcessing search term: '{term}'")
-        driver = None
-        try:
-            driver = get_chrome_driver()
-            wait = WebDriverWait(driver, 20)
-            
-            # Initial setup
-            driver.get("https://rera.karnataka.gov.in/viewAllProjects")
-            if not initial_search(driver, wait):
-                continue
-                
-            # Process the search term
-            process_search_term(term, driver, wait, output_data)
-            
-        except Exception as e:
-            print(f"Error during processing of term '{term}': {e}")
-        finally:
-            if driver:
-                driver.quit()
-            
-        # Save progress after each term
-        with open(output_json, 'w', encoding='utf-8') as json_file:
-            json.dump(output_data, json_file, indent=4)
-        print(f"Progress saved to {output_json} after processing term '{term}'")
-        
-        # Optional delay between terms to avoid overwhelming the server
-        time.sleep(2)
+    lifecycle = DriverLifecycle(lambda: get_chrome_driver(profile_worker), restore=open_search)
+    try:
+        for term in search_terms:
+            logger.info("Processing search term: '%s'", term)
+            try:
+                run_term(lifecycle, term, output_data, fields)
+            except Exception as e:
+                logger.warning("Error during processing of term '%s': %s", term, e)
+                lifecycle.record_error()
+
+            # Save progress after each term
+            with open(output_json, 'w', encoding='utf-8') as json_file:
+                json.dump([project.to_dict() for project in output_data], json_file, indent=4)
+            logger.info("Progress saved to %s after processing term '%s'", output_json, term)
+
+            # Optional delay between terms to avoid overwhelming the server
+            time.sleep(2)
+    finally:
+        lifecycle.quit()
     
-    print(f"Processing completed. Final data saved to {output_json}")
+    logger.info("Processing completed. Final data saved to %s", output_json)
+
+def extract_from_queue(queue_db, worker_id, lease_seconds=600, fields=None, persistent_profile=False,
+                       max_attempts=3):
+    """Worker loop that takes search terms from a shared WorkQueue instead of a CSV slice.
+
+    Run one of these per process against the same queue: a SQLite file for the workers of
+    one host, or a postgresql:// URL for workers on several hosts (see work_queue.open_queue).
+    The lease is renewed while a term runs, and terms of a worker that dies are handed out
+    again once their lease expires. A term with failed rows goes back to the queue until its
+    last attempt, which keeps the rows that did succeed. Use
+    `python work_queue.py seed newDa.csv` to fill the queue and
+    `python work_queue.py export output.json` to collect the results.
+    With persistent_profile, Chrome keeps a warm profile named after worker_id.
+    """
+    queue = open_queue(queue_db)
+    lifecycle = DriverLifecycle(lambda: get_chrome_driver(worker_id if persistent_profile else None),
+                                restore=open_search)
+    try:
+        while True:
+            term = queue.lease(worker_id, lease_seconds, max_attempts)
+            if term is None:
+                logger.info("No terms left in '%s'.", queue_db)
+                break
+            logger.info("Worker '%s' leased search term: '%s'", worker_id, term)
+            term_data = []
+            try:
+                with queue.keep_leased(term, worker_id, lease_seconds):
+                    failed = run_term(lifecycle, term, term_data, fields)
+                if failed:
+                    if queue.attempts(term) < max_attempts:
+                        logger.warning("%s rows of '%s' failed; handing the term back to the queue.", failed, term)
+                        queue.release(term, worker_id)
+                        continue
+                    logger.warning("%s rows of '%s' failed on its last attempt; keeping %s records.", failed, term, len(term_data))
+            except Exception as e:
+                logger.warning("Error during processing of term '%s': %s", term, e)
+                lifecycle.record_error()
+                queue.release(term, worker_id)
+                continue
+
+            if queue.complete(term, worker_id, [project.to_dict() for project in term_data]):
+                logger.info("Completed term '%s' with %s records.", term, len(term_data))
+            else:
+                logger.warning("Lease on '%s' expired before completion; results discarded.", term)
+            time.sleep(2)
+    finally:
+        lifecycle.quit()
+        queue.close()
 
 if __name__ == "__main__":
     extract_outputData(1, './newDa.csv', './output.json')
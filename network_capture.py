@@ -0,0 +1,236 @@
+import json
+import re
+from urllib.parse import urljoin
+
+from selenium.common.exceptions import WebDriverException
+
+from event_log import get_logger
+from fields import LIST_TABLE_FIELDS, PROJECT_DETAIL_FIELDS
+
+logger = get_logger("network_capture")
+
+# Column order of the `approvedTable` rows, as read by reraall.extract_table_data
+# (None marks columns that are not kept)
+LIST_TABLE_COLUMNS = [
+    's_no', 'ack_no', 'reg_no', None, 'promoter_name', 'project_name', 'status', 'district', 'taluk',
+    'approved_on', 'proposed_completion_date', 'covid_extension_date', 'section_6_extension_date',
+    'further_extension_date', 'certificate', 'covid_certificate', 'renewed_certificate',
+    'further_extension_order', 'complaints_litigation'
+]
+
+# Portal labels of the 'Project Details' tab, as mapped in reraall.extract_additional_fields
+DETAIL_LABELS = {
+    'Project Sub Type': 'project_sub_type',
+    'Project Status': 'ProjectStatus',
+    'Project Start Date': 'ProjectStartDate',
+    'Proposed Completion Date': 'ProjectEndDate',
+    'Total Project Cost (INR)': 'ProjectCost',
+    'Total Carpet Area of all the Floors (Sq Mtr)': 'ProjectCarpetArea',
+    'Source of Water': 'WaterSource',
+    'Others': 'OtherWaterSource',
+    'No. of Open Parking': 'OpenParking',
+    'No. of Covered Parking': 'CoveredParking',
+    'Cost of Land (INR)': 'LandCost',
+    'Total Plinth Area (Sq Mtr)': 'PlinthArea',
+    'Approving Authority': 'ApprovingAuth',
+    'Total Area Of Land (Sq Mtr)': 'total_area',
+    'Total Open Area (Sq Mtr)': 'open_area',
+    'Total Number of Inventories/Flats/Sites/Plots/Villas': 'units',
+    'Project Address': 'ProjectAddress',
+    'Latitude': 'latitude',
+    'Longitude': 'longitude',
+    'Type of Inventory': 'type_of_inventory',
+    'No of Inventory': 'no_of_inventory'
+}
+
+# List-table columns holding a document link; reraall.cell_link keeps their URL, not the link text
+LINK_FIELDS = {'certificate', 'covid_certificate', 'renewed_certificate', 'further_extension_order'}
+
+PORTAL_URL = 'https://rera.karnataka.gov.in/'
+
+TAG_RE = re.compile(r'<[^>]+>')
+HREF_RE = re.compile(r'''href\s*=\s*["']([^"']+)["']''', re.IGNORECASE)
+
+
+def normalize_key(name):
+    """
+    Reduce a field name or label to lowercase alphanumerics, so that 'project_sub_type',
+    'projectSubType' and 'Project Sub Type' all compare equal.
+    """
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+LIST_KEYS = {normalize_key(name): name for name in LIST_TABLE_FIELDS}
+LIST_KEYS.update({'regno': 'reg_no', 'registrationno': 'reg_no', 'registrationnumber': 'reg_no',
+                  'ackno': 'ack_no', 'acknowledgementno': 'ack_no', 'promoter': 'promoter_name',
+                  'projectname': 'project_name', 'projectstatus': 'status'})
+DETAIL_KEYS = {normalize_key(name): name for name in PROJECT_DETAIL_FIELDS}
+DETAIL_KEYS.update({normalize_key(label): name for label, name in DETAIL_LABELS.items()})
+
+
+def enable_network_capture(chrome_options):
+    """
+    Ask chromedriver to record Chrome DevTools Protocol network events in the performance log.
+    """
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return chrome_options
+
+
+def clean_value(value):
+    if value is None:
+        return ''
+    return TAG_RE.sub('', str(value)).strip()
+
+
+def link_value(value):
+    """
+    The URL of the first link in a cell's HTML (relative links resolved against the portal),
+    falling back to the cleaned cell text like reraall.cell_link.
+    """
+    for href in HREF_RE.findall(str(value or '')):
+        url = urljoin(PORTAL_URL, href.strip())
+        if url.startswith('http'):
+            return url
+    return clean_value(value)
+
+
+def cell_value(name, value):
+    return link_value(value) if name in LINK_FIELDS else clean_value(value)
+
+
+def find_rows(payload):
+    """
+    Return the first list of row objects (dicts or arrays) found in a JSON payload,
+    e.g. the `data` list of a DataTables response.
+    """
+    if isinstance(payload, list):
+        if payload and all(isinstance(item, (dict, list)) for item in payload):
+            return payload
+        return None
+    if isinstance(payload, dict):
+        for key in ('data', 'aaData', 'rows', 'records'):
+            if isinstance(payload.get(key), list):
+                return payload[key]
+        for value in payload.values():
+            rows = find_rows(value)
+            if rows:
+                return rows
+    return None
+
+
+def table_record(row):
+    """
+    Map one list-table row from a JSON payload onto the list-table fields.
+    Returns None if the row does not look like a project row.
+    """
+    if isinstance(row, list):
+        if len(row) < len(LIST_TABLE_COLUMNS):
+            return None
+        record = {name: cell_value(name, row[i]) for i, name in enumerate(LIST_TABLE_COLUMNS) if name}
+    else:
+        record = {name: '' for name in LIST_TABLE_FIELDS}
+        for key, value in row.items():
+            name = LIST_KEYS.get(normalize_key(key))
+            if name:
+                record[name] = cell_value(name, value)
+    return record if record.get('reg_no') else None
+
+
+def detail_fields(payload):
+    """
+    Collect the 'Project Details' fields found anywhere in a JSON payload.
+    """
+    found = {}
+
+    def walk(node):
+        if isinstance(node, dict):
+            # Label/value pairs, e.g. {"label": "Latitude", "value": "12.9"}
+            label, value = node.get('label') or node.get('name'), node.get('value')
+            if label is not None and value is not None:
+                name = DETAIL_KEYS.get(normalize_key(label))
+                if name:
+                    found[name] = clean_value(value)
+            for key, value in node.items():
+                name = DETAIL_KEYS.get(normalize_key(key))
+                if name and not isinstance(value, (dict, list)):
+                    found[name] = clean_value(value)
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(payload)
+    return found
+
+
+class NetworkCapture:
+    """
+    Reads the XHR/fetch JSON responses the portal's page scripts receive, from the CDP events
+    in chromedriver's performance log. The driver must be started with enable_network_capture.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.driver.execute_cdp_cmd('Network.enable', {})
+
+    def drain(self):
+        """
+        Return (url, payload) for every JSON response finished since the last call.
+        """
+        pending = {}
+        responses = []
+        try:
+            entries = self.driver.get_log('performance')
+        except WebDriverException as e:
+            logger.warning("Could not read performance log: %s", e)
+            return responses
+        for entry in entries:
+            message = json.loads(entry['message'])['message']
+            method, params = message.get('method'), message.get('params', {})
+            if method == 'Network.responseReceived':
+                response = params['response']
+                if params.get('type') in ('XHR', 'Fetch') or 'json' in response.get('mimeType', ''):
+                    pending[params['requestId']] = response['url']
+            elif method == 'Network.loadingFinished' and params.get('requestId') in pending:
+                url = pending.pop(params['requestId'])
+                try:
+                    body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': params['requestId']})
+                    responses.append((url, json.loads(body['body'])))
+                except (WebDriverException, ValueError, KeyError):
+                    continue  # Body evicted or not JSON
+        return responses
+
+    def reset(self):
+        """
+        Discard everything captured so far.
+        """
+        try:
+            self.driver.get_log('performance')
+        except WebDriverException:
+            pass
+
+    def table_records(self):
+        """
+        Build list-table records from the captured responses, or return an empty list if none
+        of them carried the project rows.
+        """
+        for url, payload in reversed(self.drain()):
+            rows = find_rows(payload)
+            if not rows:
+                continue
+            records = [record for record in map(table_record, rows) if record]
+            if records:
+                logger.debug("Built %s list-table records from '%s'.", len(records), url)
+                return records
+        return []
+
+    def detail_fields(self):
+        """
+        Build the 'Project Details' fields from the captured responses, or return an empty
+        dict when no captured payload carried them.
+        """
+        found = {}
+        for url, payload in self.drain():
+            found.update(detail_fields(payload))
+        return found
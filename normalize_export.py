@@ -0,0 +1,221 @@
+"""
+Export the scraped data as linked tables instead of nested JSON.
+
+'output.json' (or a JSON-lines file with one entry per line) is streamed in batches and
+split into
+
+    projects              one row per reg_no ('new_data_.csv', plus projects only in the JSON)
+    inventories           one row per inventory type        -> reg_no
+    infrastructure_items  internal and external works (kind) -> reg_no
+    amenities             one row per amenity               -> reg_no
+
+so joining inventory to the basic details is a plain merge on reg_no:
+
+    pd.read_csv('normalized/inventories.csv', dtype=str).merge(projects, on='reg_no')
+
+    python normalize_export.py --json output.json --csv new_data_.csv --out normalized --excel normalized.xlsx
+"""
+import argparse
+import json
+import os
+
+import pandas as pd
+
+from fields import PROJECT_FIELDNAMES
+from records import InventoryRow, InfrastructureRow
+
+# Section key of an 'output.json' entry -> (table, kind)
+SECTION_TABLES = {
+    "Inventories": ('inventories', None),
+    "Internal Infrastructure": ('infrastructure_items', 'internal'),
+    "External Infrastructure": ('infrastructure_items', 'external'),
+    "Amenities": ('amenities', None),
+}
+
+# Column names per table; JSON keys are renamed to the record attribute names
+INVENTORY_COLUMNS = {key: name for name, key in InventoryRow.JSON_KEYS.items()}
+INFRASTRUCTURE_COLUMNS = {key: name for name, key in InfrastructureRow.JSON_KEYS.items()}
+TABLE_COLUMNS = {
+    'inventories': ['reg_no'] + list(INVENTORY_COLUMNS.values()),
+    'infrastructure_items': ['reg_no', 'kind'] + list(INFRASTRUCTURE_COLUMNS.values()),
+    'amenities': ['reg_no'] + list(INFRASTRUCTURE_COLUMNS.values()),
+}
+
+
+def iter_inventory_entries(path, chunk_size=1 << 20):
+    """
+    Yield the entries of a JSON array file or a JSON-lines file (*.jsonl) one at a time,
+    without loading the whole file.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer, position, eof = '', 0, False
+        while True:
+            # Skip the array brackets and the separators between entries
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    return
+                buffer, position = f.read(chunk_size), 0
+                eof = not buffer
+                continue
+            try:
+                entry, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Entry cut off at the end of the chunk
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield entry
+            position = end
+
+
+def normalize_batch(entries):
+    """
+    Split a batch of 'output.json' entries into the child tables and their (reg_no,
+    project_name) pairs. Rows are exploded and flattened by pandas, not per-row loops.
+    """
+    reg_nos = pd.Series([entry.get("Rera ID") or '' for entry in entries], dtype=str)
+    tables = {}
+    for section, (table, kind) in SECTION_TABLES.items():
+        rows = pd.DataFrame({'reg_no': reg_nos, 'row': [entry.get(section) or [] for entry in entries]})
+        rows = rows.explode('row').dropna(subset=['row'])
+        flat = pd.json_normalize(rows['row'].tolist())
+        flat = flat.rename(columns=INVENTORY_COLUMNS if table == 'inventories' else INFRASTRUCTURE_COLUMNS)
+        flat.insert(0, 'reg_no', rows['reg_no'].to_numpy())
+        if kind:
+            flat.insert(1, 'kind', kind)
+        tables.setdefault(table, []).append(flat)
+    tables = {table: pd.concat(frames, ignore_index=True).reindex(columns=TABLE_COLUMNS[table])
+              .fillna('').astype(str) for table, frames in tables.items()}
+    projects = pd.DataFrame({'reg_no': reg_nos, 'project_name': [entry.get("Project Name") or '' for entry in entries]})
+    return tables, projects
+
+
+class TableWriter:
+    """
+    Appends batches of one table to its CSV and/or Parquet file.
+    """
+
+    def __init__(self, out_dir, table, columns, formats):
+        self.csv_path = os.path.join(out_dir, f"{table}.csv") if 'csv' in formats else None
+        self.parquet_path = os.path.join(out_dir, f"{table}.parquet") if 'parquet' in formats else None
+        self.columns = columns
+        self.rows = 0
+        self._csv_header = True
+        self._parquet = None
+        if self.parquet_path:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Writing Parquet needs pyarrow: pip install pyarrow")
+            self._schema = pa.schema([(name, pa.string()) for name in columns])
+            self._parquet = pq.ParquetWriter(self.parquet_path, self._schema)
+
+    def write(self, frame):
+        frame = frame.reindex(columns=self.columns)
+        if self.csv_path:
+            frame.to_csv(self.csv_path, mode='w' if self._csv_header else 'a', header=self._csv_header,
+                         index=False, encoding='utf-8')
+            self._csv_header = False
+        if self._parquet:
+            import pyarrow as pa
+            self._parquet.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet:
+            self._parquet.close()
+
+
+def load_projects(projects_csv):
+    """
+    Basic details with one row per reg_no (the last crawl of a project wins).
+    """
+    try:
+        projects = pd.read_csv(projects_csv, dtype=str, keep_default_na=False)
+    except FileNotFoundError:
+        print(f"The file '{projects_csv}' was not found.")
+        projects = pd.DataFrame(columns=PROJECT_FIELDNAMES, dtype=str)
+    return projects[projects['reg_no'] != ''].drop_duplicates(subset='reg_no', keep='last')
+
+
+def normalize_export(inventory_path='output.json', projects_csv='new_data_.csv', out_dir='normalized',
+                     formats=('csv',), excel=None, batch_size=5000):
+    """
+    Write the projects, inventories, infrastructure_items and amenities tables.
+
+    :param inventory_path: 'output.json' or a JSON-lines file of the same entries.
+    :param formats: Any of 'csv' and 'parquet' (needs pyarrow); one file per table in out_dir.
+    :param excel: Optional workbook path; the tables become sheets next to the projects sheet.
+    :param batch_size: Entries normalized at a time, which bounds memory for large files.
+    :return: Number of rows per table.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    writers = {table: TableWriter(out_dir, table, columns, formats) for table, columns in TABLE_COLUMNS.items()}
+    inventory_projects = []
+    batch = []
+
+    def flush():
+        tables, projects = normalize_batch(batch)
+        for table, frame in tables.items():
+            writers[table].write(frame)
+        inventory_projects.append(projects)
+        batch.clear()
+
+    try:
+        for entry in iter_inventory_entries(inventory_path):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Projects that only have inventory are added, so every child reg_no has a parent row
+    projects = load_projects(projects_csv)
+    if inventory_projects:
+        inventory_only = pd.concat(inventory_projects, ignore_index=True).drop_duplicates(subset='reg_no')
+        inventory_only = inventory_only[(inventory_only['reg_no'] != '') & ~inventory_only['reg_no'].isin(projects['reg_no'])]
+        projects = pd.concat([projects, inventory_only], ignore_index=True).fillna('')
+    project_writer = TableWriter(out_dir, 'projects', list(projects.columns), formats)
+    project_writer.write(projects)
+    project_writer.close()
+
+    counts = {'projects': project_writer.rows, **{table: writer.rows for table, writer in writers.items()}}
+    print(f"Normalized '{inventory_path}' into '{out_dir}': {counts}")
+
+    if excel:
+        from basic_details import convert_csv_to_excel
+        if 'csv' not in formats:
+            raise ValueError("The Excel export is built from the CSV tables; include 'csv' in formats.")
+        convert_csv_to_excel(
+            os.path.join(out_dir, 'projects.csv'), excel, sheet_name='projects',
+            extra_sheets={table: os.path.join(out_dir, f"{table}.csv") for table in TABLE_COLUMNS},
+        )
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize the inventory JSON into tables linked by reg_no.")
+    parser.add_argument('--json', default='output.json', help="output.json or a .jsonl file of its entries")
+    parser.add_argument('--csv', default='new_data_.csv', help="Basic details CSV for the projects table")
+    parser.add_argument('--out', default='normalized', help="Output directory (default: normalized)")
+    parser.add_argument('--formats', default='csv', help="Comma-separated: csv, parquet (needs pyarrow)")
+    parser.add_argument('--excel', help="Also write all tables as sheets of this workbook")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+    normalize_export(args.json, args.csv, args.out, args.formats.split(','), args.excel, args.batch_size)
@@ -0,0 +1,434 @@
+"""
+One entry point for the whole scrape, run as a streaming pipeline:
+
+    harvest (regno) -> crawl (reraall) -> enrich (inventory) -> export
+
+Each stage runs on its own threads (with its own browser) and hands its results to the next
+stage through a bounded queue. A registration number found on page 3 of the harvest is
+crawled while page 4 is still loading, and its record is exported as soon as it is enriched,
+so a run takes about as long as its slowest stage instead of the sum of all of them. The
+bounded queues make a fast stage wait for a slow one instead of piling up work in memory.
+
+Paths, district and stage options come from a JSON config file (see pipeline.json):
+
+    python pipeline.py --config pipeline.json
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import time
+
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+
+from adaptive_timeout import AdaptiveTimeout
+from browser_profile import create_chrome_driver
+from dead_letter import DeadLetterStore
+from driver_health import DriverLifecycle
+from event_log import get_logger
+from fields import PROJECT_FIELDNAMES
+
+logger = get_logger("pipeline")
+
+DEFAULT_CONFIG = {
+    "district": "Bengaluru Urban",
+    "queue_size": 50,
+    "headless": False,
+    "harvest": {
+        "enabled": True,
+        "workers": 2,
+        "registration_csv": "registration_numbers.csv",
+        "index_db": "registration_numbers.sqlite",
+    },
+    # The harvest only passes on registration numbers it has not seen before. To refresh
+    # known projects, disable it and the terms of input_terms are crawled instead
+    "input_terms": "newDa.csv",
+    # dead_letters: optional directory rows that failed for good are captured to (dead_letter.py)
+    "crawl": {"workers": 1, "dead_letters": None},
+    "enrich": {"enabled": True, "workers": 1, "fields": None},
+    "export": {
+        "projects_csv": "new_data_.csv",
+        "inventory_json": "output.json",
+        "excel": "basic_details.xlsx",
+        "project_index": None,
+        # Directory for the linked tables of normalize_export.py, and their formats ("parquet"
+        # needs pyarrow)
+        "normalized_dir": None,
+        "normalized_formats": ["csv"],
+        # snapshot_store.py database the changes of every published crawl are recorded in
+        "snapshot_db": None,
+    },
+    # watch_daemon.py
+    "watch": {
+        "interval_minutes": 60,
+        # Share of the interval a cycle may spend refreshing known projects
+        "budget_fraction": 0.8,
+        "min_refresh_hours": 24,
+        "status_port": 8765,
+    },
+}
+
+# Marks the end of a stage's input
+DONE = object()
+
+
+def load_config(path=None):
+    """
+    DEFAULT_CONFIG overlaid with the JSON file at `path` (one level deep for stage sections).
+    """
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        for key, value in overrides.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+    return config
+
+
+def chrome_options(headless=False):
+    options = Options()
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-infobars")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-features=VizDisplayCompositor")
+    if headless:
+        options.add_argument("--headless")
+    return options
+
+
+def browser_lifecycle(config):
+    """
+    A managed browser that is restored to the configured district search after every restart.
+    """
+    from regno import open_district_results
+
+    return DriverLifecycle(
+        lambda: create_chrome_driver(chrome_options(config["headless"])),
+        restore=lambda driver: open_district_results(driver, WebDriverWait(driver, 20), config["district"]),
+    )
+
+
+class Stage:
+    """
+    Runs `workers` threads that take items from `inbox`, pass each to a handler and put what
+    the handler emits on `outbox`. Each thread gets its own handler from make_handler()
+    (so each can own a browser); a handler may have a close() method.
+    """
+
+    def __init__(self, name, make_handler, inbox, outbox, workers=1):
+        self.name = name
+        self.make_handler = make_handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self._running = workers
+        self._input_done = False
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def _run(self):
+        handler = None
+        try:
+            handler = self.make_handler()
+            while True:
+                item = self.inbox.get()
+                if item is DONE:
+                    self._input_done = True
+                    # Let the other threads of this stage see it too
+                    self.inbox.put(DONE)
+                    break
+                try:
+                    for result in handler(item) or ():
+                        self.outbox.put(result)
+                    with self._lock:
+                        self.processed += 1
+                except Exception as e:
+                    with self._lock:
+                        self.failed += 1
+                    logger.warning("%s failed on %s: %s", self.name, item, e)
+        except Exception as e:
+            # The other workers of the stage take over the inbox
+            logger.warning("%s worker stopped: %s", self.name, e)
+        finally:
+            if handler is not None and hasattr(handler, 'close'):
+                handler.close()
+            with self._lock:
+                self._running -= 1
+                last = self._running == 0
+            if last:
+                if not self._input_done:
+                    self._drain()
+                if self.outbox is not None:
+                    self.outbox.put(DONE)
+
+    def _drain(self):
+        """
+        Count the rest of the input as failed, so the upstream stage never blocks on a full
+        queue once no worker of this stage is left.
+        """
+        dropped = 0
+        while self.inbox.get() is not DONE:
+            dropped += 1
+        self.inbox.put(DONE)
+        with self._lock:
+            self.failed += dropped
+        logger.warning("%s has no worker left; dropped %s items.", self.name, dropped)
+
+
+class CrawlHandler:
+    """
+    reraall.py's per-term scrape on a managed browser. Emits (term, ProjectRecords).
+
+    Rows whose details failed are retried with a longer timeout (only those rows) while the
+    AdaptiveTimeout allows it; rows that still fail are captured to the dead-letter store
+    if one is configured.
+    """
+
+    def __init__(self, config):
+        self.lifecycle = browser_lifecycle(config)
+        self.timeouts = AdaptiveTimeout()
+        dead_letters = config["crawl"].get("dead_letters")
+        self.dead_letters = DeadLetterStore(dead_letters) if dead_letters else None
+
+    def __call__(self, term):
+        from reraall import scrape_term
+
+        records, attempt = [], 0
+        while True:
+            driver = self.lifecycle.ensure_healthy()
+            failed = []
+            try:
+                # Only the last attempt captures dead letters; earlier failures are retried
+                scraped = scrape_term(driver, WebDriverWait(driver, 20), self.timeouts, term, attempt,
+                                      self.dead_letters if not self.timeouts.can_retry(attempt) else None,
+                                      {record.reg_no for record in records}, failed)
+            except Exception:
+                self.lifecycle.record_error()
+                if not records:
+                    raise
+                # Keep the rows scraped before the failure
+                logger.warning("'%s' failed after %s records.", term, len(records))
+                break
+            records += scraped
+            if self.dead_letters:
+                for record in scraped:
+                    self.dead_letters.resolve(term, record.reg_no)
+            self.lifecycle.page_served(len(scraped) + len(failed))
+            if not failed:
+                self.lifecycle.record_success()
+                break
+            self.lifecycle.record_error()
+            if not self.timeouts.can_retry(attempt):
+                logger.warning("Giving up on %s rows of '%s'.", len(failed), term)
+                break
+            attempt += 1
+            logger.info("Retrying %s rows of '%s' with a longer timeout.", len(failed), term)
+        return [(term, records)]
+
+    def close(self):
+        self.lifecycle.quit()
+        if self.dead_letters:
+            self.dead_letters.close()
+
+
+class EnrichHandler:
+    """
+    inventory2.py's per-term inventory scrape. Emits (term, project records, inventory entries).
+    """
+
+    def __init__(self, config):
+        self.lifecycle = browser_lifecycle(config)
+        self.fields = config["enrich"]["fields"]
+
+    def __call__(self, item):
+        from inventory2 import run_term
+
+        term, records = item
+        entries = []
+        run_term(self.lifecycle, term, entries, self.fields)
+        return [(term, records, [entry.to_dict() for entry in entries])]
+
+    def close(self):
+        self.lifecycle.quit()
+
+
+class ExportHandler:
+    """
+    The only writer of the output files: appends project rows to the CSV as they arrive and
+    writes the inventory JSON, the Excel workbook, the project index, the normalized tables
+    and the snapshot history on publish() and at the end of the run. Inventory entries of a
+    term replace that term's earlier entries in the existing JSON, so incremental runs keep
+    the rest of it; likewise publish() compacts the CSV to the last row per reg_no, so
+    repeated refreshes do not grow it.
+    """
+
+    def __init__(self, config):
+        self.config = config["export"]
+        # "Rera ID" -> entries, in first-seen order
+        self.inventory = {}
+        if os.path.exists(self.config["inventory_json"]):
+            with open(self.config["inventory_json"], 'r', encoding='utf-8') as json_file:
+                for entry in json.load(json_file):
+                    self.inventory.setdefault(entry.get("Rera ID"), []).append(entry)
+        self.inventory_changed = False
+        csv_path = self.config["projects_csv"]
+        write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        self.csvfile = open(csv_path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.csvfile, fieldnames=PROJECT_FIELDNAMES, extrasaction='ignore')
+        if write_header:
+            self.writer.writeheader()
+
+    def __call__(self, item):
+        term, records, entries = item if len(item) == 3 else (*item, [])
+        self.writer.writerows(record.to_dict() for record in records)
+        self.csvfile.flush()
+        if entries:
+            self.inventory[term] = entries
+            self.inventory_changed = True
+        logger.info("Exported '%s': %s records, %s inventory entries.", term, len(records), len(entries),
+                    extra={"fields": {"term": term}})
+
+    def compact_csv(self):
+        """
+        Rewrite the CSV with only the last row of each reg_no (in the order of those last
+        rows, so the last row stays last). Does nothing when no reg_no repeats.
+        """
+        csv_path = self.config["projects_csv"]
+        self.csvfile.flush()
+        with open(csv_path, 'r', newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            fieldnames = reader.fieldnames
+            rows, total = {}, 0
+            for total, row in enumerate(reader, start=1):
+                key = row.get('reg_no') or ('', total)
+                rows.pop(key, None)
+                rows[key] = row
+        if len(rows) == total:
+            return
+        self.csvfile.close()
+        tmp_path = csv_path + ".tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows.values())
+        os.replace(tmp_path, csv_path)
+        self.csvfile = open(csv_path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.csvfile, fieldnames=PROJECT_FIELDNAMES, extrasaction='ignore')
+        logger.info("Compacted '%s' from %s to %s rows.", csv_path, total, len(rows))
+
+    def publish(self):
+        """
+        Bring the inventory JSON, the Excel workbook and the project index up to date.
+        """
+        self.compact_csv()
+        if self.inventory_changed:
+            with open(self.config["inventory_json"], 'w', encoding='utf-8') as json_file:
+                json.dump([entry for entries in self.inventory.values() for entry in entries], json_file, indent=4)
+            self.inventory_changed = False
+        if self.config.get("excel"):
+            from basic_details import convert_csv_to_excel
+            convert_csv_to_excel(self.config["projects_csv"], self.config["excel"])
+        if self.config.get("project_index"):
+            from project_index import ProjectIndex
+            index = ProjectIndex(self.config["project_index"])
+            index.build(self.config["projects_csv"], self.config["inventory_json"])
+            index.close()
+        if self.config.get("normalized_dir"):
+            from normalize_export import normalize_export
+            normalize_export(self.config["inventory_json"], self.config["projects_csv"], self.config["normalized_dir"],
+                             self.config.get("normalized_formats") or ["csv"])
+        if self.config.get("snapshot_db"):
+            from snapshot_store import SnapshotStore
+            store = SnapshotStore(self.config["snapshot_db"])
+            store.record(self.config["projects_csv"])
+            store.close()
+
+    def close(self):
+        self.publish()
+        self.csvfile.close()
+
+
+def feed_terms(config, terms_queue):
+    """
+    Source of the pipeline: newly harvested registration numbers, or the terms of the input CSV.
+    """
+    try:
+        if config["harvest"]["enabled"]:
+            from regno import extract_registration_numbers_parallel
+
+            def enqueue(reg_nos):
+                for reg_no in reg_nos:
+                    terms_queue.put(reg_no)
+
+            harvest = config["harvest"]
+            extract_registration_numbers_parallel(
+                harvest["workers"], config["district"], csv_file_path=harvest["registration_csv"],
+                db_path=harvest["index_db"], on_new=enqueue,
+            )
+        else:
+            with open(config["input_terms"], 'r', encoding='utf-8') as csvfile:
+                for row in csv.reader(csvfile):
+                    if row and row[0].strip():
+                        terms_queue.put(row[0].strip())
+    finally:
+        terms_queue.put(DONE)
+
+
+def run_pipeline(config):
+    """
+    Run the stages concurrently until the term source is exhausted.
+    """
+    started = time.monotonic()
+    size = config["queue_size"]
+    terms_queue = queue.Queue(size)
+    crawled_queue = queue.Queue(size)
+    enriched_queue = queue.Queue(size)
+
+    stages = [Stage("crawl", lambda: CrawlHandler(config), terms_queue, crawled_queue, config["crawl"]["workers"])]
+    export_inbox = crawled_queue
+    if config["enrich"]["enabled"]:
+        stages.append(Stage("enrich", lambda: EnrichHandler(config), crawled_queue, enriched_queue, config["enrich"]["workers"]))
+        export_inbox = enriched_queue
+    stages.append(Stage("export", lambda: ExportHandler(config), export_inbox, None))
+
+    for stage in stages:
+        stage.start()
+    source = threading.Thread(target=feed_terms, args=(config, terms_queue), name="source", daemon=True)
+    source.start()
+    source.join()
+    for stage in stages:
+        stage.join()
+
+    summary = {stage.name: {'processed': stage.processed, 'failed': stage.failed} for stage in stages}
+    seconds = round(time.monotonic() - started, 1)
+    logger.info("Pipeline finished in %s s: %s", seconds, summary, extra={"fields": {"seconds": seconds, **summary}})
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run harvest, crawl, enrich and export as one streaming pipeline.")
+    parser.add_argument('--config', help="JSON config file (see pipeline.json); defaults are used for missing keys")
+    parser.add_argument('--print-config', action='store_true', help="Print the effective config and exit")
+    args = parser.parse_args()
+    config = load_config(args.config)
+    if args.print_config:
+        print(json.dumps(config, indent=4))
+    else:
+        run_pipeline(config)
@@ -0,0 +1,189 @@
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+
+from fields import PROJECT_FIELDNAMES
+
+# Columns with a secondary index for lookups and prefix searches
+SEARCH_FIELDS = ['promoter_name', 'project_name', 'taluk', 'district', 'status']
+
+# Upper bound for prefix range scans
+PREFIX_END = '\U0010ffff'
+
+# reg_nos per inventory lookup, below SQLite's default limit of 999 bound parameters
+LOOKUP_BATCH = 500
+
+# Filters of page(); each has an index on (field, reg_no) so a filtered page is one range scan
+PAGE_FIELDS = ['district', 'promoter_name', 'status']
+
+
+class ProjectIndex:
+    """
+    Persistent query index over the scraped data.
+
+    'new_data_.csv' rows go into a `projects` table keyed by reg_no, with case-insensitive
+    indexes on the SEARCH_FIELDS; 'output.json' entries go into an `inventories` table keyed
+    by the same reg_no. Lookups and prefix searches are index seeks, so they answer in
+    milliseconds without loading the files.
+    """
+
+    def __init__(self, db_path='projects.sqlite'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = ', '.join(
+            f'"{name}" TEXT PRIMARY KEY' if name == 'reg_no'
+            else f'"{name}" TEXT COLLATE NOCASE' if name in SEARCH_FIELDS
+            else f'"{name}" TEXT'
+            for name in PROJECT_FIELDNAMES
+        )
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS projects ({columns})")
+        for name in SEARCH_FIELDS:
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS projects_{name} ON projects ("{name}")')
+        for name in PAGE_FIELDS:
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS projects_{name}_reg_no ON projects ("{name}", reg_no)')
+        self.conn.execute("CREATE TABLE IF NOT EXISTS inventories (reg_no TEXT PRIMARY KEY, entries TEXT NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def build(self, csv_file='new_data_.csv', inventory_json='output.json'):
+        """
+        Rebuild the index from the scraped files in one transaction. Later rows for the same
+        reg_no win, matching how reraall.py appends re-crawled projects.
+        """
+        placeholders = ', '.join('?' for _ in PROJECT_FIELDNAMES)
+        quoted = ', '.join(f'"{name}"' for name in PROJECT_FIELDNAMES)
+        with self.conn:
+            self.conn.execute("DELETE FROM projects")
+            self.conn.execute("DELETE FROM inventories")
+            projects = 0
+            try:
+                with open(csv_file, 'r', encoding='utf-8') as csvfile:
+                    rows = ([row.get(name) or '' for name in PROJECT_FIELDNAMES]
+                            for row in csv.DictReader(csvfile) if row.get('reg_no'))
+                    for batch in iter(lambda: [row for _, row in zip(range(5000), rows)], []):
+                        self.conn.executemany(f"INSERT OR REPLACE INTO projects ({quoted}) VALUES ({placeholders})", batch)
+                        projects += len(batch)
+            except FileNotFoundError:
+                print(f"The file '{csv_file}' was not found.")
+
+            inventories = {}
+            try:
+                with open(inventory_json, 'r', encoding='utf-8') as json_file:
+                    for entry in json.load(json_file):
+                        inventories.setdefault(entry.get("Rera ID"), []).append(entry)
+            except FileNotFoundError:
+                print(f"The file '{inventory_json}' was not found.")
+            self.conn.executemany(
+                "INSERT INTO inventories (reg_no, entries) VALUES (?, ?)",
+                ((reg_no, json.dumps(entries)) for reg_no, entries in inventories.items() if reg_no),
+            )
+            self.bump_generation()
+        print(f"Indexed {projects} project rows and {len(inventories)} inventory entries into '{self.db_path}'.")
+
+    def bump_generation(self):
+        """
+        Record that the indexed data changed, so readers can invalidate cached answers.
+        """
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def generation(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _joined(self, rows):
+        # The inventories of all rows are fetched with one IN query per LOOKUP_BATCH rows
+        projects = [dict(row) for row in rows]
+        inventories = {}
+        for start in range(0, len(projects), LOOKUP_BATCH):
+            reg_nos = [project['reg_no'] for project in projects[start:start + LOOKUP_BATCH]]
+            inventories.update(self.conn.execute(
+                f"SELECT reg_no, entries FROM inventories WHERE reg_no IN ({', '.join('?' for _ in reg_nos)})",
+                reg_nos).fetchall())
+        for project in projects:
+            entries = inventories.get(project['reg_no'])
+            project['inventory'] = json.loads(entries) if entries else []
+        return projects
+
+    def get(self, reg_no):
+        """
+        Return the basic details joined with the inventory entries of one project, or None.
+        """
+        row = self.conn.execute("SELECT * FROM projects WHERE reg_no = ?", (reg_no,)).fetchone()
+        return self._joined([row])[0] if row else None
+
+    def search(self, field, value, prefix=True, limit=50):
+        """
+        Find projects whose `field` equals value, or starts with it when prefix is True
+        (case-insensitive). Returns joined basic-plus-inventory dicts.
+        """
+        if field not in SEARCH_FIELDS and field != 'reg_no':
+            raise ValueError(f"'{field}' is not indexed; use one of {['reg_no'] + SEARCH_FIELDS}")
+        if prefix:
+            # A range scan on the index; LIKE with escaping would not use it
+            query = f'SELECT * FROM projects WHERE "{field}" >= ? AND "{field}" < ? ORDER BY "{field}" LIMIT ?'
+            params = (value, value + PREFIX_END, limit)
+        else:
+            query = f'SELECT * FROM projects WHERE "{field}" = ? LIMIT ?'
+            params = (value, limit)
+        return self._joined(self.conn.execute(query, params).fetchall())
+
+    def page(self, filters=None, after=None, limit=50):
+        """
+        One page of projects ordered by reg_no, keyset-paginated: pass the last reg_no of the
+        previous page as `after`. Unlike OFFSET, every page costs the same however deep it is.
+
+        :param filters: {field: value} exact (case-insensitive) matches on PAGE_FIELDS.
+        :return: (joined project dicts, reg_no to pass as `after` for the next page or None)
+        """
+        filters = filters or {}
+        unknown = set(filters) - set(PAGE_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot filter on {sorted(unknown)}; use {PAGE_FIELDS}")
+        conditions = [f'"{field}" = ?' for field in filters]
+        params = list(filters.values())
+        if after is not None:
+            conditions.append('reg_no > ?')
+            params.append(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self.conn.execute(f"SELECT * FROM projects {where} ORDER BY reg_no LIMIT ?", params + [limit + 1]).fetchall()
+        next_after = rows[limit - 1]['reg_no'] if len(rows) > limit else None
+        return self._joined(rows[:limit]), next_after
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the local project index.")
+    parser.add_argument('--db', default='projects.sqlite', help="Index database (default: projects.sqlite)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="(Re)build the index from the scraped files")
+    build.add_argument('--csv', default='new_data_.csv')
+    build.add_argument('--json', default='output.json')
+    get = subparsers.add_parser('get', help="Look up one project by reg_no")
+    get.add_argument('reg_no')
+    search = subparsers.add_parser('search', help="Prefix search on an indexed field")
+    search.add_argument('field', choices=['reg_no'] + SEARCH_FIELDS)
+    search.add_argument('value')
+    search.add_argument('--exact', action='store_true', help="Match the whole value instead of a prefix")
+    search.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    index = ProjectIndex(args.db)
+    started = time.perf_counter()
+    if args.command == 'build':
+        index.build(args.csv, args.json)
+    elif args.command == 'get':
+        print(json.dumps(index.get(args.reg_no), indent=4))
+    else:
+        print(json.dumps(index.search(args.field, args.value, not args.exact, args.limit), indent=4))
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+    index.close()
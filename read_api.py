@@ -0,0 +1,147 @@
+"""
+Read-only HTTP API over the project index (project_index.py), so consumers fetch the
+projects they need instead of copying new_data_.csv and output.json around.
+
+    GET /projects/<reg_no>                               one project with its inventory
+    GET /projects?district=..&promoter=..&status=..      projects ordered by reg_no
+        &after=<next from the previous page>&limit=50
+
+Every response has an ETag; a request whose If-None-Match matches gets an empty 304.
+Responses are cached in memory and the cache is dropped when the index generation changes,
+i.e. when a crawl publishes a rebuilt index.
+
+    python read_api.py --db projects.sqlite --port 8080
+"""
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+from project_index import ProjectIndex
+
+# Query parameter -> indexed column
+FILTER_PARAMS = {'district': 'district', 'promoter': 'promoter_name', 'status': 'status'}
+MAX_LIMIT = 500
+
+
+class ReadApi:
+    """
+    Answers API paths from a ProjectIndex, with an LRU cache of encoded responses.
+    """
+
+    def __init__(self, db_path='projects.sqlite', cache_size=2048):
+        self.index = ProjectIndex(db_path)
+        self.cache_size = cache_size
+        # (path, sorted query) -> (status, etag, body)
+        self.cache = OrderedDict()
+        self.generation = self.index.generation()
+        # One SQLite connection, shared by the request threads
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def query(self, path, params):
+        """
+        Run one API request against the index: (HTTP status, JSON-able body).
+        """
+        parts = [unquote(part) for part in path.strip('/').split('/', 1)]
+        if parts[0] != 'projects':
+            return 404, {'error': 'Not found'}
+        if len(parts) == 2:
+            project = self.index.get(parts[1])
+            return (200, project) if project else (404, {'error': f"No project '{parts[1]}'"})
+
+        filters = {FILTER_PARAMS[name]: value for name, value in params.items() if name in FILTER_PARAMS}
+        unknown = set(params) - set(FILTER_PARAMS) - {'after', 'limit'}
+        if unknown:
+            return 400, {'error': f"Unknown parameters {sorted(unknown)}"}
+        try:
+            limit = min(max(int(params.get('limit', 50)), 1), MAX_LIMIT)
+        except ValueError:
+            return 400, {'error': "limit must be a number"}
+        items, next_after = self.index.page(filters, params.get('after'), limit)
+        return 200, {'items': items, 'next': next_after}
+
+    def respond(self, path, params):
+        """
+        (status, ETag, body bytes) for a request, from the cache while the index is unchanged.
+        """
+        key = (path, tuple(sorted(params.items())))
+        with self.lock:
+            generation = self.index.generation()
+            if generation != self.generation:
+                self.cache.clear()
+                self.generation = generation
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            status, data = self.query(path, params)
+
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        response = (status, f'"{generation}-{hashlib.sha1(body).hexdigest()[:16]}"', body)
+        with self.lock:
+            # Not cached if the index changed while the body was encoded
+            if generation == self.generation:
+                self.cache[key] = response
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return response
+
+    def close(self):
+        self.index.close()
+
+
+class ReadApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, etag, body = self.server.api.respond(url.path, dict(parse_qsl(url.query)))
+        if status == 200 and etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(db_path='projects.sqlite', host='127.0.0.1', port=8080, cache_size=2048):
+    server = ThreadingHTTPServer((host, port), ReadApiHandler)
+    server.daemon_threads = True
+    server.api = ReadApi(db_path, cache_size)
+    print(f"Serving '{db_path}' at http://{host}:{port}/projects")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Cache: {server.api.hits} hits, {server.api.misses} misses.")
+        server.api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the project index over HTTP.")
+    parser.add_argument('--db', default='projects.sqlite', help="Index database (default: projects.sqlite)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--cache-size', type=int, default=2048, help="Number of responses kept in memory")
+    args = parser.parse_args()
+    serve(args.db, args.host, args.port, args.cache_size)
@@ -0,0 +1,116 @@
+"""
+Compact record types for scraped projects, inventory rows and infrastructure rows.
+
+All records use __slots__ (via dataclass(slots=True)), so a crawl held in memory costs a
+fixed number of pointers per record instead of a dict per project and per row. Each type
+converts to and from the dict layout of 'new_data_.csv' / 'output.json'.
+"""
+from dataclasses import dataclass, field, make_dataclass
+from typing import ClassVar
+
+from fields import PROJECT_FIELDNAMES
+
+
+def _project_to_dict(self):
+    return {name: getattr(self, name) for name in PROJECT_FIELDNAMES}
+
+
+@classmethod
+def _project_from_dict(cls, data):
+    return cls(**{name: data.get(name) or '' for name in PROJECT_FIELDNAMES})
+
+
+# One string attribute per 'new_data_.csv' column
+ProjectRecord = make_dataclass(
+    'ProjectRecord',
+    [(name, str, field(default='')) for name in PROJECT_FIELDNAMES],
+    namespace={'to_dict': _project_to_dict, 'from_dict': _project_from_dict},
+    slots=True,
+)
+ProjectRecord.__module__ = __name__
+
+
+@dataclass(slots=True)
+class InventoryRow:
+    sl_no: str = ''
+    type_of_inventory: str = ''
+    no_of_inventory: str = ''
+    carpet_area: str = ''
+    balcony_area: str = ''
+    terrace_area: str = ''
+
+    JSON_KEYS: ClassVar[dict] = {
+        'sl_no': "Sl No",
+        'type_of_inventory': "Type of Inventory",
+        'no_of_inventory': "No. of Inventory",
+        'carpet_area': "Carpet Area (Sq Mtr)",
+        'balcony_area': "Area of exclusive balcony/verandah (Sq Mtr)",
+        'terrace_area': "Area of exclusive open Terrace (Sq Mtr)",
+    }
+
+    def to_dict(self):
+        return {key: getattr(self, name) for name, key in self.JSON_KEYS.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(key, '') for name, key in cls.JSON_KEYS.items()})
+
+
+@dataclass(slots=True)
+class InfrastructureRow:
+    sl_no: str = ''
+    work: str = ''
+    is_applicable: str = ''
+
+    JSON_KEYS: ClassVar[dict] = {
+        'sl_no': "Sl No",
+        'work': "Work",
+        'is_applicable': "Is Applicable",
+    }
+
+    def to_dict(self):
+        return {key: getattr(self, name) for name, key in self.JSON_KEYS.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(key, '') for name, key in cls.JSON_KEYS.items()})
+
+
+@dataclass(slots=True)
+class ProjectInventory:
+    """
+    One 'output.json' entry. The project name and sections left as None were not selected
+    or not scraped and are omitted from the dict form, as before.
+    """
+    rera_id: str = ''
+    project_name: str = None
+    inventories: list = None
+    internal_infrastructure: list = None
+    external_infrastructure: list = None
+    amenities: list = None
+
+    SECTION_KEYS: ClassVar[dict] = {
+        'inventories': ("Inventories", InventoryRow),
+        'internal_infrastructure': ("Internal Infrastructure", InfrastructureRow),
+        'external_infrastructure': ("External Infrastructure", InfrastructureRow),
+        'amenities': ("Amenities", InfrastructureRow),
+    }
+
+    def to_dict(self):
+        data = {"Rera ID": self.rera_id}
+        if self.project_name is not None:
+            data["Project Name"] = self.project_name
+        for name, (key, row_type) in self.SECTION_KEYS.items():
+            rows = getattr(self, name)
+            if rows is not None:
+                data[key] = [row.to_dict() if isinstance(row, row_type) else row for row in rows]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls(rera_id=data.get("Rera ID", ''), project_name=data.get("Project Name"))
+        for name, (key, row_type) in cls.SECTION_KEYS.items():
+            if key in data:
+                setattr(record, name, [row if isinstance(row, row_type) else row_type.from_dict(row)
+                                       for row in data[key]])
+        return record
@@ -0,0 +1,115 @@
+import csv
+import os
+import sqlite3
+
+from event_log import get_logger
+
+logger = get_logger("regindex")
+
+
+class RegistrationIndex:
+    """
+    Persistent dedup index of registration numbers backed by SQLite.
+
+    Lookups go through the primary-key B-tree on disk, so startup cost and memory stay
+    constant no matter how many registration numbers have been harvested. The database runs
+    in WAL mode, so several harvesting processes can write to the same index at once.
+    """
+
+    def __init__(self, db_path="registration_numbers.sqlite", seed_csv=None, timeout=30):
+        """
+        :param db_path: Path of the SQLite index file.
+        :param seed_csv: Optional legacy 'registration_numbers.csv' imported the first time
+            the index is created.
+        :param timeout: Seconds to wait for a concurrent writer to release its lock.
+        """
+        self.db_path = db_path
+        self.seed_csv = seed_csv
+        self.timeout = timeout
+        self._conn = None
+
+    @property
+    def conn(self):
+        # Connect lazily so that constructing the index costs nothing
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS reg_nos (reg_no TEXT PRIMARY KEY) WITHOUT ROWID"
+            )
+            self._conn.commit()
+            if self.seed_csv:
+                self._seed_from_csv(self.seed_csv)
+        return self._conn
+
+    def seed(self):
+        """
+        Open the index now, importing seed_csv if the index is empty. Constructing the index
+        alone does not, since the connection is opened on first use.
+        """
+        return self.conn is not None
+
+    def _seed_from_csv(self, csv_path):
+        """
+        Import registration numbers from a legacy CSV file into an empty index.
+        """
+        if not os.path.exists(csv_path):
+            return
+        if self._conn.execute("SELECT 1 FROM reg_nos LIMIT 1").fetchone():
+            return
+        with open(csv_path, "r", encoding="utf-8") as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader, None)  # Skip the header row
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO reg_nos (reg_no) VALUES (?)",
+                    ((row[0],) for row in reader if row and row[0].strip()),
+                )
+        logger.info("Imported registration numbers from '%s' into '%s'.", csv_path, self.db_path)
+
+    def __contains__(self, reg_no):
+        return self.conn.execute("SELECT 1 FROM reg_nos WHERE reg_no = ?", (reg_no,)).fetchone() is not None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM reg_nos").fetchone()[0]
+
+    def add_new(self, reg_nos):
+        """
+        Insert registration numbers and return the ones that were not in the index yet.
+        Each number is checked and inserted in one statement, so concurrent writers never
+        both report the same number as new.
+        """
+        new_reg_nos = []
+        with self.conn:
+            for reg_no in reg_nos:
+                cursor = self.conn.execute("INSERT OR IGNORE INTO reg_nos (reg_no) VALUES (?)", (reg_no,))
+                if cursor.rowcount:
+                    new_reg_nos.append(reg_no)
+        return new_reg_nos
+
+    def iter_sorted(self):
+        """
+        Yield all registration numbers in sorted order.
+        """
+        for (reg_no,) in self.conn.execute("SELECT reg_no FROM reg_nos ORDER BY reg_no"):
+            yield reg_no
+
+    def export_csv(self, csv_path):
+        """
+        Write a compacted, sorted copy of the index in the 'registration_numbers.csv' layout.
+        The harvesters append new numbers to the CSV as they find them and call this when a
+        harvest finishes, so the file does not keep growing out of order.
+        """
+        tmp_path = csv_path + ".tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["reg_no"])
+            for reg_no in self.iter_sorted():
+                writer.writerow([reg_no])
+        os.replace(tmp_path, csv_path)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
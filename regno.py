@@ -1,6 +1,10 @@
+import argparse
 import csv
 import time
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -9,9 +13,16 @@ from selenium.common.exceptions import (
     NoSuchElementException,
     TimeoutException,
     ElementClickInterceptedException,
+    WebDriverException,
 )
 from selenium.webdriver.chrome.options import Options
 
+from browser_profile import create_chrome_driver
+from event_log import get_logger
+from regindex import RegistrationIndex
+
+logger = get_logger("regno")
+
 
 def set_input_value(driver, element, value):
     """
@@ -27,6 +38,7 @@ def read_saved_registration_numbers(file_path):
     """
     Reads saved registration numbers from the CSV file.
     Returns a set of registration numbers for quick lookup.
+    Large harvests should use regindex.RegistrationIndex instead, which does not load the file.
     """
     if not os.path.exists(file_path):
         return set()  # If the file doesn't exist, return an empty set
@@ -47,7 +59,11 @@ def save_registration_numbers_to_csv(file_path, registration_numbers):
             writer.writerow([reg_no])
 
 
-def extract_registration_numbers():
+def extract_registration_numbers(profile_worker=None):
+    """
+    Walk every page of the 'Bengaluru Rural' approvedTable and save unseen registration numbers.
+    Pass profile_worker to reuse that worker's persistent Chrome profile and disk cache.
+    """
     # Set Chrome options
     chrome_options = Options()
     chrome_options.add_argument("--disable-gpu")
@@ -56,42 +72,41 @@ def extract_registration_numbers():
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--headless")  # Optional: Run Chrome in headless mode
 
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = create_chrome_driver(chrome_options, profile_worker)
     wait = WebDriverWait(driver, 20)
 
     # File path for saving registration numbers
     csv_file_path = "registration_numbers.csv"
 
-    # Read previously saved registration numbers
-    saved_registration_numbers = read_saved_registration_numbers(csv_file_path)
-    print(f"Loaded {len(saved_registration_numbers)} saved registration numbers.")
+    # Dedup index of previously saved registration numbers (seeded from the CSV on first use)
+    saved_registration_numbers = RegistrationIndex("registration_numbers.sqlite", seed_csv=csv_file_path)
 
     try:
         # Navigate to the website
         URL = "https://rera.karnataka.gov.in/viewAllProjects"
         driver.get(URL)
-        print("Navigated to the main URL.")
+        logger.info("Navigated to the main URL.")
 
         # Perform the initial setup
         try:
             district_input = wait.until(EC.element_to_be_clickable((By.ID, "projectDist")))
-            print("Found 'District' input field.")
+            logger.debug("Found 'District' input field.")
             set_input_value(driver, district_input, "Bengaluru Rural")
-            print("Set district to 'Bengaluru Rural'.")
+            logger.debug("Set district to 'Bengaluru Rural'.")
 
             search_button = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "btn-style")))
             search_button.click()
-            print("Clicked the search button.")
+            logger.debug("Clicked the search button.")
         except TimeoutException as e:
-            print(f"Failed to set district or click search: {e}")
+            logger.warning("Failed to set district or click search: %s", e)
             return
 
         # Wait for the "Approved" table to load
         try:
             wait.until(EC.presence_of_element_located((By.ID, "approvedTable")))
-            print("Approved projects table loaded.")
+            logger.debug("Approved projects table loaded.")
         except TimeoutException:
-            print("Table did not load in time. Exiting.")
+            logger.warning("Table did not load in time. Exiting.")
             return
 
         # Loop through all pages to extract registration numbers
@@ -100,50 +115,228 @@ def extract_registration_numbers():
                 # Collect rows from the table
                 rows = driver.find_elements(By.XPATH, "//table[@id='approvedTable']/tbody/tr")
                 if not rows:
-                    print("No rows found on this page. Exiting pagination.")
+                    logger.warning("No rows found on this page. Exiting pagination.")
                     break
 
-                new_registration_numbers = set()
+                page_registration_numbers = []
 
                 for row in rows:
                     try:
                         reg_no = row.find_element(By.XPATH, "./td[3]").text.strip()  # Assuming column 3 has the registration number
-                        if reg_no not in saved_registration_numbers:
-                            new_registration_numbers.add(reg_no)
-                            print(f"Extracted New Registration Number: {reg_no}")
-                        else:
-                            print(f"Duplicate Registration Number Skipped: {reg_no}")
+                        page_registration_numbers.append(reg_no)
                     except NoSuchElementException:
-                        print("Could not find registration number in a row. Skipping.")
+                        logger.warning("Could not find registration number in a row. Skipping.")
+
+                # Record the page in the index; only numbers it has not seen before come back
+                new_registration_numbers = saved_registration_numbers.add_new(page_registration_numbers)
+                for reg_no in new_registration_numbers:
+                    logger.debug("Extracted new registration number.", extra={"fields": {"reg_no": reg_no}})
+                logger.info("Skipped %s duplicate registration numbers.", len(page_registration_numbers) - len(new_registration_numbers))
 
                 # Save new registration numbers to CSV immediately after processing the page
                 if new_registration_numbers:
                     save_registration_numbers_to_csv(csv_file_path, new_registration_numbers)
-                    saved_registration_numbers.update(new_registration_numbers)  # Update the saved set
-                    print(f"Saved {len(new_registration_numbers)} new registration numbers to '{csv_file_path}'.")
+                    logger.info("Saved %s new registration numbers to '%s'.", len(new_registration_numbers), csv_file_path)
 
                 # Check if the 'Next' button exists and is clickable
                 try:
                     next_button = driver.find_element(By.XPATH, "//a[@id='approvedTable_next']")
                     if "disabled" in next_button.get_attribute("class"):
-                        print("Reached the last page.")
+                        logger.info("Reached the last page.")
                         break
                     else:
                         next_button.click()
-                        print("Navigated to the next page.")
+                        logger.debug("Navigated to the next page.")
                         time.sleep(2)  # Allow time for the next page to load
                 except NoSuchElementException:
-                    print("'Next' button not found or disabled. Assuming last page.")
+                    logger.warning("'Next' button not found or disabled. Assuming last page.")
                     break
 
             except Exception as e:
-                print(f"Error during data extraction: {e}")
+                logger.warning("Error during data extraction: %s", e)
                 break
 
     finally:
         driver.quit()
-        print("Browser closed.")
+        # Replace the appended CSV with a sorted copy of the index
+        saved_registration_numbers.export_csv(csv_file_path)
+        saved_registration_numbers.close()
+        logger.info("Browser closed.")
+
+
+# DataTables API of the results table; page numbers are 0-based
+PAGE_INFO_JS = "return jQuery('#approvedTable').DataTable().page.info();"
+GO_TO_PAGE_JS = "jQuery('#approvedTable').DataTable().page(arguments[0]).draw('page');"
+PAGE_SHOWN_JS = """
+var info = jQuery('#approvedTable').DataTable().page.info();
+var processing = document.getElementById('approvedTable_processing');
+return info.page === arguments[0] && !(processing && processing.offsetParent !== null);
+"""
+# Registration numbers (column 3) of the rows on the current page, in one round trip
+PAGE_REG_NOS_JS = """
+return Array.from(document.querySelectorAll('#approvedTable tbody tr'))
+    .map(function (row) { return row.cells.length > 2 ? row.cells[2].textContent.trim() : ''; })
+    .filter(function (regNo) { return regNo; });
+"""
+
+
+def open_district_results(driver, wait, district):
+    """
+    Load the portal and search one district. Returns False if the results table did not load.
+    """
+    driver.get("https://rera.karnataka.gov.in/viewAllProjects")
+    try:
+        district_input = wait.until(EC.element_to_be_clickable((By.ID, "projectDist")))
+        set_input_value(driver, district_input, district)
+        wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "btn-style"))).click()
+        wait.until(EC.presence_of_element_located((By.ID, "approvedTable")))
+        return True
+    except TimeoutException as e:
+        logger.warning("Failed to load the results of '%s': %s", district, e)
+        return False
+
+
+def harvest_pages(driver, wait, pages, index, csv_file_path, csv_lock, on_new=None):
+    """
+    Jump straight to each page in `pages` and record its registration numbers.
+    on_new, if given, is called with each page's new registration numbers.
+    Returns the number of new registration numbers found.
+    """
+    found = 0
+    for page in pages:
+        driver.execute_script(GO_TO_PAGE_JS, page)
+        wait.until(lambda d: d.execute_script(PAGE_SHOWN_JS, page))
+        new_registration_numbers = index.add_new(driver.execute_script(PAGE_REG_NOS_JS))
+        if new_registration_numbers:
+            with csv_lock:
+                save_registration_numbers_to_csv(csv_file_path, new_registration_numbers)
+            if on_new:
+                on_new(new_registration_numbers)
+        found += len(new_registration_numbers)
+        logger.debug("Harvested page %s.", page + 1, extra={"fields": {"page": page + 1, "new": len(new_registration_numbers)}})
+    return found
+
+
+def harvest_chrome_options():
+    chrome_options = Options()
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-infobars")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--headless")
+    return chrome_options
+
+
+def extract_registration_numbers_parallel(workers=4, district="Bengaluru Rural", profile_workers=False,
+                                          csv_file_path="registration_numbers.csv", db_path="registration_numbers.sqlite",
+                                          on_new=None, max_page_retries=2):
+    """
+    Harvest the registration numbers of a district with several browsers at once.
+
+    The first browser reads the page count from the DataTables API. Each worker opens the
+    district search in its own browser and takes pages from a shared queue, jumping directly
+    to each page instead of clicking 'Next' through all the earlier ones. A page that fails
+    goes back to the queue (up to max_page_retries times) for any worker to take, and the
+    worker reloads its search before going on. New numbers go into the shared
+    RegistrationIndex (and are appended to the CSV) as they are found; at the end the CSV
+    is rewritten as a sorted copy of the index.
+
+    :param workers: Number of browsers harvesting at once.
+    :param district: District searched on the portal.
+    :param profile_workers: Give each worker its persistent Chrome profile ('regno-<n>').
+    :param on_new: Optional callback receiving each page's new registration numbers as they
+        are found (called from the worker threads).
+    :param max_page_retries: How often a failed page is handed out again.
+    """
+    started = time.monotonic()
+    csv_lock = threading.Lock()
+    # Seed the index once before the workers open their own connections to it
+    seed_index = RegistrationIndex(db_path, seed_csv=csv_file_path)
+    seed_index.seed()
+    seed_index.close()
+
+    def start_browser(worker_no):
+        # Each worker gets its own Options: profile arguments are added to the object
+        return create_chrome_driver(harvest_chrome_options(), f"regno-{worker_no}" if profile_workers else None)
+
+    first_driver = start_browser(0)
+    if not open_district_results(first_driver, WebDriverWait(first_driver, 20), district):
+        first_driver.quit()
+        return 0
+    page_count = first_driver.execute_script(PAGE_INFO_JS)['pages']
+    workers = max(1, min(workers, page_count))
+    pending_pages = deque((page, 0) for page in range(page_count))
+    pages_lock = threading.Lock()
+    failed_pages = []
+    logger.info("Harvesting %s pages of '%s' with %s workers.", page_count, district, workers)
+
+    def take_page():
+        with pages_lock:
+            return pending_pages.popleft() if pending_pages else None
+
+    def worker(worker_no, driver=None):
+        index = RegistrationIndex(db_path)
+        found = 0
+        try:
+            if driver is None:
+                driver = start_browser(worker_no)
+                if not open_district_results(driver, WebDriverWait(driver, 20), district):
+                    return 0
+            wait = WebDriverWait(driver, 20)
+            while True:
+                item = take_page()
+                if item is None:
+                    break
+                page, attempt = item
+                try:
+                    found += harvest_pages(driver, wait, [page], index, csv_file_path, csv_lock, on_new)
+                    continue
+                except (TimeoutException, WebDriverException) as e:
+                    logger.warning("Worker %s failed on page %s: %s", worker_no, page + 1, e)
+                    with pages_lock:
+                        if attempt < max_page_retries:
+                            pending_pages.append((page, attempt + 1))
+                        else:
+                            failed_pages.append(page)
+                # The page may have left the table in a bad state; start from a fresh search
+                if not open_district_results(driver, wait, district):
+                    logger.warning("Worker %s could not reload the search; leaving its pages to the others.", worker_no)
+                    break
+            return found
+        finally:
+            if driver is not None:
+                driver.quit()
+            index.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker, i, first_driver if i == 0 else None) for i in range(workers)]
+        found = 0
+        for future in futures:
+            try:
+                found += future.result()
+            except Exception as e:
+                logger.warning("A harvesting worker failed: %s", e)
+    # Pages still queued when every worker gave up
+    failed_pages.extend(page for page, _ in pending_pages)
+    if failed_pages:
+        logger.warning("%s pages could not be harvested: %s", len(failed_pages), sorted(page + 1 for page in failed_pages))
+    logger.info("Saved %s new registration numbers from %s pages in %.1f s.", found, page_count - len(failed_pages),
+                time.monotonic() - started)
+    # Replace the appended CSV with a sorted copy of the index
+    index = RegistrationIndex(db_path)
+    index.export_csv(csv_file_path)
+    index.close()
+    return found
 
 
 # Call the function
-extract_registration_numbers()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harvest registration numbers from the portal.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Browsers harvesting disjoint page ranges at once (default: 1, the page-by-page walk)")
+    parser.add_argument('--district', default="Bengaluru Rural", help="Only used with --workers > 1")
+    args = parser.parse_args()
+    if args.workers > 1:
+        extract_registration_numbers_parallel(args.workers, args.district)
+    else:
+        extract_registration_numbers()
@@ -1,6 +1,8 @@
+import argparse
 import csv
 import time
 import os
+from collections import deque
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -10,11 +12,31 @@ from selenium.common.exceptions import (
     TimeoutException,
     ElementClickInterceptedException,
     UnexpectedAlertPresentException,
-    InvalidElementStateException
+    InvalidElementStateException,
+    NoSuchWindowException,
+    WebDriverException
 )
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
 
+from adaptive_timeout import AdaptiveTimeout
+from browser_profile import create_chrome_driver
+from crawl_scheduler import prioritize_terms
+from dead_letter import DeadLetterStore
+from driver_health import DriverLifecycle
+from driver_trace import DriverTracer
+from event_log import get_logger
+from fields import PROJECT_DETAIL_FIELDS, select_project_fields, needs_project_details
+from network_capture import NetworkCapture, enable_network_capture
+from records import ProjectRecord
+
+logger = get_logger("reraall")
+
+# Seconds to wait for a clicked row to open its details in a new tab before assuming
+# the details opened in the results window itself
+NEW_TAB_WAIT = 2
+
+
 def set_input_value(driver, element, value):
     """
     Sets the value of an input field using JavaScript to bypass potential restrictions.
@@ -37,7 +59,417 @@ def get_last_processed_rera(output_file_path):
     except FileNotFoundError:
         return None
 
-def process_data_from_serial(serial_no):
+def cell_link(cell):
+    """
+    Return the URL behind a table cell's link, falling back to the cell text when there is none.
+    """
+    for link in cell.find_elements(By.TAG_NAME, 'a'):
+        href = (link.get_attribute('href') or '').strip()
+        if href.startswith('http'):
+            return href
+    return cell.text.strip()
+
+def extract_table_data(cells):
+    """
+    Build the list-table part of a project record from the cells of one `approvedTable` row.
+    """
+    return {
+        's_no': cells[0].text.strip(),
+        'ack_no': cells[1].text.strip(),
+        'reg_no': cells[2].text.strip(),
+        'promoter_name': cells[4].text.strip(),
+        'project_name': cells[5].text.strip(),
+        'status': cells[6].text.strip(),
+        'district': cells[7].text.strip(),
+        'taluk': cells[8].text.strip(),
+        'approved_on': cells[9].text.strip(),
+        'proposed_completion_date': cells[10].text.strip(),
+        'covid_extension_date': cells[11].text.strip(),
+        'section_6_extension_date': cells[12].text.strip(),
+        'further_extension_date': cells[13].text.strip(),
+        'certificate': cell_link(cells[14]),
+        'covid_certificate': cell_link(cells[15]),
+        'renewed_certificate': cell_link(cells[16]),
+        'further_extension_order': cell_link(cells[17]),
+        'complaints_litigation': cells[18].text.strip()
+    }
+
+def extract_additional_fields(driver):
+    """
+    Parse the label/value pairs of the 'Project Details' tab in the current window.
+    """
+    project_details = driver.find_elements(By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p')
+    taluk_details = driver.find_elements(By.XPATH, '//div[@class="col-md-6 col-sm-6 col-xs-6"]/p')
+    inventory_details = driver.find_elements(By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p')
+
+    # Initialize all additional fields
+    additional_fields = {
+        'project_sub_type': '',
+        'ProjectStatus': '',
+        'ProjectStartDate': '',
+        'ProjectEndDate': '',
+        'ProjectCost': '',
+        'ProjectCarpetArea': '',
+        'WaterSource': '',
+        'OtherWaterSource': '',
+        'OpenParking': '',
+        'CoveredParking': '',
+        'LandCost': '',
+        'PlinthArea': '',
+        'ApprovingAuth': '',
+        'total_area': '',
+        'open_area': '',
+        'units': '',
+        'ProjectAddress': '',
+        'taluk': '',
+        'latitude': '',
+        'longitude': '',
+        'type_of_inventory': '',
+        'no_of_inventory': ''
+    }
+
+    # Combined mapping for all fields
+    mapping = {
+        'Project Sub Type': 'project_sub_type',
+        'Project Status': 'ProjectStatus',
+        'Project Start Date': 'ProjectStartDate',
+        'Proposed Completion Date': 'ProjectEndDate',
+        'Total Project Cost (INR)': 'ProjectCost',
+        'Total Carpet Area of all the Floors (Sq Mtr)': 'ProjectCarpetArea',
+        'Source of Water': 'WaterSource',
+        'Others': 'OtherWaterSource',
+        'No. of Open Parking': 'OpenParking',
+        'No. of Covered Parking': 'CoveredParking',
+        'Cost of Land (INR)': 'LandCost',
+        'Total Plinth Area (Sq Mtr)': 'PlinthArea',
+        'Approving Authority': 'ApprovingAuth',
+        'Total Area Of Land (Sq Mtr)': 'total_area',
+        'Total Open Area (Sq Mtr)': 'open_area',
+        'Total Number of Inventories/Flats/Sites/Plots/Villas': 'units',
+        'Taluk': 'taluk',
+        'Project Address': 'ProjectAddress',
+        'Latitude': 'latitude',
+        'Longitude': 'longitude',
+        'Type of Inventory': 'type_of_inventory',
+        'No of Inventory': 'no_of_inventory'
+    }
+
+    # Parse project details
+    for i in range(len(project_details)):
+        label = project_details[i].text.strip(':').strip()
+        if i + 1 < len(project_details):
+            value = project_details[i + 1].text.strip()
+            key = mapping.get(label)
+            if key:
+                additional_fields[key] = value
+
+    for i in range(len(inventory_details)):
+        label = inventory_details[i].text.strip(':').strip()
+        logger.debug("Label: %s", label)
+        if i + 1 < len(inventory_details):
+            value = inventory_details[i + 1].text.strip()
+            key = mapping.get(label)
+            if key:
+                additional_fields[key] = value
+
+    # Parse address details
+    for i in range(len(taluk_details)):
+        label = taluk_details[i].text.strip(':').strip()
+        if i + 1 < len(taluk_details):
+            value = taluk_details[i + 1].text.strip()
+            key = mapping.get(label)
+            if key:
+                additional_fields[key] = value
+
+    return additional_fields
+
+def read_additional_fields(driver, capture=None):
+    """
+    Take the 'Project Details' fields from the captured JSON responses when a NetworkCapture
+    is given and every one of them was found there, otherwise parse them from the DOM. A
+    partial match is more likely an unrelated response that happens to share a key name.
+    """
+    if capture:
+        captured = capture.detail_fields()
+        if all(name in captured for name in PROJECT_DETAIL_FIELDS):
+            logger.info("Built %s project detail fields from captured responses.", len(captured))
+            return captured
+        if captured:
+            logger.debug("Captured responses held only %s of the project detail fields; parsing the page.", len(captured))
+    return extract_additional_fields(driver)
+
+def click_details_icon(driver, row):
+    """
+    Click the details icon of an `approvedTable` row.
+    """
+    icon = row.find_element(By.XPATH, './/i[@class="fa fa-files-o" and @style="font-size:30px;color:#3948B1"]')
+    driver.execute_script("arguments[0].scrollIntoView(true);", icon)
+    try:
+        icon.click()
+        logger.debug("Clicked on the details icon.")
+    except ElementClickInterceptedException:
+        driver.execute_script("arguments[0].click();", icon)
+        logger.debug("Clicked on the details icon using JavaScript.")
+
+def open_project_details_tab(driver, timeouts, attempt=0):
+    """
+    Click the 'Project Details' tab in the current window and wait for its fields.
+    Returns False if the tab or its fields did not show up in time.
+
+    :param timeouts: AdaptiveTimeout the waits are timed by.
+    :param attempt: Retry number of the record; retries wait longer.
+    """
+    # Use the text content of the tabs to find the correct one
+    try:
+        project_details_tab = timeouts.until(driver, 'details_tab', EC.element_to_be_clickable(
+            (By.XPATH, '//a[contains(text(),"Project Details")]')), attempt)
+        driver.execute_script("arguments[0].scrollIntoView(true);", project_details_tab)
+        project_details_tab.click()
+        logger.debug("Clicked on 'Project Details' tab.")
+    except TimeoutException:
+        logger.warning("Project Details tab not found, skipping this record.")
+        return False
+
+    # Wait for the new details to load. The budget is read first: a timeout is recorded as a
+    # sample and changes timeout() for the next wait
+    budget = timeouts.timeout('project_details', attempt)
+    try:
+        timeouts.until(driver, 'project_details', EC.presence_of_all_elements_located(
+            (By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p')), attempt)
+        logger.debug("Project details loaded.")
+    except TimeoutException:
+        logger.warning("Project details not found within %.1f seconds. Skipping this record.", budget)
+        return False
+    return True
+
+def leave_details_window(driver, original_window):
+    """
+    Close the project details window/tab if one was opened, otherwise navigate back.
+    """
+    if len(driver.window_handles) > 1:
+        driver.close()
+        driver.switch_to.window(original_window)
+        logger.debug("Closed the project details window and switched back to the main window.")
+    else:
+        driver.back()
+        logger.debug("Navigated back to the main table page.")
+
+def scrape_term(driver, wait, timeouts, term, attempt=0, dead_letters=None, skip=(), failed=None):
+    """
+    Search one term in the district results already on screen and return its records
+    (list-table columns plus project details) as ProjectRecords. For callers that manage the
+    browser themselves, such as pipeline.py. Raises TimeoutException if the results do not load.
+
+    A row whose details fail is left out of the records instead of failing the term: its
+    reg_no is appended to `failed` and it is captured to `dead_letters` (a DeadLetterStore)
+    if given. If the results table does not come back after a row, the rows not visited yet
+    are failed the same way and the records collected so far are returned. Rows whose reg_no
+    is in `skip` (e.g. done by an earlier attempt) are not visited.
+    """
+    search_bar = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="search"]')))
+    search_bar.clear()
+    search_bar.send_keys(term)
+    search_bar.send_keys(u'\ue007')  # Press Enter key
+    timeouts.until(driver, 'results_table',
+                   EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')), attempt)
+
+    def row_failed(table_data, stage, error=None):
+        if failed is not None:
+            failed.append(table_data['reg_no'])
+        if dead_letters:
+            dead_letters.capture(driver, 'reraall', term, stage, error, table_data, table_data['reg_no'])
+
+    # Read the list table up front, so the rows left when the table is lost are still known
+    rows = []
+    for row in driver.find_elements(By.XPATH, '//table[@id="approvedTable"]/tbody/tr'):
+        cells = row.find_elements(By.TAG_NAME, 'td')
+        if cells and len(cells) >= 19:
+            table_data = extract_table_data(cells)
+            if table_data['reg_no'] not in skip:
+                rows.append((row, table_data))
+
+    records = []
+    for position, (row, table_data) in enumerate(rows):
+        original_window = driver.current_window_handle
+        stage, error = None, None
+        try:
+            click_details_icon(driver, row)
+            for window in driver.window_handles:
+                if window != original_window:
+                    driver.switch_to.window(window)
+                    break
+            if open_project_details_tab(driver, timeouts, attempt):
+                table_data.update(extract_additional_fields(driver))
+                records.append(ProjectRecord.from_dict(table_data))
+            else:
+                stage = 'project_details'
+        except (NoSuchElementException, NoSuchWindowException, TimeoutException, ElementClickInterceptedException,
+                UnexpectedAlertPresentException) as e:
+            logger.warning("Exception while handling details of '%s': %s", table_data['reg_no'], e)
+            stage, error = 'row', e
+            try:
+                driver.switch_to.alert.dismiss()
+            except:
+                pass
+        if stage:
+            row_failed(table_data, stage, error)
+        try:
+            leave_details_window(driver, original_window)
+            wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
+        except WebDriverException as e:
+            logger.warning("Results of '%s' were lost after %s records: %s", term, len(records), e)
+            for _, table_data in rows[position + 1:]:
+                row_failed(table_data, 'results_table', e)
+            break
+    return records
+
+def process_rows_in_tabs(driver, wait, rows, writer, tabs_per_browser, timeouts, attempt=0, dead_letters=None,
+                         written=None, term=None):
+    """
+    Pipelined variant of the per-row loop: keeps up to `tabs_per_browser` detail tabs
+    loading in the background while the oldest one is parsed.
+
+    :param driver: Chrome driver showing the search results.
+    :param wait: WebDriverWait bound to the driver.
+    :param rows: `approvedTable` rows of the current search.
+    :param writer: csv.DictWriter receiving the finished records.
+    :param tabs_per_browser: Maximum number of detail tabs kept open at once.
+    :param timeouts: AdaptiveTimeout for the detail page waits.
+    :param attempt: Retry number of the search term.
+    :param dead_letters: Optional DeadLetterStore the failed rows are captured to.
+    :param written: Optional set of reg_nos already written this run; those rows are skipped
+        (a retried term only redoes its failed rows) and new ones are added.
+    :param term: Search term the rows belong to; dead letters are filed under it.
+    :return: Number of records skipped because their details did not open or load in time;
+        each is captured as a dead letter, and a non-zero count makes the caller retry the term.
+    """
+    failed = 0
+    original_window = driver.current_window_handle
+    pending = deque()  # (window handle, table_data) in the order the tabs were opened
+    rows = list(rows)
+    position = 0
+
+    def row_failed(table_data, stage, error=None):
+        nonlocal failed
+        failed += 1
+        if dead_letters:
+            dead_letters.capture(driver, 'reraall', term, stage, error, table_data, table_data['reg_no'])
+
+    def parse_details(table_data):
+        # Details page of table_data is in the current window
+        try:
+            if open_project_details_tab(driver, timeouts, attempt):
+                table_data.update(extract_additional_fields(driver))
+                logger.debug("Extracted data", extra={"fields": table_data})
+                writer.writerow(table_data)
+                logger.info("Record written.", extra={"fields": {"reg_no": table_data['reg_no']}})
+                if written is not None:
+                    written.add(table_data['reg_no'])
+                if dead_letters:
+                    dead_letters.resolve(term, table_data['reg_no'])
+            else:
+                row_failed(table_data, 'project_details')
+        except (NoSuchElementException, NoSuchWindowException, TimeoutException, UnexpectedAlertPresentException) as e:
+            logger.warning("Exception while handling details of '%s': %s", table_data['reg_no'], e)
+            row_failed(table_data, 'details_tab', e)
+
+    while True:
+        # Top up the pipeline: every click starts loading another detail tab
+        while len(pending) < tabs_per_browser and position < len(rows):
+            row = rows[position]
+            position += 1
+            cells = row.find_elements(By.TAG_NAME, 'td')
+            if not (cells and len(cells) >= 19):
+                continue
+            table_data = extract_table_data(cells)
+            if written is not None and table_data['reg_no'] in written:
+                continue
+            known_windows = driver.window_handles
+            try:
+                click_details_icon(driver, row)
+            except (NoSuchElementException, ElementClickInterceptedException, UnexpectedAlertPresentException) as e:
+                logger.warning("Could not open details of '%s': %s", table_data['reg_no'], e)
+                try:
+                    driver.switch_to.alert.dismiss()
+                    logger.debug("Dismissed unexpected alert.")
+                except:
+                    pass
+                if driver.find_elements(By.XPATH, '//table[@id="approvedTable"]'):
+                    row_failed(table_data, 'details_icon', e)
+                    continue
+            try:
+                # Short wait only: details that open in the same window never raise a new tab
+                WebDriverWait(driver, NEW_TAB_WAIT).until(EC.new_window_is_opened(known_windows))
+            except TimeoutException:
+                if driver.find_elements(By.XPATH, '//table[@id="approvedTable"]'):
+                    logger.warning("Details of '%s' did not open.", table_data['reg_no'])
+                    row_failed(table_data, 'details_tab')
+                    continue
+                logger.info("Details of '%s' opened in the results window.", table_data['reg_no'])
+                parse_details(table_data)
+                driver.back()
+                wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
+                # Going back reloads the table, so the remaining rows are looked up again
+                rows = driver.find_elements(By.XPATH, '//table[@id="approvedTable"]/tbody/tr')
+                continue
+            new_window = [w for w in driver.window_handles if w not in known_windows][0]
+            pending.append((new_window, table_data))
+            logger.info("Opened details tab for '%s' (%s in flight).", table_data['reg_no'], len(pending))
+
+        if not pending:
+            break
+
+        # Parse the oldest tab while the others keep loading
+        window, table_data = pending.popleft()
+        try:
+            driver.switch_to.window(window)
+            parse_details(table_data)
+        except NoSuchWindowException as e:
+            logger.warning("Details tab of '%s' was closed: %s", table_data['reg_no'], e)
+            row_failed(table_data, 'details_tab', e)
+        finally:
+            # The portal may have closed the tab itself; never close the results window
+            if window in driver.window_handles:
+                try:
+                    driver.switch_to.window(window)
+                    driver.close()
+                except NoSuchWindowException:
+                    pass
+            driver.switch_to.window(original_window)
+    return failed
+
+def process_data_from_serial(serial_no, tabs_per_browser=1, fields=None, output_file_path='new_data_.csv',
+                             profile_worker=None, capture_network=False, trace_file=None, prioritize=False,
+                             time_budget=None, dead_letters=None):
+    """
+    Crawl the search terms of 'newDa.csv' into 'new_data_.csv'.
+
+    :param serial_no: Serial number the run was started from.
+    :param tabs_per_browser: Number of detail tabs kept loading in parallel; 1 keeps the
+        original one-window-at-a-time flow.
+    :param fields: Optional list of output columns. When all of them come from the search
+        results table, the detail pages are not visited at all. Use a separate
+        `output_file_path` for projected runs so the column layout stays consistent.
+    :param output_file_path: CSV file the records are appended to.
+    :param profile_worker: Optional worker id; reuses that worker's persistent Chrome profile and
+        disk cache instead of a blank profile (see browser_profile.py).
+    :param capture_network: Build records from the JSON responses behind the list table and
+        the detail tabs (recorded through the DevTools Protocol) where possible, falling back
+        to DOM parsing otherwise. Only used in the one-window-at-a-time flow.
+    :param trace_file: Optional JSON file; when given, every WebDriver command is timed by call
+        site and search term and the trace is saved there (see driver_trace.py).
+    :param prioritize: Visit the terms most likely to have changed first, scored from the
+        existing output file (see crawl_scheduler.py), instead of resuming in file order.
+    :param time_budget: Optional number of seconds after which no new term is started.
+    :param dead_letters: Optional directory of a dead-letter store; every failed row or term is
+        captured there with its page HTML and a screenshot (see dead_letter.py).
+
+    Page waits adapt to the latencies seen so far (see adaptive_timeout.py). Terms whose
+    results or details timed out are retried at the end of the run with a longer budget.
+    """
+    fieldnames = select_project_fields(fields)
+    visit_details = needs_project_details(fields)
+
     # Set Chrome options
     chrome_options = Options()
     chrome_options.add_argument("--disable-gpu")
@@ -51,67 +483,75 @@ def process_data_from_serial(serial_no):
     # Uncomment the following line to run Chrome in headless mode
     # chrome_options.add_argument("--headless")
 
-    # Initialize Chrome webdriver with options
-    driver = webdriver.Chrome(options=chrome_options)
+    if capture_network:
+        enable_network_capture(chrome_options)
+
+    # Initialize Chrome webdriver with options. The browser is kept for the whole run and only
+    # replaced when it degrades (memory, leftover windows, pages served, error streak)
+    lifecycle = DriverLifecycle(lambda: create_chrome_driver(chrome_options, profile_worker))
+    driver = lifecycle.start()
     wait = WebDriverWait(driver, 20)
+    capture = NetworkCapture(driver) if capture_network else None
+    tracer = DriverTracer(driver) if trace_file else None
+    timeouts = AdaptiveTimeout()
+    dead_letter_store = DeadLetterStore(dead_letters) if dead_letters else None
 
     try:
         # URL of the website
         URL = 'https://rera.karnataka.gov.in/viewAllProjects'
         driver.get(URL)
-        print("Navigated to the main URL.")
+        logger.info("Navigated to the main URL.")
 
         # Function to perform initial search setup
         def initial_search():
             try:
                 search_input = wait.until(EC.element_to_be_clickable((By.ID, 'projectDist')))
-                print("Found and clickable 'projectDist' input field.")
+                logger.debug("Found and clickable 'projectDist' input field.")
             except TimeoutException:
-                print("Failed to find 'projectDist' input field.")
+                logger.warning("Failed to find 'projectDist' input field.")
                 return False
 
             is_readonly = search_input.get_attribute('readonly')
             if is_readonly:
-                print("'projectDist' input field is read-only. Setting value via JavaScript.")
+                logger.debug("'projectDist' input field is read-only. Setting value via JavaScript.")
                 set_input_value(driver, search_input, 'Bengaluru Urban')
             else:
                 try:
                     search_input.clear()
                 except InvalidElementStateException:
-                    print("Cannot clear 'projectDist' input field. Setting value via JavaScript.")
+                    logger.warning("Cannot clear 'projectDist' input field. Setting value via JavaScript.")
                     set_input_value(driver, search_input, 'Bengaluru Urban')
                 search_input.send_keys('Bengaluru Urban')
-                print("Entered 'Bengaluru Urban' into 'projectDist'.")
+                logger.debug("Entered 'Bengaluru Urban' into 'projectDist'.")
 
             try:
                 search_button = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, 'btn-style')))
-                print("Found search button.")
+                logger.debug("Found search button.")
                 search_button.click()
-                print("Clicked search button.")
+                logger.debug("Clicked search button.")
             except (TimeoutException, ElementClickInterceptedException) as e:
-                print(f"Failed to click search button: {e}")
+                logger.warning("Failed to click search button: %s", e)
                 return False
 
             try:
                 wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
-                print("Approved projects table loaded.")
+                logger.debug("Approved projects table loaded.")
                 return True
             except TimeoutException:
-                print("Approved projects table did not load in time.")
+                logger.warning("Approved projects table did not load in time.")
                 return False
 
         # Perform initial search
         if not initial_search():
-            print("Initial search failed. Exiting script.")
+            logger.warning("Initial search failed. Exiting script.")
             return
 
         # Define file paths
         input_file_path = 'newDa.csv'
-        output_file_path = 'new_data_.csv'
 
         # Get the last processed RERA ID
         last_processed_rera = get_last_processed_rera(output_file_path)
-        print(f"Last processed RERA ID: {last_processed_rera}")
+        logger.info("Last processed RERA ID: %s", last_processed_rera)
 
         # Read the search terms from the input CSV file
         search_terms = []
@@ -119,102 +559,130 @@ def process_data_from_serial(serial_no):
             with open(input_file_path, 'r', encoding='utf-8') as csvfile:
                 reader = csv.reader(csvfile)
                 search_terms = [row[0].strip() for row in reader if row and row[0].strip()]
-            print(f"Loaded {len(search_terms)} search terms from '{input_file_path}'.")
+            logger.info("Loaded %s search terms from '%s'.", len(search_terms), input_file_path)
         except FileNotFoundError:
-            print(f"The file '{input_file_path}' was not found.")
+            logger.warning("The file '%s' was not found.", input_file_path)
             return
 
-        # Determine the starting index based on the last processed RERA ID
-        if last_processed_rera and last_processed_rera in search_terms:
-            start_index = search_terms.index(last_processed_rera) + 1
+        if prioritize:
+            # A refresh: every term, most likely changed first
+            search_terms = prioritize_terms(search_terms, output_file_path)
+            logger.info("Ordered %s search terms by refresh priority.", len(search_terms))
         else:
-            print(f"Last processed RERA ID '{last_processed_rera}' not found. Starting from the beginning.")
-            start_index = 0
+            # Determine the starting index based on the last processed RERA ID
+            if last_processed_rera and last_processed_rera in search_terms:
+                start_index = search_terms.index(last_processed_rera) + 1
+            else:
+                logger.warning("Last processed RERA ID '%s' not found. Starting from the beginning.", last_processed_rera)
+                start_index = 0
 
-        # Slice the search terms starting from the determined index
-        search_terms = search_terms[start_index:]
-        print(f"Processing {len(search_terms)} search terms starting from index {start_index}.")
+            # Slice the search terms starting from the determined index
+            search_terms = search_terms[start_index:]
+            logger.info("Processing %s search terms starting from index %s.", len(search_terms), start_index)
+        deadline = time.monotonic() + time_budget if time_budget else None
 
         # Open the new CSV file in append mode
         with open(output_file_path, 'a', newline='', encoding='utf-8') as csvfile:
-            fieldnames = [
-                's_no', 'ack_no', 'reg_no', 'promoter_name', 'project_name', 
-                'status', 'district', 'taluk', 'approved_on', 'proposed_completion_date', 
-                'covid_extension_date', 'section_6_extension_date', 'further_extension_date', 
-                'certificate', 'covid_certificate', 'renewed_certificate', 'further_extension_order', 
-                'complaints_litigation', 'project_sub_type', 'latitude', 'longitude', 'total_area', 
-                'open_area', 'units', 'ProjectAddress', 'ProjectStatus', 'ProjectStartDate',
-                'ProjectEndDate', 'ProjectCost', 'ProjectCarpetArea', 'WaterSource', 'OtherWaterSource',
-                'OpenParking', 'CoveredParking', 'LandCost', 'PlinthArea', 'ApprovingAuth', 
-                'type_of_inventory', 'no_of_inventory'
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
 
             # Write header only if the file is empty
             csvfile.seek(0, os.SEEK_END)
             if csvfile.tell() == 0:
                 writer.writeheader()
-                print("CSV header written.")
+                logger.debug("CSV header written.")
+
+            pending_terms = deque((term, 0) for term in search_terms)
+            # (term, attempt) already queued, so a term with several failed rows is retried once
+            queued_retries = set()
+            # reg_nos written this run; a retried term only redoes the rows that failed
+            written_reg_nos = set()
 
-            for term in search_terms:
-                print(f"\nProcessing search term: '{term}'")
+            def retry_later(term, attempt):
+                if timeouts.can_retry(attempt) and (term, attempt + 1) not in queued_retries:
+                    queued_retries.add((term, attempt + 1))
+                    pending_terms.append((term, attempt + 1))
+                    logger.info("Will retry '%s' with a longer timeout.", term)
+
+            while pending_terms:
+                if deadline and time.monotonic() > deadline:
+                    logger.info("Time budget used up; %s search terms left for the next run.", len(pending_terms))
+                    break
+                term, attempt = pending_terms.popleft()
+                logger.info("Processing search term: '%s'", term, extra={"fields": {"term": term, "attempt": attempt}})
+                if tracer:
+                    tracer.set_record(term)
                 try:
+                    if capture:
+                        capture.reset()
+
                     # Enter the term in the search bar and press Enter
                     search_bar = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="search"]')))
                     driver.execute_script("arguments[0].scrollIntoView(true);", search_bar)
                     search_bar.clear()
                     search_bar.send_keys(term)
                     search_bar.send_keys(u'\ue007')  # Press Enter key
-                    print(f"Entered '{term}' into search bar and pressed Enter.")
+                    logger.debug("Entered '%s' into search bar and pressed Enter.", term)
 
                     # Wait for the table to update with search results
                     try:
-                        wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
-                        print("Search results table loaded.")
+                        timeouts.until(driver, 'results_table',
+                                       EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')), attempt)
+                        logger.debug("Search results table loaded.")
                     except TimeoutException:
-                        print(f"Search results for '{term}' did not load in time.")
+                        logger.warning("Search results for '%s' did not load in time.", term)
+                        retry_later(term, attempt)
+                        if dead_letter_store:
+                            dead_letter_store.capture(driver, 'reraall', term, 'results_table')
                         continue  # Skip to the next term
 
                     # Extract data from the table
                     rows = driver.find_elements(By.XPATH, '//table[@id="approvedTable"]/tbody/tr')
                     if not rows:
-                        print(f"No data found for search term '{term}'.")
+                        logger.warning("No data found for search term '%s'.", term)
+                        continue
+
+                    # Rows of the list table as delivered to the page, if they were captured
+                    captured_records = capture.table_records() if capture else []
+                    if len(captured_records) != len(rows):
+                        captured_records = []
+
+                    if not visit_details and captured_records:
+                        writer.writerows(captured_records)
+                        logger.info("Wrote %s captured list-table rows without visiting detail pages.", len(captured_records))
                         continue
 
-                    for row in rows:
+                    if not visit_details:
+                        # The list table covers every requested field
+                        for row in rows:
+                            cells = row.find_elements(By.TAG_NAME, 'td')
+                            if cells and len(cells) >= 19:
+                                writer.writerow(extract_table_data(cells))
+                        logger.info("Wrote %s list-table rows without visiting detail pages.", len(rows))
+                        continue
+
+                    lifecycle.page_served(len(rows))
+                    if tabs_per_browser > 1:
+                        if process_rows_in_tabs(driver, wait, rows, writer, tabs_per_browser, timeouts, attempt,
+                                                dead_letter_store, written_reg_nos, term):
+                            retry_later(term, attempt)
+                            lifecycle.record_error()
+                        else:
+                            lifecycle.record_success()
+                        continue
+
+                    for row_index, row in enumerate(rows):
                         cells = row.find_elements(By.TAG_NAME, 'td')
                         if cells and len(cells) >= 19:
-                            table_data = {
-                                's_no': cells[0].text.strip(),
-                                'ack_no': cells[1].text.strip(),
-                                'reg_no': cells[2].text.strip(),
-                                'promoter_name': cells[4].text.strip(),
-                                'project_name': cells[5].text.strip(),
-                                'status': cells[6].text.strip(),
-                                'district': cells[7].text.strip(),
-                                'taluk': cells[8].text.strip(),
-                                'approved_on': cells[9].text.strip(),
-                                'proposed_completion_date': cells[10].text.strip(),
-                                'covid_extension_date': cells[11].text.strip(),
-                                'section_6_extension_date': cells[12].text.strip(),
-                                'further_extension_date': cells[13].text.strip(),
-                                'certificate': '',  # Added missing field
-                                'covid_certificate': cells[15].text.strip(),
-                                'renewed_certificate': cells[16].text.strip(),
-                                'further_extension_order': cells[17].text.strip(),
-                                'complaints_litigation': cells[18].text.strip()
-                            }
+                            if captured_records:
+                                table_data = dict(captured_records[row_index])
+                            else:
+                                table_data = extract_table_data(cells)
+                            if table_data['reg_no'] in written_reg_nos:
+                                continue
 
                             # Click the icon to open the details page
                             try:
-                                icon = row.find_element(By.XPATH, './/i[@class="fa fa-files-o" and @style="font-size:30px;color:#3948B1"]')
-                                driver.execute_script("arguments[0].scrollIntoView(true);", icon)
-                                try:
-                                    icon.click()
-                                    print("Clicked on the details icon.")
-                                except ElementClickInterceptedException:
-                                    driver.execute_script("arguments[0].click();", icon)
-                                    print("Clicked on the details icon using JavaScript.")
+                                click_details_icon(driver, row)
 
                                 # Handle potential new window/tab
                                 original_window = driver.current_window_handle
@@ -223,18 +691,14 @@ def process_data_from_serial(serial_no):
                                     for window in all_windows:
                                         if window != original_window:
                                             driver.switch_to.window(window)
-                                            print("Switched to the new window/tab for project details.")
+                                            logger.debug("Switched to the new window/tab for project details.")
                                             break
 
-                                # Use the text content of the tabs to find the correct one
-                                try:
-                                    project_details_tab = wait.until(EC.element_to_be_clickable(
-                                        (By.XPATH, '//a[contains(text(),"Project Details")]')))
-                                    driver.execute_script("arguments[0].scrollIntoView(true);", project_details_tab)
-                                    project_details_tab.click()
-                                    print("Clicked on 'Project Details' tab.")
-                                except TimeoutException:
-                                    print("Project Details tab not found, skipping this record.")
+                                if not open_project_details_tab(driver, timeouts, attempt):
+                                    retry_later(term, attempt)
+                                    if dead_letter_store:
+                                        dead_letter_store.capture(driver, 'reraall', term, 'project_details', record=table_data,
+                                                                  reg_no=table_data['reg_no'])
                                     # Close the new window/tab if opened
                                     if len(driver.window_handles) > 1:
                                         driver.close()
@@ -243,196 +707,132 @@ def process_data_from_serial(serial_no):
                                         driver.back()
                                     continue
 
-                                # Wait for the new details to load, with a 5-second maximum wait
-                                try:
-                                    wait_short = WebDriverWait(driver, 5)
-                                    wait_short.until(EC.presence_of_all_elements_located(
-                                        (By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p')))
-                                    print("Project details loaded.")
-                                except TimeoutException:
-                                    print("Project details not found within 5 seconds. Skipping this record.")
-                                    if len(driver.window_handles) > 1:
-                                        driver.close()
-                                        driver.switch_to.window(original_window)
-                                    else:
-                                        driver.back()
-                                    continue
-
-                                # Extract additional details
-                                project_details = driver.find_elements(By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p')
-                                taluk_details = driver.find_elements(By.XPATH, '//div[@class="col-md-6 col-sm-6 col-xs-6"]/p')
-                                inventory_details = driver.find_elements(By.XPATH, '//div[@class="col-md-3 col-sm-6 col-xs-6"]/p')
-
-                                # Initialize all additional fields
-                                additional_fields = {
-                                    'project_sub_type': '',
-                                    'ProjectStatus': '',
-                                    'ProjectStartDate': '',
-                                    'ProjectEndDate': '',
-                                    'ProjectCost': '',
-                                    'ProjectCarpetArea': '',
-                                    'WaterSource': '',
-                                    'OtherWaterSource': '',
-                                    'OpenParking': '',
-                                    'CoveredParking': '',
-                                    'LandCost': '',
-                                    'PlinthArea': '',
-                                    'ApprovingAuth': '',
-                                    'total_area': '',
-                                    'open_area': '',
-                                    'units': '',
-                                    'ProjectAddress': '',
-                                    'taluk': '',
-                                    'latitude': '',
-                                    'longitude': '',
-                                    'type_of_inventory': '',
-                                    'no_of_inventory': ''
-                                }
-
- 
-                                # Combined mapping for all fields
-                                mapping = {
-                                    'Project Sub Type': 'project_sub_type',
-                                    'Project Status': 'ProjectStatus',
-                                    'Project Start Date': 'ProjectStartDate',
-                                    'Proposed Completion Date': 'ProjectEndDate',
-                                    'Total Project Cost (INR)': 'ProjectCost',
-                                    'Total Carpet Area of all the Floors (Sq Mtr)': 'ProjectCarpetArea',
-                                    'Source of Water': 'WaterSource',
-                                    'Others': 'OtherWaterSource',
-                                    'No. of Open Parking': 'OpenParking',
-                                    'No. of Covered Parking': 'CoveredParking',
-                                    'Cost of Land (INR)': 'LandCost',
-                                    'Total Plinth Area (Sq Mtr)': 'PlinthArea',
-                                    'Approving Authority': 'ApprovingAuth',
-                                    'Total Area Of Land (Sq Mtr)': 'total_area',
-                                    'Total Open Area (Sq Mtr)': 'open_area',
-                                    'Total Number of Inventories/Flats/Sites/Plots/Villas': 'units',
-                                    'Taluk': 'taluk',
-                                    'Project Address': 'ProjectAddress',
-                                    'Latitude': 'latitude',
-                                    'Longitude': 'longitude',
-                                    'Type of Inventory': 'type_of_inventory',
-                                    'No of Inventory': 'no_of_inventory'
-                                }
- 
-                                # Parse project details
-                                for i in range(len(project_details)):
-                                    label = project_details[i].text.strip(':').strip()
-                                    if i + 1 < len(project_details):
-                                        value = project_details[i + 1].text.strip()
-                                        key = mapping.get(label)
-                                        if key:
-                                            additional_fields[key] = value
- 
- 
-                                for i in range(len(inventory_details)):
-                                    label = inventory_details[i].text.strip(':').strip()
-                                    print("LABEL: ", label)
-                                    if i + 1 < len(inventory_details):
-                                        value = inventory_details[i + 1].text.strip()
-                                        key = mapping.get(label)
-                                        if key:
-                                            additional_fields[key] = value  
- 
-                                # Parse address details
-                                for i in range(len(taluk_details)):
-                                    label = taluk_details[i].text.strip(':').strip()
-                                    if i + 1 < len(taluk_details):
-                                        value = taluk_details[i + 1].text.strip()
-                                        key = mapping.get(label)
-                                        if key:
-                                            additional_fields[key] = value
- 
                                 # Update table data with additional details
-                                table_data.update(additional_fields)
+                                table_data.update(read_additional_fields(driver, capture))
  
                                 # Print the extracted data for debugging
-                                print(f"Extracted Data: {table_data}")
+                                logger.debug("Extracted data", extra={"fields": table_data})
  
                                 # Write the extracted data to the CSV file
                                 writer.writerow(table_data)
-                                print("Data written to 'new_data.csv'.")
+                                logger.info("Record written.", extra={"fields": {"reg_no": table_data['reg_no']}})
+                                written_reg_nos.add(table_data['reg_no'])
+                                lifecycle.record_success()
+                                if dead_letter_store:
+                                    dead_letter_store.resolve(term, table_data['reg_no'])
  
                                 # Close the new window/tab if opened and switch back
-                                if len(driver.window_handles) > 1:
-                                    driver.close()
-                                    driver.switch_to.window(original_window)
-                                    print("Closed the project details window and switched back to the main window.")
-                                else:
-                                    driver.back()
-                                    print("Navigated back to the main table page.")
+                                leave_details_window(driver, original_window)
  
                                 # Wait for the table to reload before proceeding
                                 wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
-                                print("Main table page reloaded.")
+                                logger.debug("Main table page reloaded.")
  
                             except (NoSuchElementException, TimeoutException, ElementClickInterceptedException, UnexpectedAlertPresentException) as e:
-                                print(f"Exception while handling icon or details: {e}")
+                                logger.warning("Exception while handling icon or details: %s", e)
+                                lifecycle.record_error()
                                 # Handle unexpected alerts
                                 try:
                                     alert = driver.switch_to.alert
                                     alert.dismiss()
-                                    print("Dismissed unexpected alert.")
+                                    logger.debug("Dismissed unexpected alert.")
                                 except:
                                     pass
+                                if dead_letter_store:
+                                    dead_letter_store.capture(driver, 'reraall', term, 'row', e, table_data, table_data['reg_no'])
                                 # Attempt to navigate back to the main table
                                 if len(driver.window_handles) > 1:
                                     driver.close()
                                     driver.switch_to.window(original_window)
-                                    print("Closed unexpected window/tab and switched back to the main window.")
+                                    logger.debug("Closed unexpected window/tab and switched back to the main window.")
                                 else:
                                     driver.back()
-                                    print("Navigated back to the main table page.")
+                                    logger.debug("Navigated back to the main table page.")
                                 # Wait for the table to reload
                                 wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
                                 continue  # Skip to the next term
  
                 except Exception as e:
-                    print(f"Exception while handling search term '{term}': {e}")
+                    logger.warning("Exception while handling search term '%s': %s", term, e)
+                    lifecycle.record_error()
+                    if dead_letter_store:
+                        dead_letter_store.capture(driver, 'reraall', term, 'search', e)
                     continue
  
                 finally:
                     # After processing each search term, reload the page to reset the search interface
                     try:
-                        print("Reloading the main page to reset the search interface.")
+                        # Swap in a fresh browser if this one degraded; the reload below restores the search
+                        if lifecycle.ensure_healthy() is not driver:
+                            driver = lifecycle.driver
+                            wait = WebDriverWait(driver, 20)
+                            if capture:
+                                capture = NetworkCapture(driver)
+                            if tracer:
+                                tracer.attach(driver)
+
+                        logger.debug("Reloading the main page to reset the search interface.")
                         driver.get(URL)
-                        print("Reloaded the main page.")
+                        logger.debug("Reloaded the main page.")
  
                         # Wait for the page to load
                         wait.until(EC.presence_of_element_located((By.ID, 'projectDist')))
-                        print("Main page loaded after reload.")
+                        logger.debug("Main page loaded after reload.")
  
                         # Re-enter 'Bengaluru Urban' and click search
                         search_input = wait.until(EC.element_to_be_clickable((By.ID, 'projectDist')))
                         set_input_value(driver, search_input, 'Bengaluru Urban')
-                        print("Re-entered 'Bengaluru Urban' into 'projectDist' via JavaScript after reload.")
+                        logger.debug("Re-entered 'Bengaluru Urban' into 'projectDist' via JavaScript after reload.")
  
                         # Find and click the search button
                         try:
                             search_button = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, 'btn-style')))
-                            print("Found search button after reload.")
+                            logger.debug("Found search button after reload.")
                             search_button.click()
-                            print("Clicked search button after reload.")
+                            logger.debug("Clicked search button after reload.")
                         except (TimeoutException, ElementClickInterceptedException) as e:
-                            print(f"Failed to click search button after reload: {e}")
+                            logger.warning("Failed to click search button after reload: %s", e)
                             continue
  
                         # Wait for the table to load again
                         try:
                             wait.until(EC.presence_of_element_located((By.XPATH, '//table[@id="approvedTable"]')))
-                            print("Approved projects table loaded after reload.")
+                            logger.debug("Approved projects table loaded after reload.")
                         except TimeoutException:
-                            print("Approved projects table did not load in time after reload.")
+                            logger.warning("Approved projects table did not load in time after reload.")
                             continue
  
                     except Exception as e:
-                        print(f"Failed to reload and reset search interface: {e}")
+                        logger.warning("Failed to reload and reset search interface: %s", e)
                         continue
  
     finally:
-        driver.quit()
-        print("Browser closed.")
+        logger.info("Page wait latencies: %s", timeouts.summary())
+        if tracer:
+            tracer.detach()
+            tracer.save(trace_file)
+            logger.info("Driver trace saved to '%s'.", trace_file)
+        lifecycle.quit()
+        if dead_letter_store:
+            dead_letter_store.close()
+        logger.info("Browser closed.")
  
 # Call the function with a specified serial number to start processing
-process_data_from_serial(1)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the search terms of newDa.csv into a project CSV.")
+    parser.add_argument('serial_no', type=int, nargs='?', default=1, help="Serial number to start from (default: 1)")
+    parser.add_argument('--tabs-per-browser', type=int, default=1,
+                        help="Detail tabs kept loading in parallel (default: 1, one window at a time)")
+    parser.add_argument('-f', '--fields', nargs='+', help="Output columns; detail pages are skipped when none need them")
+    parser.add_argument('-o', '--output', default='new_data_.csv', help="Output CSV (default: new_data_.csv)")
+    parser.add_argument('--profile-worker', help="Reuse this worker's persistent Chrome profile")
+    parser.add_argument('--capture-network', action='store_true', help="Build records from captured JSON responses")
+    parser.add_argument('--trace', help="Save a WebDriver command trace to this JSON file")
+    parser.add_argument('--prioritize', action='store_true', help="Visit the terms most likely to have changed first")
+    parser.add_argument('--time-budget', type=float, help="Seconds after which no new term is started")
+    parser.add_argument('--dead-letters', help="Dead-letter directory failed rows are captured to")
+    args = parser.parse_args()
+    if args.tabs_per_browser < 1:
+        parser.error("--tabs-per-browser must be at least 1")
+    process_data_from_serial(args.serial_no, args.tabs_per_browser, args.fields, args.output, args.profile_worker,
+                             args.capture_network, args.trace, args.prioritize, args.time_budget, args.dead_letters)
\ No newline at end of file
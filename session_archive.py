@@ -0,0 +1,410 @@
+"""
+Record a scraping session and replay it without the portal.
+
+A recording stores every request/response the browser exchanged during the session (read
+from the Chrome DevTools Protocol network events), plus the rendered DOM of each parsed
+details page. Entries are appended to the archive as JSON lines while the session runs, so
+a long recording keeps nothing in memory.
+
+A replay serves the recorded responses to a local Chrome from an ArchiveServer, so a scraper
+runs unchanged against local disk (inventory.extract_outputData(..., replay_archive=...)),
+or re-runs only the parsers over the recorded DOMs (replay_inventory).
+
+    python session_archive.py session.jsonl -o replayed.json
+    python session_archive.py session.jsonl --crawl newDa.csv -o replayed.json
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from event_log import get_logger
+
+SCRIPT_RE = re.compile(r'<script\b[^>]*>.*?</script\s*>', re.IGNORECASE | re.DOTALL)
+
+logger = get_logger("session_archive")
+
+# Response headers passed on by a replay; the body is stored decoded, so length and
+# encoding headers are recomputed
+REPLAY_HEADERS = {'content-type', 'location', 'set-cookie', 'cache-control'}
+
+
+def _har_headers(headers):
+    return [{'name': name, 'value': value} for name, value in (headers or {}).items()]
+
+
+def har_entry(url, text, mime_type, method='GET', status=200, request_headers=None, post_data=None,
+              response_headers=None, encoding=None, **extra):
+    """
+    Build one entry in the HAR 1.2 layout; extra keys are stored with a leading underscore,
+    as HAR allows for custom fields. encoding='base64' marks a binary body.
+    """
+    request = {'method': method, 'url': url, 'headers': _har_headers(request_headers)}
+    if post_data is not None:
+        request['postData'] = {'text': post_data}
+    content = {'mimeType': mime_type, 'text': text}
+    if encoding:
+        content['encoding'] = encoding
+    entry = {
+        'startedDateTime': datetime.now(timezone.utc).isoformat(),
+        'request': request,
+        'response': {'status': status, 'headers': _har_headers(response_headers), 'content': content},
+    }
+    entry.update({f'_{key}': value for key, value in extra.items()})
+    return entry
+
+
+class SessionRecorder:
+    """
+    Appends the network traffic of a session, and the DOM of the pages a scraper parses, to
+    a JSON-lines archive as they happen.
+
+    The driver must be started with network_capture.enable_network_capture. The recorder
+    reads chromedriver's performance log, so it cannot share a driver with a NetworkCapture.
+    """
+
+    def __init__(self, driver, archive_path):
+        self.driver = driver
+        self.archive_path = archive_path
+        self.file = open(archive_path, 'a', encoding='utf-8')
+        self.count = 0
+        # requestId -> request parameters, until the response has finished loading
+        self._requests = {}
+        self._responses = {}
+        self.driver.execute_cdp_cmd('Network.enable', {})
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False))
+        self.file.write('\n')
+        self.count += 1
+
+    def _write_exchange(self, request, response, term, body='', encoding=None):
+        self._write(har_entry(
+            request['url'], body, response.get('mimeType', ''), request.get('method', 'GET'),
+            response.get('status', 200), request.get('headers'), request.get('postData'),
+            response.get('headers'), encoding, term=term, kind='traffic'))
+
+    def record_traffic(self, term=None):
+        """
+        Append every request/response finished since the last call. Requests still loading
+        are kept until a later call sees them finish.
+        """
+        try:
+            events = self.driver.get_log('performance')
+        except WebDriverException as e:
+            logger.warning("Could not read performance log: %s", e)
+            return
+        for event in events:
+            message = json.loads(event['message'])['message']
+            method, params = message.get('method'), message.get('params', {})
+            request_id = params.get('requestId')
+            if method == 'Network.requestWillBeSent':
+                if 'redirectResponse' in params and request_id in self._requests:
+                    # A redirect reuses the requestId; store the hop before the next request
+                    self._write_exchange(self._requests[request_id], params['redirectResponse'], term)
+                self._requests[request_id] = params['request']
+            elif method == 'Network.responseReceived':
+                self._responses[request_id] = params['response']
+            elif method == 'Network.loadingFinished' and request_id in self._responses:
+                request = self._requests.pop(request_id, None) or {'url': self._responses[request_id].get('url')}
+                response = self._responses.pop(request_id)
+                body, encoding = '', None
+                try:
+                    result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                    body, encoding = result['body'], 'base64' if result.get('base64Encoded') else None
+                except (WebDriverException, KeyError):
+                    pass  # Body evicted from the browser's buffer
+                self._write_exchange(request, response, term, body, encoding)
+            elif method == 'Network.loadingFailed':
+                self._requests.pop(request_id, None)
+                self._responses.pop(request_id, None)
+        self.file.flush()
+
+    def record_page(self, term, kind='details', **extra):
+        """
+        Append the traffic so far and the current page's DOM (scripts removed).
+        """
+        self.record_traffic(term)
+        html = SCRIPT_RE.sub('', self.driver.page_source)
+        self._write(har_entry(self.driver.current_url, html, 'text/html', term=term, kind=kind, **extra))
+        self.file.flush()
+
+    def close(self):
+        self.record_traffic()
+        self.file.close()
+        logger.info("Recorded %s entries to '%s'.", self.count, self.archive_path)
+
+
+def iter_entries(archive_path, kind=None):
+    """
+    Yield the entries of an archive, optionally only those of one kind ('details',
+    'traffic', ...). Archives written as one HAR JSON document are read as well.
+    """
+    with open(archive_path, 'r', encoding='utf-8') as f:
+        first = f.readline()
+        if first.lstrip().startswith('{"log"'):
+            entries = json.loads(first + f.read())['log']['entries']
+        else:
+            entries = (json.loads(line) for line in [first] + list(f) if line.strip())
+        for entry in entries:
+            if kind is None or entry.get('_kind') == kind:
+                yield entry
+
+
+def load_entries(archive_path, kind=None):
+    """
+    Return the entries of an archive, optionally only those of one kind.
+    """
+    return list(iter_entries(archive_path, kind))
+
+
+def entry_body(entry):
+    """
+    The response body of an entry as bytes.
+    """
+    content = entry['response']['content']
+    if content.get('encoding') == 'base64':
+        return base64.b64decode(content.get('text') or '')
+    return (content.get('text') or '').encode('utf-8')
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _serve(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        post_data = self.rfile.read(length).decode('utf-8', 'replace') if length else None
+        scheme = 'https' if isinstance(self.connection, ssl.SSLSocket) else 'http'
+        entry = self.server.archive.find(self.command, f"{scheme}://{self.headers.get('Host')}{self.path}", post_data)
+        if entry is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = entry_body(entry)
+        self.send_response(entry['response'].get('status') or 200)
+        for header in entry['response'].get('headers', []):
+            if header['name'].lower() in REPLAY_HEADERS:
+                for value in str(header['value']).split('\n'):
+                    self.send_header(header['name'], value)
+        if not any(h['name'].lower() == 'content-type' for h in entry['response'].get('headers', [])):
+            self.send_header('Content-Type', entry['response']['content'].get('mimeType') or 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_HEAD = do_PUT = do_OPTIONS = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ArchiveHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def finish_request(self, request, client_address):
+        # HTTP and HTTPS on one port: a TLS connection starts with a handshake record (0x16)
+        try:
+            if request.recv(1, socket.MSG_PEEK) == b'\x16':
+                request = self.ssl_context.wrap_socket(request, server_side=True)
+        except OSError:
+            return
+        try:
+            super().finish_request(request, client_address)
+        finally:
+            if isinstance(request, ssl.SSLSocket):
+                request.close()
+
+
+class ArchiveServer:
+    """
+    Answers a browser's requests with the responses of a recorded archive, on one local
+    port for every host, over HTTP and HTTPS (with a throwaway self-signed certificate,
+    made with the openssl command). Requests are matched on method, URL and body, then on
+    method and URL; responses recorded more than once are served in recorded order, the
+    last one repeating. Unknown requests get a 404, so a replay never reaches the network.
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.exact = defaultdict(list)
+        self.by_url = defaultdict(list)
+        for entry in iter_entries(archive_path, kind='traffic'):
+            request = entry['request']
+            post_data = (request.get('postData') or {}).get('text')
+            self.exact[(request['method'], request['url'], post_data)].append(entry)
+            self.by_url[(request['method'], request['url'])].append(entry)
+        self.served = defaultdict(int)
+        self.lock = threading.Lock()
+
+        self.cert_dir = tempfile.mkdtemp(prefix='rera-replay-cert-')
+        cert, key = os.path.join(self.cert_dir, 'cert.pem'), os.path.join(self.cert_dir, 'key.pem')
+        if not shutil.which('openssl'):
+            raise RuntimeError("Replaying HTTPS traffic needs the openssl command to make a certificate.")
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+                       check=True, capture_output=True)
+        self.server = _ArchiveHTTPServer(('127.0.0.1', 0), ArchiveHandler)
+        self.server.archive = self
+        self.server.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.server.ssl_context.load_cert_chain(cert, key)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="archive-server", daemon=True).start()
+        logger.info("Serving %s recorded responses of '%s' on port %s.", len(self.by_url), archive_path, self.port)
+
+    def find(self, method, url, post_data=None):
+        """
+        The recorded entry answering a request, or None.
+        """
+        key = (method, url, post_data)
+        responses = self.exact.get(key)
+        if not responses:
+            key = (method, url)
+            responses = self.by_url.get(key)
+        if not responses:
+            logger.debug("No recorded response for %s %s.", method, url)
+            return None
+        with self.lock:
+            index = min(self.served[key], len(responses) - 1)
+            self.served[key] += 1
+        return responses[index]
+
+    def configure(self, chrome_options):
+        """
+        Point a Chrome at the server: every host resolves to it and its certificate is accepted.
+        """
+        chrome_options.add_argument(f"--host-resolver-rules=MAP * 127.0.0.1:{self.port}")
+        chrome_options.add_argument("--ignore-certificate-errors")
+        return chrome_options
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cert_dir, ignore_errors=True)
+
+
+def replay_chrome_options():
+    """
+    Chrome options for replays: headless, and every host name resolves to nothing, so a
+    replayed page can never reach the portal or any other server.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--host-resolver-rules=MAP * ~NOTFOUND")
+    return chrome_options
+
+
+class ReplaySession:
+    """
+    Serves the recorded DOMs of an archive to a local Chrome from disk.
+    """
+
+    def __init__(self, archive_path, driver=None):
+        self.archive_path = archive_path
+        self.driver = driver or webdriver.Chrome(options=replay_chrome_options())
+        self.page_dir = tempfile.TemporaryDirectory(prefix='rera-replay-')
+
+    def open(self, entry):
+        """
+        Load an archived page into the driver.
+        """
+        text = entry['response']['content']['text']
+        name = hashlib.sha1(entry['request']['url'].encode('utf-8') + text[:256].encode('utf-8')).hexdigest()
+        path = Path(self.page_dir.name) / f'{name}.html'
+        if not path.exists():
+            path.write_text(text, encoding='utf-8')
+        self.driver.get(path.as_uri())
+
+    def close(self):
+        self.driver.quit()
+        self.page_dir.cleanup()
+
+
+def replay_inventory(archive_path, output_json=None, fields=None):
+    """
+    Re-run inventory.py's inventory and infrastructure parsers over the details pages of an
+    archive and report how long parsing took.
+
+    :return: The list of ProjectInventory entries, as extract_outputData would have produced them.
+    """
+    from fields import select_inventory_fields, INFRASTRUCTURE_SECTIONS
+    from inventory import extract_inventories, extract_infrastructure
+    from records import ProjectInventory
+
+    selected_fields = select_inventory_fields(fields)
+    session = ReplaySession(archive_path)
+    output_data = []
+    pages = 0
+    parse_seconds = 0.0
+    try:
+        for entry in iter_entries(archive_path, kind='details'):
+            session.open(entry)
+            project_data = {"Rera ID": entry.get('_term'), "Project Name": entry.get('_project_name', '')}
+            started = time.perf_counter()
+            if "Inventories" in selected_fields:
+                extract_inventories(session.driver, project_data)
+            if any(name in INFRASTRUCTURE_SECTIONS for name in selected_fields):
+                extract_infrastructure(session.driver, project_data)
+            parse_seconds += time.perf_counter() - started
+            pages += 1
+            output_data.append(ProjectInventory.from_dict({k: v for k, v in project_data.items() if k in selected_fields}))
+    finally:
+        session.close()
+
+    if pages:
+        logger.info("Replayed %s pages; parsing took %.3f s (%.1f ms per page).", pages, parse_seconds,
+                    parse_seconds / pages * 1000)
+    if output_json:
+        with open(output_json, 'w', encoding='utf-8') as json_file:
+            json.dump([project.to_dict() for project in output_data], json_file, indent=4)
+        logger.info("Data saved to %s", output_json)
+    return output_data
+
+
+def replay_crawl(archive_path, input_csv, output_json, fields=None):
+    """
+    Run inventory.py's crawl over input_csv against the recorded traffic of an archive and
+    return how long it took.
+    """
+    from inventory import extract_outputData
+
+    started = time.perf_counter()
+    extract_outputData(1, input_csv, output_json, fields, replay_archive=archive_path)
+    seconds = time.perf_counter() - started
+    logger.info("Replayed crawl of '%s' took %.1f s.", input_csv, seconds)
+    return seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded portal session.")
+    parser.add_argument('archive', help="Archive written by a recording run")
+    parser.add_argument('-o', '--output', help="Write the parsed entries to this JSON file")
+    parser.add_argument('--crawl', metavar='INPUT_CSV',
+                        help="Run the inventory crawl for these terms against the recorded traffic "
+                             "instead of only re-parsing the recorded pages")
+    args = parser.parse_args()
+    if args.crawl:
+        replay_crawl(args.archive, args.crawl, args.output or 'replayed_output.json')
+    else:
+        replay_inventory(args.archive, args.output)
@@ -0,0 +1,235 @@
+"""
+Versioned history of the crawled project data.
+
+Instead of keeping a copy of 'new_data_.csv' per crawl, each crawl is compared with the
+state the store already holds and only the changed fields are stored, per reg_no and crawl
+(a field never stored reads as empty, so empty fields of new projects cost nothing).
+Any earlier crawl can be reconstructed from these deltas, and the history of one project
+(when its status changed, how often its completion date moved) is an index range scan.
+
+    python snapshot_store.py record new_data_.csv
+    python snapshot_store.py as-of 2024-06-01 -o projects_2024-06-01.csv
+    python snapshot_store.py history PRM/KA/RERA/1251/446/PR/171023/006339 --field status
+    python snapshot_store.py stats
+"""
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+from fields import PROJECT_FIELDNAMES
+
+# s_no is the row number of the search results and changes with every listing
+TRACKED_FIELDS = [name for name in PROJECT_FIELDNAMES if name not in ('s_no', 'reg_no')]
+
+# Pseudo-field: '1' while the project is listed, NULL after a full crawl no longer lists it
+PRESENT = '_present'
+
+
+def _timestamp(value=None):
+    return pd.Timestamp(value if value is not None else 'now').isoformat(timespec='seconds')
+
+
+class SnapshotStore:
+    """
+    Per-field change log of the crawled projects in SQLite.
+
+    `changes` holds one row per (reg_no, field, crawl) where the field got a new value; its
+    primary key orders a project's changes by field and crawl, so both reconstruction (latest
+    change per field up to a crawl) and history queries read it in key order.
+    """
+
+    def __init__(self, db_path='snapshots.sqlite'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS crawls (
+                id INTEGER PRIMARY KEY,
+                taken_at TEXT NOT NULL,
+                source TEXT,
+                projects INTEGER NOT NULL,
+                changes INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS crawls_taken_at ON crawls (taken_at);
+            CREATE TABLE IF NOT EXISTS changes (
+                reg_no TEXT NOT NULL,
+                field TEXT NOT NULL,
+                crawl_id INTEGER NOT NULL REFERENCES crawls (id),
+                value TEXT,
+                PRIMARY KEY (reg_no, field, crawl_id)
+            ) WITHOUT ROWID;
+        """)
+
+    def state(self, crawl_id=None):
+        """
+        Every field of every project known after crawl `crawl_id` (default: the latest),
+        including unlisted ones, as a DataFrame indexed by reg_no. Fields that were never
+        stored are empty, PRESENT is NaN for projects that are not listed.
+        """
+        # SQLite takes the bare `value` column from the row holding MAX(crawl_id)
+        query = "SELECT reg_no, field, value, MAX(crawl_id) FROM changes"
+        params = ()
+        if crawl_id is not None:
+            query += " WHERE crawl_id <= ?"
+            params = (crawl_id,)
+        long = pd.DataFrame(self.conn.execute(query + " GROUP BY reg_no, field", params).fetchall(),
+                            columns=['reg_no', 'field', 'value', 'crawl_id'])
+        wide = long.pivot(index='reg_no', columns='field', values='value')
+        wide.columns.name = None
+        wide = wide.reindex(columns=TRACKED_FIELDS + [PRESENT])
+        wide[TRACKED_FIELDS] = wide[TRACKED_FIELDS].fillna('')
+        return wide
+
+    def record(self, csv_file='new_data_.csv', taken_at=None, full=False):
+        """
+        Store the fields of a crawl CSV that differ from the current state as a new crawl.
+        Only the columns the CSV has are compared, so a projected crawl (a subset of the
+        fields) leaves the other fields' history alone. A crawl without changes is not stored.
+
+        :param taken_at: When the crawl ran (default: now). Crawl ids and the stored deltas
+            follow recording order, so it may not be earlier than the latest stored crawl.
+        :param full: The CSV lists every project, so projects missing from it are recorded
+            as unlisted. Leave False for partial or incremental crawls.
+        :return: Id of the new crawl (None if nothing changed) and the number of changed
+            fields stored.
+        """
+        taken_at = _timestamp(taken_at)
+        latest = self.conn.execute("SELECT MAX(taken_at) FROM crawls").fetchone()[0]
+        if latest is not None and taken_at < latest:
+            raise ValueError(f"Crawl time {taken_at} is earlier than the latest stored crawl ({latest}); "
+                             f"crawls must be recorded in the order they ran.")
+
+        data = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+        data['reg_no'] = data['reg_no'].str.strip()
+        data = data[data['reg_no'] != ''].drop_duplicates(subset='reg_no', keep='last').set_index('reg_no')
+        new = data[[name for name in TRACKED_FIELDS if name in data.columns]].copy()
+        new[PRESENT] = '1'
+
+        old = self.state()
+        # Unknown projects read as empty fields and a NaN PRESENT, so only their values are stored
+        new_values = new.stack()
+        old_values = old.stack().reindex(new_values.index).fillna('')
+        changed = new_values[old_values.ne(new_values)]
+        rows = list(zip(changed.index.get_level_values(0), changed.index.get_level_values(1), changed.tolist()))
+        if full:
+            listed = old.index[old[PRESENT] == '1']
+            rows += [(reg_no, PRESENT, None) for reg_no in listed.difference(new.index)]
+        if not rows:
+            print(f"No changes in '{csv_file}'; no crawl recorded.")
+            return None, 0
+
+        with self.conn:
+            crawl_id = self.conn.execute(
+                "INSERT INTO crawls (taken_at, source, projects, changes) VALUES (?, ?, ?, ?)",
+                (taken_at, os.path.basename(csv_file), len(new), len(rows)),
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO changes (reg_no, field, crawl_id, value) VALUES (?, ?, ?, ?)",
+                ((reg_no, field, crawl_id, value) for reg_no, field, value in rows),
+            )
+        print(f"Recorded crawl {crawl_id} of '{csv_file}': {len(new)} projects, {len(rows)} changed fields.")
+        return crawl_id, len(rows)
+
+    def crawl_at(self, when):
+        """
+        Id of the last crawl taken at or before `when` (a date means its start), or None.
+        """
+        row = self.conn.execute("SELECT MAX(id) FROM crawls WHERE taken_at <= ?", (_timestamp(when),)).fetchone()
+        return row[0]
+
+    def as_of(self, when=None):
+        """
+        The listed projects as they were after the last crawl at or before `when` (default:
+        the latest), in 'new_data_.csv' layout without s_no.
+        """
+        crawl_id = self.crawl_at(when) if when is not None else None
+        if when is not None and crawl_id is None:
+            return pd.DataFrame(columns=['reg_no'] + TRACKED_FIELDS)
+        state = self.state(crawl_id)
+        state = state[state[PRESENT] == '1'].drop(columns=PRESENT)
+        return state.reset_index()
+
+    def history(self, reg_no, fields=None):
+        """
+        The changes of one project, oldest first: taken_at, field, old_value, new_value.
+        The first recorded value of a field has an empty old_value; a project that stops being
+        listed shows PRESENT changing from '1' to empty.
+        """
+        query = ("SELECT c.taken_at, ch.field, ch.value FROM changes ch JOIN crawls c ON c.id = ch.crawl_id "
+                 "WHERE ch.reg_no = ?")
+        params = [reg_no]
+        if fields:
+            query += f" AND ch.field IN ({', '.join('?' for _ in fields)})"
+            params += list(fields)
+        history = pd.DataFrame(self.conn.execute(query + " ORDER BY ch.crawl_id, ch.field", params).fetchall(),
+                               columns=['taken_at', 'field', 'new_value'])
+        history['new_value'] = history['new_value'].fillna('')
+        history.insert(2, 'old_value', history.groupby('field')['new_value'].shift().fillna(''))
+        return history
+
+    def change_counts(self, field):
+        """
+        How often `field` changed per project after its first recorded value, most first,
+        e.g. the number of completion date extensions.
+        """
+        counts = pd.DataFrame(self.conn.execute(
+            "SELECT reg_no, COUNT(*) - 1 FROM changes WHERE field = ? GROUP BY reg_no", (field,)).fetchall(),
+            columns=['reg_no', 'changes'])
+        return counts[counts['changes'] > 0].sort_values('changes', ascending=False, kind='stable').reset_index(drop=True)
+
+    def stats(self):
+        """
+        Crawls and stored change rows, against the cells full copies of every crawl would hold.
+        """
+        crawls, snapshot_cells = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(projects), 0) FROM crawls").fetchone()
+        change_rows = self.conn.execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+        return {
+            'crawls': crawls,
+            'change_rows': change_rows,
+            'full_snapshot_cells': snapshot_cells * len(TRACKED_FIELDS),
+            'db_bytes': sum(os.path.getsize(path) for path in (self.db_path, self.db_path + '-wal') if os.path.exists(path)),
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record crawls as deltas and query the project history.")
+    parser.add_argument('--db', default='snapshots.sqlite', help="Store database (default: snapshots.sqlite)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record = subparsers.add_parser('record', help="Store the changes of a crawl CSV")
+    record.add_argument('csv', nargs='?', default='new_data_.csv')
+    record.add_argument('--taken-at', help="When the crawl ran (default: now)")
+    record.add_argument('--full', action='store_true', help="The CSV lists every project; mark missing ones unlisted")
+    as_of = subparsers.add_parser('as-of', help="Reconstruct the projects as of a date or time")
+    as_of.add_argument('when', nargs='?', help="Date or time (default: latest crawl)")
+    as_of.add_argument('-o', '--output', default='projects_as_of.csv')
+    history = subparsers.add_parser('history', help="Changes of one project")
+    history.add_argument('reg_no')
+    history.add_argument('--field', nargs='+', help="Only these fields")
+    counts = subparsers.add_parser('counts', help="Projects by number of changes of one field")
+    counts.add_argument('field', choices=TRACKED_FIELDS)
+    subparsers.add_parser('stats', help="Size of the store against full snapshots")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.db)
+    if args.command == 'record':
+        try:
+            store.record(args.csv, args.taken_at, args.full)
+        except ValueError as e:
+            store.close()
+            parser.error(str(e))
+    elif args.command == 'as-of':
+        projects = store.as_of(args.when)
+        projects.to_csv(args.output, index=False)
+        print(f"Wrote {len(projects)} projects to '{args.output}'.")
+    elif args.command == 'history':
+        print(store.history(args.reg_no, args.field).to_string(index=False))
+    elif args.command == 'counts':
+        print(store.change_counts(args.field).to_string(index=False))
+    else:
+        print(store.stats())
+    store.close()
@@ -0,0 +1,192 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Generous bounding box around Karnataka, used to flag bad coordinates
+KARNATAKA_BOUNDS = {'min_lat': 11.5, 'max_lat': 18.5, 'min_lon': 74.0, 'max_lon': 78.6}
+
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Great-circle distances in km from one point to arrays of points.
+    """
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def load_coordinates(csv_file='new_data_.csv', bounds=KARNATAKA_BOUNDS):
+    """
+    Read reg_no/latitude/longitude from a scraped CSV and flag unusable coordinates.
+
+    :return: (valid, flagged) DataFrames. `flagged` has a `problem` column: 'missing',
+        'not_numeric', 'zero', 'swapped' (lat/lon reversed) or 'outside_karnataka'.
+    """
+    data = pd.read_csv(csv_file, usecols=['reg_no', 'latitude', 'longitude'], dtype=str, keep_default_na=False)
+    data = data.drop_duplicates(subset='reg_no', keep='last')
+    lat = pd.to_numeric(data['latitude'].str.strip(), errors='coerce')
+    lon = pd.to_numeric(data['longitude'].str.strip(), errors='coerce')
+
+    def inside(la, lo):
+        return la.between(bounds['min_lat'], bounds['max_lat']) & lo.between(bounds['min_lon'], bounds['max_lon'])
+
+    missing = (data['latitude'].str.strip() == '') | (data['longitude'].str.strip() == '')
+    problem = np.select(
+        [missing, lat.isna() | lon.isna(), (lat == 0) | (lon == 0), inside(lon, lat), ~inside(lat, lon)],
+        ['missing', 'not_numeric', 'zero', 'swapped', 'outside_karnataka'],
+        default='',
+    )
+    data = data.assign(lat=lat, lon=lon, problem=problem)
+    valid = data[data['problem'] == ''][['reg_no', 'lat', 'lon']].reset_index(drop=True)
+    flagged = data[data['problem'] != ''][['reg_no', 'latitude', 'longitude', 'problem']].reset_index(drop=True)
+    return valid, flagged
+
+
+class SpatialIndex:
+    """
+    Uniform grid over project coordinates.
+
+    Points are sorted by grid cell, so the points of a run of cells in one grid row form a
+    contiguous slice found with two binary searches. Queries gather the slices of the
+    covering cells and filter them with vectorized distance math.
+    """
+
+    def __init__(self, reg_nos, lats, lons, cell_deg=0.02, origin=(KARNATAKA_BOUNDS['min_lat'], KARNATAKA_BOUNDS['min_lon'])):
+        self.cell_deg = cell_deg
+        self.origin = origin
+        self.n_cols = int(np.ceil(360 / cell_deg))
+        keys = self._keys(np.asarray(lats, dtype=float), np.asarray(lons, dtype=float))
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.lats = np.asarray(lats, dtype=float)[order]
+        self.lons = np.asarray(lons, dtype=float)[order]
+        self.reg_nos = np.asarray(reg_nos, dtype=object)[order]
+
+    @classmethod
+    def from_csv(cls, csv_file='new_data_.csv', flagged_csv=None, **kwargs):
+        """
+        Build an index from a scraped CSV, optionally writing the flagged coordinates to flagged_csv.
+        """
+        valid, flagged = load_coordinates(csv_file)
+        if len(flagged):
+            print(f"Flagged {len(flagged)} projects with unusable coordinates: "
+                  f"{flagged['problem'].value_counts().to_dict()}")
+            if flagged_csv:
+                flagged.to_csv(flagged_csv, index=False)
+        print(f"Indexed {len(valid)} projects.")
+        return cls(valid['reg_no'].to_numpy(), valid['lat'].to_numpy(), valid['lon'].to_numpy(), **kwargs)
+
+    def save(self, path):
+        np.savez(path, reg_nos=self.reg_nos.astype(str), lats=self.lats, lons=self.lons,
+                 cell_deg=self.cell_deg, origin=np.asarray(self.origin))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        return cls(data['reg_nos'], data['lats'], data['lons'], cell_deg=float(data['cell_deg']),
+                   origin=tuple(data['origin']))
+
+    def _rows_cols(self, lats, lons):
+        rows = np.floor((lats - self.origin[0]) / self.cell_deg).astype(np.int64)
+        cols = np.floor((lons - self.origin[1]) / self.cell_deg).astype(np.int64)
+        return rows, cols
+
+    def _keys(self, lats, lons):
+        rows, cols = self._rows_cols(lats, lons)
+        return rows * self.n_cols + cols
+
+    def _candidates(self, min_lat, max_lat, min_lon, max_lon):
+        """
+        Positions of all points in the grid cells covering a bounding box.
+        """
+        (row0, row1), (col0, col1) = self._rows_cols(np.array([min_lat, max_lat]), np.array([min_lon, max_lon]))
+        col0, col1 = max(col0, 0), min(col1, self.n_cols - 1)
+        rows = np.arange(row0, row1 + 1)
+        if not len(rows) or col0 > col1:
+            return np.empty(0, dtype=np.int64)
+        starts = np.searchsorted(self.keys, rows * self.n_cols + col0, side='left')
+        ends = np.searchsorted(self.keys, rows * self.n_cols + col1, side='right')
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        reg_nos of the projects inside a bounding box.
+        """
+        idx = self._candidates(min_lat, max_lat, min_lon, max_lon)
+        mask = ((self.lats[idx] >= min_lat) & (self.lats[idx] <= max_lat) &
+                (self.lons[idx] >= min_lon) & (self.lons[idx] <= max_lon))
+        return self.reg_nos[idx[mask]].tolist()
+
+    def _within(self, lat, lon, radius_km):
+        dlat = radius_km / 111.32
+        dlon = radius_km / (111.32 * max(np.cos(np.radians(lat)), 1e-6))
+        idx = self._candidates(lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+        distances = haversine_km(lat, lon, self.lats[idx], self.lons[idx])
+        mask = distances <= radius_km
+        return idx[mask], distances[mask]
+
+    def radius(self, lat, lon, radius_km):
+        """
+        (reg_no, distance_km) of the projects within radius_km of a point, nearest first.
+        """
+        idx, distances = self._within(lat, lon, radius_km)
+        order = np.argsort(distances)
+        return list(zip(self.reg_nos[idx[order]].tolist(), distances[order].round(3).tolist()))
+
+    def nearest(self, lat, lon, k=5):
+        """
+        (reg_no, distance_km) of the k projects nearest to a point.
+        """
+        k = min(k, len(self.reg_nos))
+        radius_km = self.cell_deg * 111.32
+        while True:
+            idx, distances = self._within(lat, lon, radius_km)
+            # Every point within the radius is found, so once k are in it the k nearest are too
+            if len(idx) >= k or radius_km > 2 * np.pi * EARTH_RADIUS_KM:
+                break
+            radius_km *= 2
+        if len(idx) < k:
+            idx = np.arange(len(self.reg_nos))
+            distances = haversine_km(lat, lon, self.lats, self.lons)
+        top = np.argpartition(distances, k - 1)[:k] if k else np.empty(0, dtype=np.int64)
+        top = top[np.argsort(distances[top])]
+        return list(zip(self.reg_nos[idx[top]].tolist(), distances[top].round(3).tolist()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spatial queries over scraped project coordinates.")
+    parser.add_argument('--index', default='spatial_index.npz', help="Index file (default: spatial_index.npz)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Build the index from a scraped CSV")
+    build.add_argument('--csv', default='new_data_.csv')
+    build.add_argument('--flagged', default='flagged_coordinates.csv', help="Where to write unusable coordinates")
+    radius = subparsers.add_parser('radius', help="Projects within a radius (km) of a point")
+    radius.add_argument('lat', type=float)
+    radius.add_argument('lon', type=float)
+    radius.add_argument('km', type=float)
+    bbox = subparsers.add_parser('bbox', help="Projects inside a bounding box")
+    for name in ('min_lat', 'min_lon', 'max_lat', 'max_lon'):
+        bbox.add_argument(name, type=float)
+    nearest = subparsers.add_parser('nearest', help="The k projects nearest to a point")
+    nearest.add_argument('lat', type=float)
+    nearest.add_argument('lon', type=float)
+    nearest.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        SpatialIndex.from_csv(args.csv, args.flagged).save(args.index)
+        print(f"Index saved to '{args.index}'.")
+    else:
+        index = SpatialIndex.load(args.index)
+        if args.command == 'radius':
+            result = index.radius(args.lat, args.lon, args.km)
+        elif args.command == 'bbox':
+            result = index.bbox(args.min_lat, args.min_lon, args.max_lat, args.max_lon)
+        else:
+            result = index.nearest(args.lat, args.lon, args.k)
+        print(json.dumps(result, indent=4))
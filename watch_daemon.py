@@ -0,0 +1,230 @@
+"""
+Long-running refresh daemon.
+
+Unlike a cron-started scrape, the daemon keeps its browsers, the registration-number index
+and the crawl snapshot in memory between runs. Every cycle it
+
+    1. re-runs the district search in the warm harvest browser and records registration
+       numbers it has not seen (new projects),
+    2. crawls the new projects, then refreshes known ones in crawl_scheduler.py priority
+       order until the cycle's time budget is spent, skipping projects refreshed within
+       min_refresh_hours,
+    3. publishes the outputs (CSV, inventory JSON, Excel, project index).
+
+Its state is served as JSON at http://127.0.0.1:<status_port>/status.
+
+    python watch_daemon.py --config pipeline.json
+"""
+import argparse
+import json
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+from selenium.webdriver.support.ui import WebDriverWait
+
+from crawl_scheduler import load_snapshot, priority_scores, SNAPSHOT_COLUMNS
+from event_log import get_logger
+from pipeline import load_config, browser_lifecycle, CrawlHandler, EnrichHandler, ExportHandler
+from regindex import RegistrationIndex
+from regno import open_district_results, harvest_pages, PAGE_INFO_JS
+
+logger = get_logger("watch_daemon")
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') not in ('', '/status'):
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.daemon.status_snapshot(), indent=4).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WatchDaemon:
+    def __init__(self, config):
+        self.config = config
+        self.watch = config["watch"]
+        harvest = config["harvest"]
+        self.index = RegistrationIndex(harvest["index_db"], seed_csv=harvest["registration_csv"])
+        self.known = set(self.index.iter_sorted())
+        self.snapshot = load_snapshot(config["export"]["projects_csv"])
+        self.last_refreshed = {}
+        self.csv_lock = threading.Lock()
+
+        self.harvester = browser_lifecycle(config)
+        self.crawler = CrawlHandler(config)
+        self.enricher = EnrichHandler(config) if config["enrich"]["enabled"] else None
+        self.exporter = ExportHandler(config)
+
+        self.stop_event = threading.Event()
+        self.status_lock = threading.Lock()
+        self.status = {
+            'state': 'starting', 'cycles': 0, 'started_at': _iso(time.time()),
+            'last_cycle': None, 'next_cycle_at': None, 'errors': 0,
+        }
+
+    def set_status(self, **values):
+        with self.status_lock:
+            self.status.update(values)
+
+    def status_snapshot(self):
+        with self.status_lock:
+            status = dict(self.status)
+        status['known_registration_numbers'] = len(self.known)
+        status['browser_recycles'] = (self.harvester.recycles + self.crawler.lifecycle.recycles +
+                                      (self.enricher.lifecycle.recycles if self.enricher else 0))
+        return status
+
+    def reopen_search(self, lifecycle):
+        """
+        Re-run the district search in a warm browser so its results include new projects.
+        """
+        driver = lifecycle.ensure_healthy()
+        if not open_district_results(driver, WebDriverWait(driver, 20), self.config["district"]):
+            lifecycle.record_error()
+            raise RuntimeError(f"District search for '{self.config['district']}' failed.")
+        return driver
+
+    def harvest(self):
+        """
+        Record and return the registration numbers that appeared since the last cycle.
+        """
+        driver = self.reopen_search(self.harvester)
+        page_count = driver.execute_script(PAGE_INFO_JS)['pages']
+        new_reg_nos = []
+        harvest_pages(driver, WebDriverWait(driver, 20), range(page_count), self.index,
+                      self.config["harvest"]["registration_csv"], self.csv_lock, new_reg_nos.extend)
+        self.harvester.page_served(page_count)
+        if new_reg_nos:
+            with self.csv_lock:
+                self.index.export_csv(self.config["harvest"]["registration_csv"])
+        self.known.update(new_reg_nos)
+        return new_reg_nos
+
+    def refresh(self, new_reg_nos, deadline):
+        """
+        Crawl the new projects, then the most change-prone known ones until the deadline.
+        """
+        self.reopen_search(self.crawler.lifecycle)
+        if self.enricher:
+            self.reopen_search(self.enricher.lifecycle)
+
+        stale_before = time.time() - self.watch["min_refresh_hours"] * 3600
+        candidates = [term for term in self.known if self.last_refreshed.get(term, 0) < stale_before]
+        ordered = list(dict.fromkeys(new_reg_nos + priority_scores(sorted(candidates), self.snapshot)['term'].tolist()))
+
+        refreshed, failed, crawled = 0, 0, []
+        for term in ordered:
+            if self.stop_event.is_set() or (time.monotonic() > deadline and term not in new_reg_nos):
+                break
+            try:
+                item = self.crawler(term)[0]
+                if self.enricher:
+                    item = self.enricher(item)[0]
+                self.exporter(item)
+                crawled.extend(item[1])
+                refreshed += 1
+                # Only on success: a failed term stays due and is tried again next cycle
+                self.last_refreshed[term] = time.time()
+            except Exception as e:
+                failed += 1
+                logger.warning("Refreshing '%s' failed: %s", term, e)
+
+        if crawled:
+            # Keep the in-memory snapshot current instead of re-reading the CSV next cycle
+            crawled = pd.DataFrame({name: [getattr(record, name) for record in crawled] for name in SNAPSHOT_COLUMNS})
+            self.snapshot = pd.concat([self.snapshot, crawled], ignore_index=True).drop_duplicates(subset='reg_no', keep='last')
+        return refreshed, failed, len(ordered)
+
+    def run_cycle(self):
+        started = time.monotonic()
+        interval = self.watch["interval_minutes"] * 60
+        deadline = started + interval * self.watch["budget_fraction"]
+        cycle = {'started_at': _iso(time.time())}
+        try:
+            self.set_status(state='harvesting')
+            new_reg_nos = self.harvest()
+            cycle['new_registration_numbers'] = len(new_reg_nos)
+            self.set_status(state='refreshing')
+            refreshed, failed, candidates = self.refresh(new_reg_nos, deadline)
+            cycle.update(refreshed=refreshed, failed=failed, candidates=candidates)
+            self.set_status(state='publishing')
+            self.exporter.publish()
+        except Exception as e:
+            logger.warning("Refresh cycle failed: %s", e)
+            cycle['error'] = str(e)
+            with self.status_lock:
+                self.status['errors'] += 1
+        cycle['seconds'] = round(time.monotonic() - started, 1)
+        with self.status_lock:
+            self.status['state'] = 'idle'
+            self.status['cycles'] += 1
+            self.status['last_cycle'] = cycle
+        logger.info("Refresh cycle done: %s", cycle, extra={"fields": cycle})
+
+    def serve_status(self):
+        server = ThreadingHTTPServer(('127.0.0.1', self.watch["status_port"]), StatusHandler)
+        server.daemon = self
+        threading.Thread(target=server.serve_forever, name="status", daemon=True).start()
+        return server
+
+    def run(self):
+        server = self.serve_status()
+        logger.info("Watching '%s' every %s minutes; status at http://127.0.0.1:%s/status",
+                    self.config['district'], self.watch['interval_minutes'], self.watch['status_port'])
+        try:
+            while not self.stop_event.is_set():
+                started = time.time()
+                self.run_cycle()
+                next_cycle = started + self.watch["interval_minutes"] * 60
+                self.set_status(next_cycle_at=_iso(next_cycle))
+                self.stop_event.wait(max(0, next_cycle - time.time()))
+        finally:
+            self.set_status(state='stopping')
+            server.shutdown()
+            self.close()
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def close(self):
+        self.harvester.quit()
+        self.crawler.close()
+        if self.enricher:
+            self.enricher.close()
+        self.exporter.close()
+        self.index.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the scraped data fresh with scheduled incremental refreshes.")
+    parser.add_argument('--config', help="JSON config file (see pipeline.json)")
+    parser.add_argument('--once', action='store_true', help="Run a single cycle and exit")
+    args = parser.parse_args()
+
+    daemon = WatchDaemon(load_config(args.config))
+    if args.once:
+        try:
+            daemon.run_cycle()
+            print(json.dumps(daemon.status_snapshot(), indent=4))
+        finally:
+            daemon.close()
+    else:
+        signal.signal(signal.SIGINT, daemon.stop)
+        signal.signal(signal.SIGTERM, daemon.stop)
+        daemon.run()
@@ -0,0 +1,418 @@
+import argparse
+import csv
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from event_log import get_logger
+
+logger = get_logger("work_queue")
+
+
+class QueueBase:
+    """
+    Interface of the crawl work queue backends, plus the helpers they share.
+
+    A backend implements add_terms, lease, renew, complete, release, requeue, attempts,
+    counts, iter_records and close with the semantics documented on WorkQueue; open_queue()
+    picks the backend from the queue location.
+    """
+
+    def add_terms_from_csv(self, input_csv, serial_no=1):
+        """
+        Enqueue the search terms of an input CSV such as 'newDa.csv', starting at serial_no.
+        """
+        with open(input_csv, 'r', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            terms = [row[0].strip() for idx, row in enumerate(reader, start=1)
+                     if idx >= serial_no and row and row[0].strip()]
+        self.add_terms(terms)
+        logger.info("Queued %s search terms from '%s'.", len(terms), input_csv)
+
+    @contextmanager
+    def keep_leased(self, term, worker_id, lease_seconds=600):
+        """
+        Renew the lease on term in the background every third of lease_seconds while the
+        block runs, so a term that takes longer than one lease is not handed out again.
+        """
+        stop = threading.Event()
+
+        def renew_until_stopped():
+            while not stop.wait(lease_seconds / 3):
+                if not self.renew(term, worker_id, lease_seconds):
+                    logger.warning("Lease on '%s' was lost; it is no longer renewed.", term)
+                    return
+
+        renewer = threading.Thread(target=renew_until_stopped, name=f"lease-{worker_id}", daemon=True)
+        renewer.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            renewer.join()
+
+    def export_json(self, output_json):
+        """
+        Write the output records of all finished terms to a JSON file such as 'output.json'.
+        """
+        records = list(self.iter_records())
+        with open(output_json, 'w', encoding='utf-8') as json_file:
+            json.dump(records, json_file, indent=4)
+        logger.info("Exported %s records to %s", len(records), output_json)
+
+
+class WorkQueue(QueueBase):
+    """
+    Crawl work queue shared by several worker processes on one host through one SQLite file.
+    WAL mode relies on shared memory, so the file must be on a local disk, not a network
+    filesystem shared between machines; use PostgresWorkQueue to spread a crawl over hosts.
+
+    Each search term is handed out with a time-limited lease. If a worker dies, its lease
+    expires and the term goes back to the other workers. A term's output records are stored
+    in the same transaction that marks it done, so a term is never done without its output
+    and never has output twice.
+    """
+
+    def __init__(self, db_path="work_queue.sqlite", timeout=30):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS terms_status ON terms (status, position);
+            CREATE TABLE IF NOT EXISTS results (
+                term TEXT NOT NULL REFERENCES terms (term),
+                seq INTEGER NOT NULL,
+                record TEXT NOT NULL,
+                PRIMARY KEY (term, seq)
+            );
+        """)
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can never
+        # read the same pending term and both claim it
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def add_terms(self, terms):
+        """
+        Enqueue search terms in order; terms already in the queue are left untouched.
+        """
+        self._transaction()
+        try:
+            start = self.conn.execute("SELECT COALESCE(MAX(position), 0) FROM terms").fetchone()[0]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO terms (term, position) VALUES (?, ?)",
+                ((term, start + i) for i, term in enumerate(terms, start=1)),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def lease(self, worker_id, lease_seconds=600, max_attempts=3):
+        """
+        Claim the next pending term, or a term whose lease has expired.
+        Returns the term, or None when nothing is left to hand out.
+        """
+        now = time.time()
+        self._transaction()
+        try:
+            # Give up on terms that keep failing or whose leases keep expiring
+            self.conn.execute(
+                "UPDATE terms SET status = 'failed', worker_id = NULL, lease_expires = NULL "
+                "WHERE status IN ('pending', 'leased') AND attempts >= ? "
+                "AND (status = 'pending' OR lease_expires < ?)",
+                (max_attempts, now),
+            )
+            row = self.conn.execute(
+                "SELECT term FROM terms "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY position LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE terms SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE term = ?",
+                (worker_id, now + lease_seconds, row[0]),
+            )
+            self.conn.execute("COMMIT")
+            return row[0]
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def renew(self, term, worker_id, lease_seconds=600):
+        """
+        Extend a lease that is still held by worker_id. Returns False if it was lost.
+        """
+        cursor = self.conn.execute(
+            "UPDATE terms SET lease_expires = ? WHERE term = ? AND status = 'leased' AND worker_id = ?",
+            (time.time() + lease_seconds, term, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, term, worker_id, records):
+        """
+        Store the output records of a term and mark it done, atomically.
+        Returns False (and stores nothing) if the lease was lost to another worker.
+        """
+        self._transaction()
+        try:
+            cursor = self.conn.execute(
+                "UPDATE terms SET status = 'done', lease_expires = NULL "
+                "WHERE term = ? AND status = 'leased' AND worker_id = ?",
+                (term, worker_id),
+            )
+            if cursor.rowcount != 1:
+                self.conn.execute("ROLLBACK")
+                return False
+            self.conn.execute("DELETE FROM results WHERE term = ?", (term,))
+            self.conn.executemany(
+                "INSERT INTO results (term, seq, record) VALUES (?, ?, ?)",
+                ((term, seq, json.dumps(record)) for seq, record in enumerate(records)),
+            )
+            self.conn.execute("COMMIT")
+            return True
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def release(self, term, worker_id):
+        """
+        Hand a leased term back to the queue after a failure.
+        """
+        self.conn.execute(
+            "UPDATE terms SET status = 'pending', worker_id = NULL, lease_expires = NULL "
+            "WHERE term = ? AND status = 'leased' AND worker_id = ?",
+            (term, worker_id),
+        )
+
+    def requeue(self, terms):
+        """
+        Put terms back into the queue as pending with a fresh attempt count, whatever their
+        status; terms not in the queue yet are added at the end.
+        """
+        terms = list(terms)
+        self.add_terms(terms)
+        self.conn.executemany(
+            "UPDATE terms SET status = 'pending', worker_id = NULL, lease_expires = NULL, attempts = 0 "
+            "WHERE term = ? AND status != 'leased'",
+            ((term,) for term in terms),
+        )
+
+    def attempts(self, term):
+        """
+        How often term has been leased, including the current lease.
+        """
+        row = self.conn.execute("SELECT attempts FROM terms WHERE term = ?", (term,)).fetchone()
+        return row[0] if row else 0
+
+    def counts(self):
+        """
+        Return the number of terms per status.
+        """
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM terms GROUP BY status").fetchall())
+
+    def iter_records(self):
+        """
+        Yield the output records of all finished terms in queue order.
+        """
+        cursor = self.conn.execute(
+            "SELECT results.record FROM results JOIN terms USING (term) "
+            "WHERE terms.status = 'done' ORDER BY terms.position, results.seq"
+        )
+        for (record,) in cursor:
+            yield json.loads(record)
+
+    def close(self):
+        self.conn.close()
+
+
+class PostgresWorkQueue(QueueBase):
+    """
+    The WorkQueue semantics on a PostgreSQL server, so workers on several hosts can share
+    one crawl. Leases are timed by the server clock, so clock skew between the worker hosts
+    does not shorten or extend them; a lease skips terms another worker is claiming at the
+    same moment (FOR UPDATE SKIP LOCKED) instead of waiting for it.
+
+    Needs psycopg2: pip install psycopg2-binary
+    """
+
+    # Seconds since the epoch on the server
+    NOW = "EXTRACT(EPOCH FROM clock_timestamp())"
+
+    def __init__(self, dsn):
+        try:
+            import psycopg2
+        except ImportError:
+            raise ImportError("A PostgreSQL work queue needs psycopg2: pip install psycopg2-binary")
+        self.dsn = dsn
+        self.conn = psycopg2.connect(dsn)
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS terms (
+                    term TEXT PRIMARY KEY,
+                    position BIGINT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker_id TEXT,
+                    lease_expires DOUBLE PRECISION,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS terms_status ON terms (status, position);
+                CREATE TABLE IF NOT EXISTS results (
+                    term TEXT NOT NULL REFERENCES terms (term),
+                    seq INTEGER NOT NULL,
+                    record TEXT NOT NULL,
+                    PRIMARY KEY (term, seq)
+                );
+            """)
+
+    def _execute(self, query, params=()):
+        # One statement in its own transaction; returns the row count
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.rowcount
+
+    def add_terms(self, terms):
+        with self.conn, self.conn.cursor() as cursor:
+            # Serializes concurrent seeding so positions stay unique and in order
+            cursor.execute("LOCK TABLE terms IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute("SELECT COALESCE(MAX(position), 0) FROM terms")
+            start = cursor.fetchone()[0]
+            cursor.executemany(
+                "INSERT INTO terms (term, position) VALUES (%s, %s) ON CONFLICT (term) DO NOTHING",
+                [(term, start + i) for i, term in enumerate(terms, start=1)],
+            )
+
+    def lease(self, worker_id, lease_seconds=600, max_attempts=3):
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE terms SET status = 'failed', worker_id = NULL, lease_expires = NULL "
+                "WHERE status IN ('pending', 'leased') AND attempts >= %s "
+                f"AND (status = 'pending' OR lease_expires < {self.NOW})",
+                (max_attempts,),
+            )
+            cursor.execute(
+                "SELECT term FROM terms "
+                f"WHERE status = 'pending' OR (status = 'leased' AND lease_expires < {self.NOW}) "
+                "ORDER BY position LIMIT 1 FOR UPDATE SKIP LOCKED"
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                f"UPDATE terms SET status = 'leased', worker_id = %s, lease_expires = {self.NOW} + %s, "
+                "attempts = attempts + 1 WHERE term = %s",
+                (worker_id, lease_seconds, row[0]),
+            )
+            return row[0]
+
+    def renew(self, term, worker_id, lease_seconds=600):
+        return self._execute(
+            f"UPDATE terms SET lease_expires = {self.NOW} + %s "
+            "WHERE term = %s AND status = 'leased' AND worker_id = %s",
+            (lease_seconds, term, worker_id),
+        ) == 1
+
+    def complete(self, term, worker_id, records):
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE terms SET status = 'done', lease_expires = NULL "
+                "WHERE term = %s AND status = 'leased' AND worker_id = %s",
+                (term, worker_id),
+            )
+            if cursor.rowcount != 1:
+                self.conn.rollback()
+                return False
+            cursor.execute("DELETE FROM results WHERE term = %s", (term,))
+            cursor.executemany(
+                "INSERT INTO results (term, seq, record) VALUES (%s, %s, %s)",
+                [(term, seq, json.dumps(record)) for seq, record in enumerate(records)],
+            )
+            return True
+
+    def release(self, term, worker_id):
+        self._execute(
+            "UPDATE terms SET status = 'pending', worker_id = NULL, lease_expires = NULL "
+            "WHERE term = %s AND status = 'leased' AND worker_id = %s",
+            (term, worker_id),
+        )
+
+    def requeue(self, terms):
+        terms = list(terms)
+        self.add_terms(terms)
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.executemany(
+                "UPDATE terms SET status = 'pending', worker_id = NULL, lease_expires = NULL, attempts = 0 "
+                "WHERE term = %s AND status != 'leased'",
+                [(term,) for term in terms],
+            )
+
+    def attempts(self, term):
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute("SELECT attempts FROM terms WHERE term = %s", (term,))
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def counts(self):
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute("SELECT status, COUNT(*) FROM terms GROUP BY status")
+            return dict(cursor.fetchall())
+
+    def iter_records(self):
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT results.record FROM results JOIN terms USING (term) "
+                "WHERE terms.status = 'done' ORDER BY terms.position, results.seq"
+            )
+            rows = cursor.fetchall()
+        for (record,) in rows:
+            yield json.loads(record)
+
+    def close(self):
+        self.conn.close()
+
+
+def open_queue(location="work_queue.sqlite"):
+    """
+    The work queue at location: a postgresql:// (or postgres://) URL for a queue shared
+    across hosts, otherwise the path of a SQLite queue for the workers of one host.
+    """
+    if location.startswith(('postgresql://', 'postgres://')):
+        return PostgresWorkQueue(location)
+    return WorkQueue(location)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the shared crawl work queue.")
+    parser.add_argument('--db', default='work_queue.sqlite',
+                        help="SQLite queue file or postgresql:// URL (default: work_queue.sqlite)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    seed = subparsers.add_parser('seed', help="Enqueue the search terms of an input CSV")
+    seed.add_argument('input_csv')
+    seed.add_argument('--serial-no', type=int, default=1)
+    export = subparsers.add_parser('export', help="Write the finished records to a JSON file")
+    export.add_argument('output_json')
+    subparsers.add_parser('status', help="Show the number of terms per status")
+    args = parser.parse_args()
+
+    queue = open_queue(args.db)
+    if args.command == 'seed':
+        queue.add_terms_from_csv(args.input_csv, args.serial_no)
+    elif args.command == 'export':
+        queue.export_json(args.output_json)
+    else:
+        print(queue.counts())
+    queue.close()